@@ -19,7 +19,11 @@ from PySide6.QtWidgets import QApplication
 
 from udpProtocols import (credential_packet, version_request_packet, 
                                setup_request_packet, send_tune_data_packet,
-                               current_time, keyboard_command_packet)
+                               session_resume_packet, handshake_packet, discover_packet, current_time)
+
+from appControlChannel import ControlChannel
+from appClockSync import ClockOffsetEstimator
+from appRecentHosts import RecentHosts
 
 from appFunctions import save_settings, load_settings, showError
 
@@ -35,14 +39,25 @@ class NetworkManager(QObject):
     Attributes:
         discovery_done_signal (Signal): Emitted after host is discovered.
         handshake_done_signal (Signal): Emitted after handshake succeeds.
+        resume_done_signal (Signal): Emitted with the result of a session resume.
     """
 
     SETTINGS_FILE = "D-14/Client-Side/client-app/settings.json"
+    RECENT_HOSTS_FILE = "D-14/Client-Side/client-app/recent_ips.txt"
     CHUNK_SIZE = 1024 #1024
     BUFFER_SIZE = 65536 #65536
+    PROBE_TIMEOUT = 0.6     # Seconds to wait for a unicast probe reply before listening for broadcasts
+    PROBE_ROUNDS = 2        # Probe sends per host within PROBE_TIMEOUT (covers a lost datagram)
+    PROBE_MAX_HOSTS = 8     # Cached hosts probed at once
+    COMBINED_HANDSHAKE_TIMEOUT = 0.4   # Seconds to wait for the host's answer to a combined handshake
+    COMBINED_HANDSHAKE_ATTEMPTS = 3    # Combined handshake sends before falling back to the step-by-step handshake
+    RESUME_TIMEOUT = 0.3    # Seconds to wait for the host's answer to the first session_resume
+    RESUME_RETRY_MAX = 4.0  # Wait cap between session_resume sends, doubled per unanswered send
 
     discovery_done_signal = Signal()
     handshake_done_signal = Signal()
+    resume_done_signal = Signal(bool)
+    command_ack_signal = Signal(dict, float)    # Ack, RTT in ms (emitted from the control I/O thread)
 
     def __init__(self, main_app_reference):
         """
@@ -65,13 +80,32 @@ class NetworkManager(QObject):
         self.heartbeat_port = None
         #self.app.handshake_done = threading.Event()
         self.discovery_done = threading.Event()
+        self.recent_hosts = RecentHosts(self.RECENT_HOSTS_FILE, self.settings["host_control_port"])
+
+        # === Session Resume ===
+        self.session_token = None       # From handshake_complete; single use, renewed on every resume
+        self.resume_window = 0.0        # Seconds the host keeps a dropped session resumable
+
+        # === Control Channel ===
+        self.control_format = "json"    # Negotiated in version_request
+        self.control_channel = None
+        self.command_ack_signal.connect(self.handle_command_ack)
 
-    # === Step 1: Discover Vehicle Host Over UDP Broadcast ===
+        # === Clock Sync (fed by the HeartbeatWorker) ===
+        self.clock = ClockOffsetEstimator()
+
+    # === Step 1: Discover Vehicle Host ===
     def discover_host(self):
         """
-        Listens for UDP broadcast packets to detect the host vehicle.
+        Finds the host vehicle: unicast probes to the last known and recently
+        seen hosts first, then listening for the UDP broadcast.
         Emits discovery_done_signal upon successful connection.
         """
+        if self.probe_recent_hosts():
+            QCoreApplication.processEvents()
+            self.discovery_done_signal.emit()
+            return
+
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         sock.settimeout(20.0)
         #sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
@@ -85,11 +119,7 @@ class NetworkManager(QObject):
                 try:
                     payload = json.loads(data.decode())
                     if payload.get("type") == "advertise":
-                        self.server_ip = addr[0]
-                        self.video_port = payload.get("video_port")
-                        self.control_port = payload.get("control_port")
-                        self.heartbeat_port = payload.get("heartbeat_port")
-                        self.app.logSignal.emit(f"Found host: {self.server_ip}, Video: {self.video_port}, Control: {self.control_port}, HeartBeat: {self.heartbeat_port}", "BROADCAST")
+                        self.apply_advertise(payload, addr)
                         
                         QCoreApplication.processEvents()
                         self.discovery_done_signal.emit()
@@ -116,16 +146,90 @@ class NetworkManager(QObject):
         sock.close()
         return     
 
+    def probe_recent_hosts(self):
+        """
+        Sends discover probes to the last known host and the cached hosts, all at
+        once, and takes the first advertise reply.
+
+        Probes go out in rank order (last known host, then latest success first),
+        so when several hosts answer the most likely one usually answers first.
+
+        Returns:
+            bool: True if a host answered within PROBE_TIMEOUT.
+        """
+        candidates = [(ip, entry["port"]) for ip, entry in self.recent_hosts.ranked()]
+        if self.server_ip is not None and self.control_port is not None:
+            candidates.insert(0, (self.server_ip, self.control_port))
+        targets = list(dict.fromkeys(candidates))[:self.PROBE_MAX_HOSTS]
+        if not targets:
+            return False
+
+        self.app.logSignal.emit(f"Probing {len(targets)} known host(s)...", "BROADCAST")
+        packet = json.dumps(discover_packet()).encode()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        start = time.monotonic()
+        deadline = start + self.PROBE_TIMEOUT
+        next_round = start
+        rounds = 0
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                if rounds < self.PROBE_ROUNDS and now >= next_round:
+                    for target in targets:
+                        try:
+                            sock.sendto(packet, target)
+                        except OSError:
+                            continue    # e.g. no route to a host on another network
+                    rounds += 1
+                    next_round = now + self.PROBE_TIMEOUT / self.PROBE_ROUNDS
+
+                wait_until = min(deadline, next_round) if rounds < self.PROBE_ROUNDS else deadline
+                sock.settimeout(max(0.001, wait_until - now))
+                try:
+                    data, addr = sock.recvfrom(1024)
+                    payload = json.loads(data.decode())
+                except (socket.timeout, ConnectionRefusedError, UnicodeDecodeError, ValueError):
+                    continue
+                if isinstance(payload, dict) and payload.get("type") == "advertise":
+                    self.apply_advertise(payload, addr)
+                    self.app.logSignal.emit(f"Host answered probe in {(time.monotonic() - start) * 1000:.0f} ms", "BROADCAST")
+                    return True
+        finally:
+            sock.close()
+
+        self.app.logSignal.emit("No known host answered", "BROADCAST")
+        return False
+
+    def apply_advertise(self, payload, addr):
+        """
+        Takes the host address and ports from an advertise packet.
+        """
+        self.server_ip = addr[0]
+        self.video_port = payload.get("video_port")
+        self.control_port = payload.get("control_port")
+        self.heartbeat_port = payload.get("heartbeat_port")
+        self.app.logSignal.emit(f"Found host: {self.server_ip}, Video: {self.video_port}, Control: {self.control_port}, HeartBeat: {self.heartbeat_port}", "BROADCAST")
+
     # === Step 2: Perform Handshake With Server ===
     def perform_handshake(self, username, password):
         """
-        Sends authentication and configuration packets to the host in sequence.
+        Authenticates and configures the session with the host.
+
+        The combined handshake (credentials, version and tune in one request,
+        answered once) is tried first and re-sent on a timeout, since the reply
+        may be lost after the host has started the session. Hosts that answer
+        none of COMBINED_HANDSHAKE_ATTEMPTS sends get the step-by-step packets
+        in sequence.
 
         Args:
             username (str): Login username.
             password (str): Login password.
         """
         handshake_status = True
+        awaiting_combined = False
+        combined_attempts = 0
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         sock.settimeout(5.0)
         print(self.server_ip)
@@ -133,11 +237,20 @@ class NetworkManager(QObject):
         def send(payload):
             sock.sendto(json.dumps(payload).encode(), (self.server_ip, self.control_port))
 
-        pending_action = "send_credentials"
+        pending_action = "send_handshake"
 
         while handshake_status:
             # === Outbound Client Commands ===
-            if pending_action == "send_credentials":
+            if pending_action == "send_handshake":
+                send(handshake_packet(username, password, self.app.client_ver, self.handshake_tune_packet()))
+                self.app.logSignal.emit("Sent handshake to host", "HANDSHAKE")
+                awaiting_combined = True
+                combined_attempts += 1
+                sock.settimeout(self.COMBINED_HANDSHAKE_TIMEOUT)
+                pending_action = None
+                QCoreApplication.processEvents()
+
+            elif pending_action == "send_credentials":
                 send(credential_packet(username, password))
                 self.app.logSignal.emit("Sent credentials to host", "HANDSHAKE")
                 pending_action = None
@@ -187,17 +300,7 @@ class NetworkManager(QObject):
                 QCoreApplication.processEvents()
 
             elif pending_action == "send_tune_data":
-                # Servo & ESC
-                min_duty_servo = self.settings["min_duty_servo"]
-                max_duty_servo = self.settings["max_duty_servo"]
-                neutral_servo = self.settings["neutral_duty_servo"]
-                min_duty_esc = self.settings["min_duty_esc"]
-                max_duty_esc = self.settings["max_duty_esc"]
-                neutral_duty_esc = self.settings["neutral_duty_esc"]
-                brake_esc = self.settings["brake_esc"]
-
-                send(send_tune_data_packet("handshake", min_duty_servo, max_duty_servo, neutral_servo, 
-                                        min_duty_esc, max_duty_esc, neutral_duty_esc, brake_esc))
+                send(self.handshake_tune_packet())
                 
                 self.app.logSignal.emit("Sent vehicle tune data", "HANDSHAKE")
                 pending_action = None
@@ -212,6 +315,9 @@ class NetworkManager(QObject):
                 pending_action = None
                 handshake_status = False
                 self.app.VEHICLE_CONNECTION = True
+                self.clock = ClockOffsetEstimator()     # New session, possibly a different host clock
+                self.open_control_channel()
+                self.recent_hosts.record_success(self.server_ip, self.control_port)
 
                 # FOR TUNE SETUP
                 self.app.ui.VehicleTuningSettingsPage.IS_VEHICLE_READY = True
@@ -228,13 +334,26 @@ class NetworkManager(QObject):
             
             # === Incoming Server Payloads ===
             try:
-                data, _ = sock.recvfrom(1048)
+                data, _ = sock.recvfrom(2048)
                 payload = json.loads(data.decode())
+                if awaiting_combined and payload.get("type") == "handshake_result":
+                    awaiting_combined = False
+                    sock.settimeout(5.0)
                 pending_action = self.handle_server_response(payload)
                 QCoreApplication.processEvents()
 
             except socket.timeout:
-                if handshake_status:
+                if awaiting_combined and combined_attempts < self.COMBINED_HANDSHAKE_ATTEMPTS:
+                    # The request or its reply was lost; the host answers a repeat either way
+                    pending_action = "send_handshake"
+                elif awaiting_combined:
+                    # Older host: it ignores the combined handshake
+                    awaiting_combined = False
+                    sock.settimeout(5.0)
+                    pending_action = "send_credentials"
+                    self.app.logSignal.emit("No combined handshake reply, using step-by-step handshake", "HANDSHAKE")
+                    QCoreApplication.processEvents()
+                elif handshake_status:
                     self.app.logSignal.emit("Waiting for server...", "HANDSHAKE")
                     QCoreApplication.processEvents()
                 continue
@@ -246,6 +365,17 @@ class NetworkManager(QObject):
         QApplication.restoreOverrideCursor()
         return
 
+    def handshake_tune_packet(self):
+        """
+        Returns:
+            dict: The handshake_tune_setup packet with the saved servo and ESC tune.
+        """
+        # Servo & ESC
+        return send_tune_data_packet("handshake", self.settings["min_duty_servo"], self.settings["max_duty_servo"],
+                                     self.settings["neutral_duty_servo"], self.settings["min_duty_esc"],
+                                     self.settings["max_duty_esc"], self.settings["neutral_duty_esc"],
+                                     self.settings["brake_esc"])
+
     # === Step 2.5: Parse Server Payloads ===
     def handle_server_response(self, payload):
         """
@@ -276,6 +406,10 @@ class NetworkManager(QObject):
             if payload.get("client_compatablity"):
                 #* Done message
                 self.app.logSignal.emit("Client version is compatable", "HANDSHAKE")
+
+                # Hosts that predate binary control don't send a format
+                self.control_format = payload.get("control_format", "json")
+                self.app.logSignal.emit(f"Control format: {self.control_format}", "HANDSHAKE")
                 QCoreApplication.processEvents()
 
                 if payload.get("host-version") in self.app.supported_ver:
@@ -305,64 +439,190 @@ class NetworkManager(QObject):
         elif payload.get("type") == "handshake_complete":
             if payload.get("status"):
                 self.app.logSignal.emit("Applied vehicle tune data", "HANDSHAKE")
+                # Hosts that predate session resume don't send a token
+                self.session_token = payload.get("session_token")
+                self.resume_window = payload.get("resume_window_s") or 0.0
                 QCoreApplication.processEvents()
 
                 return "handshake_complete"                             #* <--- pass
             
+        # ------ Combined Handshake Reply ------
+        elif payload.get("type") == "handshake_result":
+            # The step replies, in order, up to the first one that doesn't pass
+            action = None
+            for step in ("auth_status", "version_info", "setup_info", "handshake_complete"):
+                if not payload.get(step):
+                    break
+                action = self.handle_server_response(payload[step])
+                if action not in ("version_request", "setup_request", "send_tune_data"):
+                    break
+            return action
+
         elif payload.get("type") == "":
             return
 
+    # === Step 2.75: Resume a Dropped Session ===
+    def can_resume(self):
+        """
+        Returns:
+            bool: True if a session token and the host address are known.
+        """
+        return self.session_token is not None and self.server_ip is not None and self.control_port is not None
+
+    def resume_session(self):
+        """
+        Resumes the last session with its token in one round trip, skipping discovery
+        and the handshake. The tune, version and control format negotiated by the
+        full handshake stay in effect. Emits resume_done_signal with the result.
+
+        The session_resume is re-sent with a doubling wait for as long as the host
+        keeps the session (resume_window), so an outage longer than the first
+        few sends still resumes. The token is only dropped when the host rejects
+        it; a forced disconnect (token cleared meanwhile) stops the retries.
+
+        Returns:
+            bool: True if the host resumed the session.
+        """
+        if not self.can_resume():
+            self.resume_done_signal.emit(False)
+            return False
+
+        start = time.perf_counter()
+        deadline = start + max(self.resume_window, self.RESUME_TIMEOUT * 3)
+        packet = json.dumps(session_resume_packet(self.session_token, self.app.client_ver)).encode()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        wait = self.RESUME_TIMEOUT
+        reply = None
+        try:
+            while reply is None and self.session_token is not None:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                wait = min(wait, remaining)
+                try:
+                    sock.sendto(packet, (self.server_ip, self.control_port))
+                except OSError:
+                    # No route while the link is down: wait and send again
+                    time.sleep(wait)
+                else:
+                    sock.settimeout(wait)
+                    try:
+                        while reply is None:
+                            data, addr = sock.recvfrom(1024)
+                            payload = json.loads(data.decode())
+                            if addr[0] == self.server_ip and payload.get("type") == "session_resumed":
+                                reply = payload
+                    except (OSError, UnicodeDecodeError, ValueError):
+                        pass
+                wait = min(wait * 2, self.RESUME_RETRY_MAX)
+        finally:
+            sock.close()
+
+        if reply is None:
+            # Host unreachable for the whole resume window (or a forced disconnect meanwhile)
+            self.app.logSignal.emit("Session could not be resumed: no reply from host", "HANDSHAKE")
+            self.resume_done_signal.emit(False)
+            return False
+
+        if not reply.get("status"):
+            # Expired or rejected: a full reconnect is needed
+            self.session_token = None
+            self.app.logSignal.emit("Session could not be resumed: rejected by host", "HANDSHAKE")
+            self.resume_done_signal.emit(False)
+            return False
+
+        self.session_token = reply.get("session_token")
+        self.control_format = reply.get("control_format", self.control_format)
+        self.clock = ClockOffsetEstimator()     # Offset is re-estimated by the new heartbeat burst
+        self.open_control_channel()
+        self.app.VEHICLE_CONNECTION = True
+        self.app.ui.VehicleTuningSettingsPage.IS_VEHICLE_READY = True
+
+        self.app.logSignal.emit(f"Session resumed in {(time.perf_counter() - start) * 1000:.0f} ms", "HANDSHAKE")
+        self.resume_done_signal.emit(True)
+        return True
+
     # === Step 3: Send Keyboard Command ===
+    def open_control_channel(self):
+        """
+        Opens the session's control channel, replacing any previous one.
+        """
+        self.close_control_channel()
+        self.control_channel = ControlChannel(self.server_ip, self.control_port, self.control_format, clock=self.clock)
+        self.control_channel.on_ack = self.command_ack_signal.emit
+        self.control_channel.on_lost = lambda seq, cmd: self.app.logSignal.emit(f"No ACK for command: {cmd} (seq {seq})", "ERROR")
+        self.control_channel.start()
+
+    def close_control_channel(self):
+        """
+        Closes the control channel if one is open.
+        """
+        if self.control_channel is not None:
+            self.control_channel.close()
+            self.control_channel = None
+
     def send_keyboard_command(self, cmd: str, esc_intensity, servo_intensity):
         """
-        Sends keyboard control packet and updates local vehicle movement UI.
+        Sends a keyboard control packet without waiting for the ack.
+
+        The ack is matched on the control I/O thread and handled on the GUI
+        thread by handle_command_ack.
 
         Args:
             cmd (str): Movement command name.
             esc_intensity (float): ESC power value.
             servo_intensity (float): Steering power value.
         """
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.settimeout(1.0)
-        packet = keyboard_command_packet(cmd, esc_intensity, servo_intensity)
-        now = int(time.time() * 1000)
-        sock.sendto(json.dumps(packet).encode(), (self.server_ip, self.control_port))
+        if self.control_channel is None:
+            self.open_control_channel()
+        self.control_channel.send(cmd, esc_intensity, servo_intensity)
 
-        try:
-            data, _ = sock.recvfrom(1024)
-            
-            ack = json.loads(data.decode())
+    def handle_command_ack(self, ack: dict, rtt_ms: float):
+        """
+        Updates the vehicle movement UI from a matched command ack.
 
-            if ack.get("type") == "command_ack":
-                if ack.get("command") == "Ignored command during emergency":
-                    self.app.logSignal.emit(f"[ACK] DriveAssist: {ack.get("command")}", "WARN")
-                
-                if ack.get("command") == "ENABLE_DRIVE_ASSIST":
-                    self.app.logSignal.emit("[ACK] DriveAssist: DriveAssist Enabled", "WARN")
-
-                if ack.get("command") == "DISABLE_DRIVE_ASSIST":
-                    self.app.logSignal.emit("[ACK] DriveAssist: DriveAssist Disabled", "WARN")
-                #now = time.time()
-                delay = ack["timestamp"] - now
-                esc_pw = ack["esc_pw"]
-                servo_pw = ack["servo_pw"]
-                # If servo pwm is == to center
-                if servo_pw == self.settings["neutral_duty_servo"]:
-                    # change the intensity of servo to 0.0
-                    self.app.ui.drivePage.servo_intensity = 0.0
-
-                # UPDATE UI ELEMENTS
-                self.app.updateVehicleMovement("UPDATE", esc_pw, servo_pw)
-                self.app.logSignal.emit(f"[ACK] Command: {ack['command']} | ESC: {esc_pw} | SERVO: {servo_pw} | RTT: {delay}ms", "INFO")
-
-            # EMERGENCY STOP FEATURES
-            #elif ack.get("type") == "":
-
-        except socket.timeout:
-            self.app.logSignal.emit(f"No ACK for command: {cmd}", "INFO")
-            self.app.logSignal.emit(f"No ACK for command: {cmd}", "ERROR")
-        sock.close()
-        return
+        Args:
+            ack (dict): The decoded command_ack.
+            rtt_ms (float): Round trip time of the command.
+        """
+        if ack.get("command") == "Ignored command during emergency":
+            self.app.logSignal.emit(f"[ACK] DriveAssist: {ack.get('command')}", "WARN")
+
+        if ack.get("command") == "Ignored command during actuator fault":
+            self.app.logSignal.emit(f"[ACK] {ack.get('command')}", "ERROR")
+        
+        if ack.get("command") == "ENABLE_DRIVE_ASSIST":
+            self.app.logSignal.emit("[ACK] DriveAssist: DriveAssist Enabled", "WARN")
+
+        if ack.get("command") == "DISABLE_DRIVE_ASSIST":
+            self.app.logSignal.emit("[ACK] DriveAssist: DriveAssist Disabled", "WARN")
+
+        esc_pw = ack["esc_pw"]
+        servo_pw = ack["servo_pw"]
+        # If servo pwm is == to center
+        if servo_pw == self.settings["neutral_duty_servo"]:
+            # change the intensity of servo to 0.0
+            self.app.ui.drivePage.servo_intensity = 0.0
+
+        # UPDATE UI ELEMENTS
+        self.app.updateVehicleMovement("UPDATE", esc_pw, servo_pw)
+        self.app.logSignal.emit(f"[ACK] Command: {ack['command']} | ESC: {esc_pw} | SERVO: {servo_pw} | RTT: {rtt_ms:.1f}ms", "INFO")
+
+    def control_stats(self):
+        """
+        Returns:
+            dict | None: Control channel RTT (min/avg/p95), one-way latency and loss statistics, None before connecting.
+        """
+        if self.control_channel is None:
+            return None
+        return self.control_channel.stats()
+
+    def clock_stats(self):
+        """
+        Returns:
+            dict: Clock offset (host - client), drift and sync state.
+        """
+        return self.clock.stats()
 
     # === Step 4: Send Drive Assist Control ===
     def send_drive_assist_command(self, cmd: str):
@@ -0,0 +1,176 @@
+"""
+appClockSync.py
+
+NTP-style clock offset and drift estimation between the client and the host.
+
+Each heartbeat carries the client send time (t0). The host answers with its
+receive (t1) and send (t2) times, and the client notes the arrival time (t3).
+From one exchange:
+
+    offset = ((t1 - t0) + (t2 - t3)) / 2      host clock minus client clock
+    delay  = (t3 - t0) - (t2 - t1)            round trip without host processing
+
+Exchanges delayed by queueing give a skewed offset, so the estimate uses the
+lowest-delay sample of the recent ones (the NTP clock filter). Drift is the
+least-squares slope of those filtered offsets over time, so the estimate can
+be extrapolated between heartbeats.
+
+Author: HalfasleepDev
+Created: 18-10-2026
+"""
+
+# === Imports ===
+import threading
+import time
+from collections import deque
+
+# === Helper Functions ===
+def wall_ms() -> float:
+    """
+    Returns:
+        float: Wall clock time in ms, with sub-ms precision.
+    """
+    return time.time() * 1000.0
+
+# === Class Definitions ===
+class ClockOffsetEstimator:
+    """
+    Estimates the host clock offset from heartbeat time-sync exchanges.
+
+    Attributes:
+        samples (deque): Recent (t3, offset, delay) samples.
+        filtered (deque): Lowest-delay (t3, offset) points used for the drift fit.
+        offset_ms (float | None): Offset (host - client) at base_time.
+        drift_ppm (float): Rate the offset changes at, in parts per million.
+        delay_ms (float | None): Round trip delay of the sample the offset comes from.
+        base_time (float): Client time (ms) the offset was measured at.
+    """
+
+    FILTER_WINDOW = 8           # Samples the lowest-delay one is picked from
+    DRIFT_WINDOW = 64           # Filtered points kept for the drift fit
+    DRIFT_MIN_SPAN_MS = 20000   # Fit drift only once the points span this long
+    MIN_SAMPLES = 4             # Samples before the estimate is trusted
+
+    def __init__(self):
+        """
+        Initializes an empty estimator.
+        """
+        self.lock = threading.Lock()
+        self.samples = deque(maxlen=self.FILTER_WINDOW)
+        self.filtered = deque(maxlen=self.DRIFT_WINDOW)
+        self.sample_count = 0
+
+        self.offset_ms = None
+        self.drift_ppm = 0.0
+        self.delay_ms = None
+        self.base_time = 0.0
+
+    # === Samples ===
+    def add_sample(self, t0: float, t1: float, t2: float, t3: float):
+        """
+        Adds one time-sync exchange.
+
+        Args:
+            t0 (float): Client send time (ms).
+            t1 (float): Host receive time (ms).
+            t2 (float): Host send time (ms).
+            t3 (float): Client receive time (ms).
+        """
+        delay = (t3 - t0) - (t2 - t1)
+        if delay < 0:
+            return
+        offset = ((t1 - t0) + (t2 - t3)) / 2.0
+
+        with self.lock:
+            self.samples.append((t3, offset, delay))
+            self.sample_count += 1
+
+            best_time, best_offset, best_delay = min(self.samples, key=lambda sample: sample[2])
+            if not self.filtered or self.filtered[-1][0] != best_time:
+                self.filtered.append((best_time, best_offset))
+
+            self.offset_ms = best_offset
+            self.delay_ms = best_delay
+            self.base_time = best_time
+            self.drift_ppm = self._fit_drift()
+
+    def _fit_drift(self) -> float:
+        """
+        Least-squares slope of the filtered offsets, in ppm.
+        """
+        if len(self.filtered) < 3 or self.filtered[-1][0] - self.filtered[0][0] < self.DRIFT_MIN_SPAN_MS:
+            return self.drift_ppm
+        n = len(self.filtered)
+        mean_t = sum(t for t, _ in self.filtered) / n
+        mean_o = sum(o for _, o in self.filtered) / n
+        var = sum((t - mean_t) ** 2 for t, _ in self.filtered)
+        if var == 0:
+            return self.drift_ppm
+        slope = sum((t - mean_t) * (o - mean_o) for t, o in self.filtered) / var
+        return slope * 1e6
+
+    # === Conversions ===
+    @property
+    def synced(self) -> bool:
+        return self.offset_ms is not None and self.sample_count >= self.MIN_SAMPLES
+
+    def offset_at(self, client_ms: float = None) -> float:
+        """
+        Returns the offset (host - client) extrapolated to a client time.
+
+        Args:
+            client_ms (float, optional): Client time in ms, defaults to now.
+
+        Returns:
+            float: Offset in ms (0 before the first sample).
+        """
+        with self.lock:
+            if self.offset_ms is None:
+                return 0.0
+            if client_ms is None:
+                client_ms = wall_ms()
+            return self.offset_ms + self.drift_ppm * 1e-6 * (client_ms - self.base_time)
+
+    def host_to_client(self, host_ms: float) -> float:
+        """
+        Converts a host timestamp to the client timebase.
+        """
+        return host_ms - self.offset_at()
+
+    def client_to_host(self, client_ms: float) -> float:
+        """
+        Converts a client timestamp to the host timebase.
+        """
+        return client_ms + self.offset_at(client_ms)
+
+    def latency_from_host(self, host_ms: float, now_ms: float = None) -> float:
+        """
+        One-way latency of something the host stamped, measured now on the client.
+
+        Args:
+            host_ms (float): Host timestamp (ms).
+            now_ms (float, optional): Client receive time, defaults to now.
+
+        Returns:
+            float: Latency in ms.
+        """
+        if now_ms is None:
+            now_ms = wall_ms()
+        return now_ms - (host_ms - self.offset_at(now_ms))
+
+    # === Stats ===
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Offset, the client time it was measured at, drift, best round trip delay,
+            sample count and sync state.
+        """
+        with self.lock:
+            return {
+                "synced": self.offset_ms is not None and self.sample_count >= self.MIN_SAMPLES,
+                "offset_ms": round(self.offset_ms, 2) if self.offset_ms is not None else None,
+                "base_ms": round(self.base_time, 1),
+                "drift_ppm": round(self.drift_ppm, 1),
+                "delay_ms": round(self.delay_ms, 2) if self.delay_ms is not None else None,
+                "samples": self.sample_count,
+            }
@@ -0,0 +1,269 @@
+"""
+appControlChannel.py
+
+Persistent, non-blocking control channel to the vehicle host.
+
+One UDP socket, connected to the host's control port, lives for the whole
+session. Commands are sent straight from the caller (a non-blocking send never
+stalls the GUI thread) with a sequence number, and a background I/O thread
+reads the acks, matches them to their command by sequence number, and expires
+commands whose ack never came back. RTT and loss statistics are kept for the UI.
+Once the heartbeat clock sync has an offset estimate, the command and ack
+timestamps also give the true one-way latency in each direction.
+
+Author: HalfasleepDev
+Created: 18-10-2026
+"""
+
+# === Imports ===
+import json
+import select
+import socket
+import threading
+import time
+from collections import OrderedDict, deque
+
+from appClockSync import wall_ms
+from udpProtocols import keyboard_command_packet, control_packet, parse_control_ack, CONTROL_ACK_MAGIC
+
+# === Constants ===
+RTT_WINDOW = 200            # Acks kept for the RTT statistics
+
+# === Class Definitions ===
+class ControlChannel:
+    """
+    Sends control commands and matches their acks asynchronously.
+
+    Attributes:
+        server_ip (str): Host IP.
+        control_port (int): Host control port.
+        control_format (str): "binary" or "json", as negotiated in the handshake.
+        ack_timeout (float): Seconds before an unacked command is counted as lost.
+        on_ack (Callable | None): Called from the I/O thread with (ack, rtt_ms) for each matched ack.
+        on_lost (Callable | None): Called from the I/O thread with (seq, command) for each lost ack.
+        clock (ClockOffsetEstimator | None): Host clock offset used for the one-way latencies.
+        sent (int): Commands sent.
+        acked (int): Acks matched to a pending command.
+        lost (int): Commands whose ack did not arrive within ack_timeout.
+        late (int): Acks that arrived after their command was counted as lost.
+        unmatched (int): Acks with no matching command (duplicates, or from an older session).
+        send_errors (int): Sends that failed (buffer full, network down).
+    """
+
+    def __init__(self, server_ip: str, control_port: int, control_format: str = "json", ack_timeout: float = 1.0,
+                 clock=None):
+        """
+        Opens the control socket.
+
+        Args:
+            server_ip (str): Host IP.
+            control_port (int): Host control port.
+            control_format (str): "binary" or "json".
+            ack_timeout (float): Seconds before an unacked command is counted as lost.
+            clock (ClockOffsetEstimator, optional): Host clock offset used for the one-way latencies.
+        """
+        self.server_ip = server_ip
+        self.control_port = control_port
+        self.control_format = control_format
+        self.ack_timeout = ack_timeout
+        self.clock = clock
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.connect((server_ip, control_port))
+        self.sock.setblocking(False)
+
+        self.on_ack = None
+        self.on_lost = None
+
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.pending = OrderedDict()    # seq -> (monotonic send time, command, wall send time), oldest first
+        self.expired = deque(maxlen=64) # Recently lost seqs, to recognise late acks
+        self.rtts = deque(maxlen=RTT_WINDOW)
+        self.uplinks = deque(maxlen=RTT_WINDOW)      # Client send -> host ack, on the common timebase
+        self.downlinks = deque(maxlen=RTT_WINDOW)    # Host ack -> client receive
+
+        self.sent = 0
+        self.acked = 0
+        self.lost = 0
+        self.late = 0
+        self.unmatched = 0
+        self.send_errors = 0
+
+        self.running = False
+        self.thread = None
+
+    # === Lifecycle ===
+    def start(self):
+        """
+        Starts the I/O thread.
+        """
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="control-io", daemon=True)
+        self.thread.start()
+
+    def close(self):
+        """
+        Stops the I/O thread and closes the socket.
+        """
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(1.0)
+        self.sock.close()
+
+    # === Sending ===
+    def send(self, cmd: str, esc_intensity, servo_intensity) -> int:
+        """
+        Sends one command without waiting for its ack.
+
+        Args:
+            cmd (str): Command name.
+            esc_intensity (float | None): ESC power value.
+            servo_intensity (float | None): Steering power value.
+
+        Returns:
+            int: The command's sequence number.
+        """
+        with self.lock:
+            self.seq = (self.seq + 1) & 0xFFFFFFFF
+            seq = self.seq
+            self.pending[seq] = (time.monotonic(), cmd, wall_ms())
+
+        if self.control_format == "binary":
+            packet = control_packet(cmd, esc_intensity, servo_intensity, seq)
+        else:
+            packet = json.dumps(keyboard_command_packet(cmd, esc_intensity, servo_intensity, seq)).encode()
+
+        try:
+            self.sock.send(packet)
+            self.sent += 1
+        except OSError:
+            # Leave it pending; it will be counted as lost
+            self.send_errors += 1
+        return seq
+
+    # === I/O Thread ===
+    def run(self):
+        """
+        I/O loop: read every available ack, then expire commands that timed out.
+        """
+        while self.running:
+            try:
+                readable, _, _ = select.select([self.sock], [], [], 0.05)
+            except (OSError, ValueError):
+                break
+
+            if readable:
+                self.drain()
+            self.expire()
+
+    def drain(self):
+        """
+        Reads and matches every ack waiting on the socket.
+        """
+        while True:
+            try:
+                data = self.sock.recv(1024)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                # ICMP port unreachable while the host restarts; the commands will expire
+                return
+
+            if data[:2] == CONTROL_ACK_MAGIC:
+                ack = parse_control_ack(data)
+            else:
+                try:
+                    ack = json.loads(data.decode())
+                except (UnicodeDecodeError, json.JSONDecodeError):
+                    ack = None
+            if not ack or ack.get("type") != "command_ack":
+                continue
+            self.match(ack)
+
+    def match(self, ack: dict):
+        """
+        Pairs an ack with its pending command and records the RTT.
+
+        Args:
+            ack (dict): A decoded command_ack.
+        """
+        now = time.monotonic()
+        now_wall = wall_ms()
+        seq = ack.get("seq")
+        with self.lock:
+            if seq is None:
+                # Host without sequence numbers: acks come back in order
+                entry = self.pending.popitem(last=False)[1] if self.pending else None
+            else:
+                entry = self.pending.pop(seq, None)
+
+            if entry is None:
+                if seq in self.expired:
+                    self.late += 1
+                else:
+                    self.unmatched += 1
+                return
+
+            rtt_ms = (now - entry[0]) * 1000
+            self.rtts.append(rtt_ms)
+            self.acked += 1
+
+            if self.clock is not None and self.clock.synced and ack.get("timestamp"):
+                # The ack timestamp is host time: split the round trip into its two legs
+                ack_time = self.clock.host_to_client(ack["timestamp"])
+                self.uplinks.append(ack_time - entry[2])
+                self.downlinks.append(now_wall - ack_time)
+
+        if self.on_ack is not None:
+            self.on_ack(ack, rtt_ms)
+
+    def expire(self):
+        """
+        Counts commands older than ack_timeout as lost.
+        """
+        deadline = time.monotonic() - self.ack_timeout
+        lost = []
+        with self.lock:
+            while self.pending:
+                seq, (sent_time, cmd, _) = next(iter(self.pending.items()))
+                if sent_time > deadline:
+                    break
+                self.pending.popitem(last=False)
+                self.expired.append(seq)
+                self.lost += 1
+                lost.append((seq, cmd))
+
+        if self.on_lost is not None:
+            for seq, cmd in lost:
+                self.on_lost(seq, cmd)
+
+    # === Stats ===
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Counters, loss %, RTT min/avg/p95 and average one-way latencies (None
+            until the clock is synced) in ms over the last RTT_WINDOW acks.
+        """
+        with self.lock:
+            rtts = sorted(self.rtts)
+            uplinks = list(self.uplinks)
+            downlinks = list(self.downlinks)
+            in_flight = len(self.pending)
+
+        settled = self.acked + self.lost
+        return {
+            "sent": self.sent,
+            "acked": self.acked,
+            "lost": self.lost,
+            "late": self.late,
+            "unmatched": self.unmatched,
+            "send_errors": self.send_errors,
+            "in_flight": in_flight,
+            "loss_pct": round(100.0 * self.lost / settled, 2) if settled else 0.0,
+            "rtt_min_ms": round(rtts[0], 1) if rtts else None,
+            "rtt_avg_ms": round(sum(rtts) / len(rtts), 1) if rtts else None,
+            "rtt_p95_ms": round(rtts[min(len(rtts) - 1, int(len(rtts) * 0.95))], 1) if rtts else None,
+            "uplink_avg_ms": round(sum(uplinks) / len(uplinks), 1) if uplinks else None,
+            "downlink_avg_ms": round(sum(downlinks) / len(downlinks), 1) if downlinks else None,
+        }
@@ -0,0 +1,229 @@
+"""
+appFrameTrace.py
+
+Per-stage timing of every video frame, from sensor capture to paint.
+
+The host stamps capture, encode start/end and first/last chunk sent, and
+sends them in a small "frame_trace" packet after the frame. The client marks
+first/last chunk received, decode, each FrameProcessor stage, QImage
+conversion and paint. Host marks are moved to the client clock with the
+heartbeat clock offset, and the time between consecutive marks is added to a
+rolling histogram per stage, so it is clear where the frame budget goes.
+
+Author: HalfasleepDev
+Created: 18-10-2026
+"""
+
+# === Imports ===
+import threading
+from collections import OrderedDict, deque
+
+from appClockSync import wall_ms
+
+# === Constants ===
+HISTOGRAM_WINDOW = 600      # Frames kept per stage (10 s at 60 fps)
+HISTOGRAM_EDGES_MS = [0.5, 1, 2, 4, 8, 16, 33, 66, 133]     # Upper edges, the last bucket is open ended
+
+HOST_MARKS = ("capture", "encode_start", "encode_end", "send_first", "send_last")
+
+# Stage name -> (start mark, end mark). Stages that cross between the host and
+# client clocks are only measured once the clock offset is known.
+STAGES = OrderedDict([
+    ("encode_queue", ("capture", "encode_start")),
+    ("encode", ("encode_start", "encode_end")),
+    ("send_queue", ("encode_end", "send_first")),
+    ("send", ("send_first", "send_last")),
+    ("network", ("send_first", "recv_first")),
+    ("receive", ("recv_first", "recv_last")),
+    ("decode_queue", ("recv_last", "decode_start")),
+    ("decode", ("decode_start", "decode_end")),
+    ("cv_analyze", ("analyze_start", "analyze_end")),
+    ("cv_overlay", ("overlay_start", "overlay_end")),
+    ("qimage", ("qimage_start", "qimage_end")),
+    ("paint_queue", ("qimage_end", "paint_start")),
+    ("paint", ("paint_start", "paint_end")),
+    ("total", ("capture", "paint_end")),
+])
+
+# === Class Definitions ===
+class StageHistogram:
+    """
+    Rolling window of one stage's durations.
+
+    Attributes:
+        values (deque): The most recent durations in ms.
+    """
+
+    def __init__(self, window: int = HISTOGRAM_WINDOW):
+        self.values = deque(maxlen=window)
+
+    def add(self, duration_ms: float):
+        self.values.append(duration_ms)
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Count, mean, p50/p95/p99, max and bucket counts over the window.
+        """
+        values = sorted(self.values)
+        if not values:
+            return {"count": 0}
+
+        buckets = [0] * (len(HISTOGRAM_EDGES_MS) + 1)
+        for value in values:
+            index = 0
+            while index < len(HISTOGRAM_EDGES_MS) and value > HISTOGRAM_EDGES_MS[index]:
+                index += 1
+            buckets[index] += 1
+
+        def pct(p):
+            return round(values[min(len(values) - 1, int(len(values) * p / 100))], 2)
+
+        return {
+            "count": len(values),
+            "mean_ms": round(sum(values) / len(values), 2),
+            "p50_ms": pct(50),
+            "p95_ms": pct(95),
+            "p99_ms": pct(99),
+            "max_ms": round(values[-1], 2),
+            "buckets": buckets,
+        }
+
+class FrameTracer:
+    """
+    Collects the marks of each frame and feeds the stage histograms.
+
+    A frame is finished when it is painted. Its host trace may arrive before or
+    after that, so whichever comes second completes the record. A painted frame
+    whose host trace never arrives (lost, or tracing off on the host) is still
+    counted for its client stages once it ages out.
+
+    Attributes:
+        clock (ClockOffsetEstimator | None): Moves host marks to the client clock.
+        histograms (dict[str, StageHistogram]): Rolling durations per stage.
+        frames_traced (int): Frames whose marks were added to the histograms.
+        host_traces (int): frame_trace packets received from the host.
+    """
+
+    MAX_PENDING = 120           # Frames waiting for their other half
+
+    def __init__(self, clock=None):
+        """
+        Initializes the tracer.
+
+        Args:
+            clock (ClockOffsetEstimator, optional): Host clock offset estimator.
+        """
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.pending = OrderedDict()    # frame_id -> {"host": dict | None, "client": dict, "painted": bool}
+        self.histograms = {stage: StageHistogram() for stage in STAGES}
+        self.frames_traced = 0
+        self.host_traces = 0
+
+    def _record(self, frame_id: int) -> dict:
+        record = self.pending.get(frame_id)
+        if record is None:
+            record = {"host": None, "client": {}, "painted": False}
+            self.pending[frame_id] = record
+            while len(self.pending) > self.MAX_PENDING:
+                _, old = self.pending.popitem(last=False)
+                if old["painted"]:
+                    self._add(old)
+        return record
+
+    # === Marks ===
+    def mark(self, frame_id: int, name: str, t_ms: float = None):
+        """
+        Records a client mark for a frame.
+
+        Args:
+            frame_id (int): Frame id.
+            name (str): Mark name (see STAGES).
+            t_ms (float, optional): Client wall time in ms, defaults to now.
+        """
+        if t_ms is None:
+            t_ms = wall_ms()
+        with self.lock:
+            self._record(frame_id)["client"][name] = t_ms
+
+    def host_trace(self, payload: dict):
+        """
+        Adds the host half of a frame's trace from a "frame_trace" packet.
+
+        Args:
+            payload (dict): The packet; marks are ms offsets from the capture time.
+        """
+        capture = payload["capture"]
+        encode_start, encode_end = payload["encode"]
+        send_first, send_last = payload["send"]
+        marks = {
+            "capture": capture,
+            "encode_start": capture + encode_start,
+            "encode_end": capture + encode_end,
+            "send_first": capture + send_first,
+            "send_last": capture + send_last,
+        }
+        with self.lock:
+            self.host_traces += 1
+            record = self._record(payload["frame_id"])
+            record["host"] = marks
+            if record["painted"]:
+                self._complete(payload["frame_id"])
+
+    def painted(self, frame_id: int):
+        """
+        Marks a frame as shown; its record completes now or when the host trace arrives.
+        """
+        with self.lock:
+            record = self.pending.get(frame_id)
+            if record is None:
+                return
+            record["painted"] = True
+            if record["host"] is not None:
+                self._complete(frame_id)
+
+    def _complete(self, frame_id: int):
+        """
+        Removes a finished frame from pending and adds it to the histograms.
+        """
+        self._add(self.pending.pop(frame_id))
+
+    def _add(self, record: dict):
+        """
+        Adds every measurable stage of a frame record to the histograms.
+        """
+        marks = dict(record["client"])
+        host = record["host"]
+        synced = self.clock is not None and self.clock.synced
+        if host is not None:
+            offset = self.clock.offset_at() if synced else 0.0
+            for name in HOST_MARKS:
+                marks[name] = host[name] - offset
+
+        for stage, (start, end) in STAGES.items():
+            if start in marks and end in marks:
+                if (start in HOST_MARKS) != (end in HOST_MARKS) and not synced:
+                    continue
+                self.histograms[stage].add(marks[end] - marks[start])
+        self.frames_traced += 1
+
+    # === Stats ===
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Stage name -> histogram stats.
+        """
+        with self.lock:
+            return {stage: histogram.stats() for stage, histogram in self.histograms.items()}
+
+    def format_stats(self) -> str:
+        """
+        Returns:
+            str: One line of p50/p95 per stage that has samples.
+        """
+        parts = []
+        for stage, s in self.stats().items():
+            if s["count"]:
+                parts.append(f"{stage} {s['p50_ms']:.1f}/{s['p95_ms']:.1f}")
+        return "p50/p95 ms: " + " | ".join(parts) if parts else "no traced frames"
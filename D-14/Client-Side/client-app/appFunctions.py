@@ -32,7 +32,8 @@ DEFAULT_SETTINGS = {
     "username": "",
     "password": "",
     "acceleration_curve": "linear",
-    "broadcast_port": 9999
+    "broadcast_port": 9999,
+    "host_control_port": 4444       # Probed by unicast discovery for hosts cached without a port
 }
 
 # === Keypress Page Class for Capturing Key Events ===
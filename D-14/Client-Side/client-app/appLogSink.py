@@ -0,0 +1,136 @@
+"""
+appLogSink.py
+
+Batched log pipeline between the app and the log widgets.
+
+Any thread can emit a record; emitting only appends a tuple to a bounded
+queue and never touches a widget. A UI timer drains the queue and hands each
+registered view the whole batch at once, so a view does one update per tick
+instead of one (plus a forced event loop pass) per record.
+
+Author: HalfasleepDev
+Created: 18-10-2026
+"""
+
+# === Imports ===
+import threading
+import time
+from collections import deque
+
+from PySide6.QtCore import QObject, QTimer
+
+# === Constants ===
+FLUSH_INTERVAL_MS = 100     # UI update rate for the log views
+QUEUE_CAPACITY = 10000      # Records held while the UI is busy; the oldest are dropped beyond this
+
+# === Class Definitions ===
+class LogSink(QObject):
+    """
+    Thread-safe log queue flushed to the views on a UI timer.
+
+    Attributes:
+        views (list[tuple]): (callback, levels) pairs. The callback gets a list of
+            (timestamp, level, message) records; levels is None for every level.
+        taps (list[Callable]): Called at emit time, on the emitting thread, with a
+            one-record list (for writers that must not wait for the UI timer).
+        emitted (int): Records queued.
+        flushed (int): Records handed to the views.
+        dropped (int): Records dropped because the queue was full.
+        batches (int): Non-empty flushes.
+        max_batch (int): Largest batch flushed.
+    """
+
+    def __init__(self, flush_interval_ms: int = FLUSH_INTERVAL_MS, capacity: int = QUEUE_CAPACITY, parent=None):
+        """
+        Initializes the sink and starts its flush timer (must be created on the UI thread).
+
+        Args:
+            flush_interval_ms (int): Milliseconds between flushes.
+            capacity (int): Queue size in records.
+            parent (QObject, optional): Qt parent.
+        """
+        super().__init__(parent)
+        self.capacity = capacity
+        self.queue = deque(maxlen=capacity)
+        self.lock = threading.Lock()
+        self.views = []
+        self.taps = []
+
+        self.emitted = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.batches = 0
+        self.max_batch = 0
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.flush)
+        self.timer.start(flush_interval_ms)
+
+    def add_view(self, callback, levels=None):
+        """
+        Registers a view.
+
+        Args:
+            callback (Callable): Called on the UI thread with a list of (timestamp, level, message).
+            levels (set[str], optional): Levels the view shows, every level if None.
+        """
+        self.views.append((callback, set(levels) if levels else None))
+
+    def add_tap(self, callback):
+        """
+        Registers a callback that receives every record as it is emitted.
+
+        Args:
+            callback (Callable): Thread-safe and cheap; called with a list holding one record.
+        """
+        self.taps.append(callback)
+
+    def emit(self, message: str, level: str = "INFO"):
+        """
+        Queues a record. Safe from any thread; never blocks on the UI.
+
+        Args:
+            message (str): Log text.
+            level (str): Log level (INFO, WARN, ERROR, DEBUG, BROADCAST, HANDSHAKE).
+        """
+        record = (time.time(), level.upper(), message)
+        with self.lock:
+            if len(self.queue) == self.capacity:
+                self.dropped += 1
+            self.queue.append(record)
+            self.emitted += 1
+        for tap in self.taps:
+            tap([record])
+
+    def flush(self):
+        """
+        Hands everything queued to the views (UI thread, timer slot).
+        """
+        with self.lock:
+            if not self.queue:
+                return
+            batch = list(self.queue)
+            self.queue.clear()
+
+        self.batches += 1
+        self.flushed += len(batch)
+        self.max_batch = max(self.max_batch, len(batch))
+
+        for callback, levels in self.views:
+            records = batch if levels is None else [record for record in batch if record[1] in levels]
+            if records:
+                callback(records)
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Emitted, flushed and dropped counts, batch count and largest batch.
+        """
+        return {
+            "emitted": self.emitted,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "max_batch": self.max_batch,
+            "queued": len(self.queue),
+        }
@@ -0,0 +1,327 @@
+"""
+appLogStore.py
+
+Compact, searchable in-memory store for the session log.
+
+Records are kept column by column: timestamps in a float array, level and
+category as small integer codes into lookup tables, and the message text in a
+list. A token index maps each lower-case word to the ascending row numbers it
+appears in, so a search intersects a few integer arrays instead of scanning
+every line. A search over a few new rows (a live view's append while a
+search is active) tokenizes just those rows instead, so it costs the same
+however large the store has grown. Views hold only row numbers (see LogListModel), so the level tabs
+and search results share one copy of the data.
+
+Author: HalfasleepDev
+Created: 18-10-2026
+"""
+
+# === Imports ===
+import re
+import time
+from array import array
+from bisect import bisect_left
+
+# === Constants ===
+MAX_ROWS = 200000           # Rows kept; the oldest quarter is dropped beyond this
+SCAN_MAX_ROWS = 4096        # Searches over at most this many rows scan them instead of the index
+TOKEN_PATTERN = re.compile(r"[0-9a-z_.:-]+|[^\s0-9a-z_.:-]")
+CATEGORY_PATTERN = re.compile(r"\[([A-Za-z0-9_-]+)\]")
+LINE_PATTERN = re.compile(r"^\[(\d{2}):(\d{2}):(\d{2})(?:\.(\d{3}))?\] \[([A-Z]+)\] ?(.*)$")
+
+# === Helper Functions ===
+def tokenize(text: str) -> list:
+    """
+    Splits text into lower-case search tokens.
+
+    Returns:
+        list[str]: Words (letters, digits, "_.:-") and single punctuation characters.
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+def intersect(left, right):
+    """
+    Intersects two ascending row arrays.
+    """
+    if len(left) > len(right):
+        left, right = right, left
+    result = array("I")
+    start = 0
+    for row in left:
+        start = bisect_left(right, row, start)
+        if start == len(right):
+            break
+        if right[start] == row:
+            result.append(row)
+    return result
+
+def format_clock(timestamp: float) -> str:
+    """
+    Returns:
+        str: hh:mm:ss.zzz of a wall clock timestamp.
+    """
+    return f"{time.strftime('%H:%M:%S', time.localtime(timestamp))}.{int(timestamp * 1000) % 1000:03d}"
+
+def parse_log_line(line: str, day_start: float) -> tuple | None:
+    """
+    Parses a saved "[hh:mm:ss.zzz] [LEVEL] message" line.
+
+    Args:
+        line (str): One line of a saved log.
+        day_start (float): Epoch time of midnight for the day the log is placed on.
+
+    Returns:
+        tuple | None: (timestamp, level, message), or None if the line has another format.
+    """
+    match = LINE_PATTERN.match(line)
+    if match is None:
+        return None
+    hours, minutes, seconds, millis, level, message = match.groups()
+    timestamp = day_start + int(hours) * 3600 + int(minutes) * 60 + int(seconds) + int(millis or 0) / 1000
+    return timestamp, level, message
+
+# === Class Definitions ===
+class LogStore:
+    """
+    Columnar log records with a token index.
+
+    Row numbers only grow; after old rows are dropped, `first_row` is the
+    number of the oldest row still kept.
+
+    Attributes:
+        timestamps (array): Wall clock time of each row.
+        levels (array): Level code of each row (index into level_names).
+        categories (array): Category code of each row (index into category_names).
+        messages (list[str]): Message text of each row.
+        level_names (list[str]): Level code -> name.
+        category_names (list[str]): Category code -> name ("" when the message has no [TAG]).
+        index (dict[str, array]): Token -> ascending row numbers.
+        first_row (int): Row number of the oldest kept row.
+    """
+
+    def __init__(self, max_rows: int = MAX_ROWS):
+        """
+        Initializes an empty store.
+
+        Args:
+            max_rows (int): Rows kept before the oldest quarter is dropped.
+        """
+        self.max_rows = max_rows
+        self.level_names = []
+        self.level_codes = {}
+        self.category_names = [""]
+        self.category_codes = {"": 0}
+        self.clear()
+
+    def clear(self):
+        """
+        Removes every row.
+        """
+        self.timestamps = array("d")
+        self.levels = array("B")
+        self.categories = array("H")
+        self.messages = []
+        self.index = {}
+        self.first_row = 0
+        self.scan_cache = (None, 0, 0, None)    # (tokens, first, end, rows) of the last scan
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    @property
+    def end_row(self) -> int:
+        """
+        Row number the next appended row gets.
+        """
+        return self.first_row + len(self.messages)
+
+    # === Appending ===
+    def _code(self, names: list, codes: dict, name: str) -> int:
+        code = codes.get(name)
+        if code is None:
+            code = len(names)
+            names.append(name)
+            codes[name] = code
+        return code
+
+    def extend(self, records) -> tuple:
+        """
+        Appends records.
+
+        Args:
+            records (Iterable): (timestamp, level, message) tuples.
+
+        Returns:
+            tuple[int, int]: (first, end) row numbers of the appended rows; (0, 0) if
+            old rows were dropped to make room, meaning views must be rebuilt.
+        """
+        first = self.end_row
+        index = self.index
+        for timestamp, level, message in records:
+            row = self.end_row
+            category = CATEGORY_PATTERN.match(message)
+            self.timestamps.append(timestamp)
+            self.levels.append(self._code(self.level_names, self.level_codes, level))
+            self.categories.append(self._code(self.category_names, self.category_codes,
+                                              category.group(1).upper() if category else ""))
+            self.messages.append(message)
+
+            for token in set(tokenize(message)):
+                postings = index.get(token)
+                if postings is None:
+                    postings = index[token] = array("I")
+                postings.append(row)
+
+        if len(self.messages) > self.max_rows:
+            self.trim(len(self.messages) - self.max_rows * 3 // 4)
+            return 0, 0
+        return first, self.end_row
+
+    def trim(self, count: int):
+        """
+        Drops the oldest rows and rebuilds the index.
+
+        Args:
+            count (int): Rows to drop.
+        """
+        self.first_row += count
+        del self.timestamps[:count]
+        del self.levels[:count]
+        del self.categories[:count]
+        del self.messages[:count]
+
+        self.index = {}
+        for offset, message in enumerate(self.messages):
+            row = self.first_row + offset
+            for token in set(tokenize(message)):
+                postings = self.index.get(token)
+                if postings is None:
+                    postings = self.index[token] = array("I")
+                postings.append(row)
+
+    # === Reading ===
+    def record(self, row: int) -> tuple:
+        """
+        Returns:
+            tuple: (timestamp, level, category, message) of a row.
+        """
+        offset = row - self.first_row
+        return (self.timestamps[offset], self.level_names[self.levels[offset]],
+                self.category_names[self.categories[offset]], self.messages[offset])
+
+    def level(self, row: int) -> str:
+        return self.level_names[self.levels[row - self.first_row]]
+
+    def format_row(self, row: int) -> str:
+        """
+        Returns:
+            str: The row as a "[hh:mm:ss.zzz] [LEVEL] message" line.
+        """
+        offset = row - self.first_row
+        return (f"[{format_clock(self.timestamps[offset])}] "
+                f"[{self.level_names[self.levels[offset]]}] {self.messages[offset]}")
+
+    # === Queries ===
+    def search(self, text: str):
+        """
+        Rows containing every token of the text (each token matches as a word prefix).
+
+        Args:
+            text (str): Search text.
+
+        Returns:
+            array | None: Ascending row numbers, or None for an empty search (every row).
+        """
+        tokens = tokenize(text)
+        if not tokens:
+            return None
+
+        result = None
+        for token in set(tokens):
+            postings = self.index.get(token)
+            matches = [p for word, p in self.index.items() if word.startswith(token) and word != token]
+            if postings is not None:
+                matches.append(postings)
+            if not matches:
+                return array("I")
+
+            rows = matches[0] if len(matches) == 1 else array("I", sorted(set().union(*matches)))
+            result = rows if result is None else intersect(result, rows)
+            if not result:
+                return array("I")
+        return result
+
+    def scan(self, text: str, first: int, end: int):
+        """
+        Rows in [first, end) containing every token of the text, found by tokenizing
+        those rows; the same matches search() gives, without touching the index.
+
+        The last scan is cached, since every level view appends the same new rows.
+
+        Args:
+            text (str): Search text.
+            first (int): First row number considered (at least first_row).
+            end (int): Row number to stop before.
+
+        Returns:
+            array | None: Ascending row numbers, or None for an empty search (every row).
+        """
+        tokens = frozenset(tokenize(text))
+        if not tokens:
+            return None
+        cached_tokens, cached_first, cached_end, cached_rows = self.scan_cache
+        if (cached_tokens, cached_first, cached_end) == (tokens, first, end):
+            return cached_rows
+
+        rows = array("I")
+        messages, base = self.messages, self.first_row
+        for row in range(first, end):
+            words = set(tokenize(messages[row - base]))
+            if all(any(word.startswith(token) for word in words) for token in tokens):
+                rows.append(row)
+        self.scan_cache = (tokens, first, end, rows)
+        return rows
+
+    def rows(self, levels=None, text: str = "", first: int = None, end: int = None):
+        """
+        Row numbers matching a level filter and a search, in order.
+
+        Args:
+            levels (set[str], optional): Levels to keep, every level if None.
+            text (str): Search text.
+            first (int, optional): First row number considered.
+            end (int, optional): Row number to stop before.
+
+        Returns:
+            array: Ascending row numbers.
+        """
+        first = self.first_row if first is None else max(first, self.first_row)
+        end = self.end_row if end is None else end
+        codes = None
+        if levels is not None:
+            codes = {self.level_codes[name] for name in levels if name in self.level_codes}
+
+        if end - first <= SCAN_MAX_ROWS:
+            matched = self.scan(text, first, max(first, end))
+        else:
+            matched = self.search(text)
+        if matched is None:
+            candidates = range(first, end)
+        else:
+            candidates = matched[bisect_left(matched, first):bisect_left(matched, end)]
+
+        if codes is None:
+            return array("I", candidates)
+        base, level_column = self.first_row, self.levels
+        return array("I", (row for row in candidates if level_column[row - base] in codes))
+
+    def memory_bytes(self) -> int:
+        """
+        Returns:
+            int: Rough size of the columns, messages and index.
+        """
+        columns = (self.timestamps.itemsize * len(self.timestamps) + len(self.levels)
+                   + self.categories.itemsize * len(self.categories))
+        messages = sum(len(message) for message in self.messages) + 8 * len(self.messages)
+        index = sum(postings.itemsize * len(postings) + len(token) for token, postings in self.index.items())
+        return columns + messages + index
@@ -0,0 +1,107 @@
+"""
+appRecentHosts.py
+
+Cache of the vehicle hosts this client has connected to, for unicast discovery.
+
+Each line of the cache file is "ip control_port last_success success_count";
+lines holding only an IP (the older recent_ips.txt format) are still read,
+with the default control port and no successes. Hosts are ranked by their
+last successful connection, so the most likely host is probed first.
+
+Author: HalfasleepDev
+Created: 18-10-2026
+"""
+
+# === Imports ===
+import os
+import time
+
+# === Constants ===
+MAX_RECENT_HOSTS = 10       # Entries kept in the cache file
+
+# === Class Definitions ===
+class RecentHosts:
+    """
+    Recently seen hosts with their last successful connection time.
+
+    Attributes:
+        path (str): Cache file path.
+        default_port (int): Control port assumed for entries that don't record one.
+        hosts (dict[str, dict]): IP -> {"port", "last_success", "successes"}, in file order.
+    """
+
+    def __init__(self, path: str, default_port: int):
+        """
+        Loads the cache file (a missing or unreadable file is an empty cache).
+
+        Args:
+            path (str): Cache file path.
+            default_port (int): Control port for legacy entries.
+        """
+        self.path = path
+        self.default_port = default_port
+        self.hosts = {}
+        self.load()
+
+    def load(self):
+        """
+        Reads the cache file.
+        """
+        self.hosts = {}
+        try:
+            with open(self.path, "r") as file:
+                lines = file.read().splitlines()
+        except OSError:
+            return
+
+        for line in lines:
+            fields = line.split()
+            if not fields or fields[0] in self.hosts:
+                continue
+            try:
+                port = int(fields[1]) if len(fields) > 1 else self.default_port
+                last_success = float(fields[2]) if len(fields) > 2 else 0.0
+                successes = int(fields[3]) if len(fields) > 3 else 0
+            except ValueError:
+                port, last_success, successes = self.default_port, 0.0, 0
+            self.hosts[fields[0]] = {"port": port, "last_success": last_success, "successes": successes}
+
+    def save(self):
+        """
+        Writes the cache file, most likely host first.
+        """
+        lines = [f"{ip} {entry['port']} {entry['last_success']:.0f} {entry['successes']}"
+                 for ip, entry in self.ranked()]
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "w") as file:
+                file.write("\n".join(lines) + "\n")
+        except OSError:
+            pass
+
+    def ranked(self) -> list:
+        """
+        Returns:
+            list[tuple[str, dict]]: (ip, entry) pairs, latest success first; entries
+            that never succeeded keep their file order after those that did.
+        """
+        order = {ip: i for i, ip in enumerate(self.hosts)}
+        return sorted(self.hosts.items(), key=lambda item: (-item[1]["last_success"], order[item[0]]))
+
+    def record_success(self, ip: str, port: int):
+        """
+        Notes a successful connection and saves the cache.
+
+        Args:
+            ip (str): Host IP.
+            port (int): Host control port.
+        """
+        entry = self.hosts.get(ip, {"port": port, "last_success": 0.0, "successes": 0})
+        entry["port"] = port
+        entry["last_success"] = time.time()
+        entry["successes"] += 1
+        self.hosts[ip] = entry
+
+        if len(self.hosts) > MAX_RECENT_HOSTS:
+            self.hosts = dict(self.ranked()[:MAX_RECENT_HOSTS])
+        self.save()
@@ -0,0 +1,251 @@
+"""
+appSessionLog.py
+
+Background writer for the per-session log file.
+
+Callers only hand over records (a lock and a list append, timed so the cost
+stays visible); this is registered as a LogSink tap, so records reach the
+writer as they are emitted rather than on the UI timer. A writer thread formats them and appends to the
+session file in batches. The file is rotated into numbered segments by size or
+age, and closed segments are gzip-compressed in the background. Pending records
+are written on normal exit and, with the crash handlers installed, on an
+unhandled exception together with its traceback.
+
+Author: HalfasleepDev
+Created: 18-10-2026
+"""
+
+# === Imports ===
+import atexit
+import gzip
+import os
+import shutil
+import sys
+import threading
+import time
+import traceback
+
+from appLogStore import format_clock
+
+# === Constants ===
+FLUSH_INTERVAL = 0.5            # Seconds between writes to disk
+MAX_SEGMENT_BYTES = 5 * 1024 * 1024
+MAX_SEGMENT_AGE = 30 * 60       # Seconds before a segment is rotated regardless of size
+
+# === Class Definitions ===
+class SessionLogWriter:
+    """
+    Appends log records to rotating, compressed session log segments.
+
+    Segments are named "<base>_001.log", "<base>_002.log", ...; every closed
+    segment becomes "<base>_NNN.log.gz".
+
+    Attributes:
+        base_path (str): Session file path without the ".log" extension.
+        max_bytes (int): Segment size that triggers rotation.
+        max_age (float): Segment age (s) that triggers rotation.
+        compress (bool): Gzip closed segments.
+        segment (int): Number of the current segment.
+        records_written (int): Records written to disk.
+        bytes_written (int): Bytes written to disk.
+        ui_calls (int): write() calls.
+        ui_time_total_us (float): Time spent inside write() (the cost to the logging threads, UI included).
+        ui_time_max_us (float): Longest write() call.
+    """
+
+    def __init__(self, session_path: str, max_bytes: int = MAX_SEGMENT_BYTES, max_age: float = MAX_SEGMENT_AGE,
+                 compress: bool = True, flush_interval: float = FLUSH_INTERVAL):
+        """
+        Starts the writer thread; the first segment is created with the first record.
+
+        Args:
+            session_path (str): Session log path (e.g. logs/session_<date>.log).
+            max_bytes (int): Segment size that triggers rotation.
+            max_age (float): Segment age in seconds that triggers rotation.
+            compress (bool): Gzip closed segments.
+            flush_interval (float): Seconds between writes to disk.
+        """
+        self.base_path = os.path.splitext(session_path)[0]
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compress = compress
+        self.flush_interval = flush_interval
+
+        self.lock = threading.Lock()           # Guards pending (held briefly by the UI thread)
+        self.write_lock = threading.Lock()     # Serializes disk writes (writer thread, exit, crash)
+        self.pending = []
+        self.file = None
+        self.segment = 0
+        self.segment_bytes = 0
+        self.segment_opened = 0.0
+        self.compressing = []
+
+        self.records_written = 0
+        self.bytes_written = 0
+        self.write_errors = 0
+        self.ui_calls = 0
+        self.ui_time_total_us = 0.0
+        self.ui_time_max_us = 0.0
+
+        self.wakeup = threading.Event()
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="session-log", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    # === UI Side ===
+    def write(self, records):
+        """
+        Queues records (LogSink tap, any thread). Never touches the disk.
+
+        Args:
+            records (list): (timestamp, level, message) tuples.
+        """
+        start = time.perf_counter()
+        with self.lock:
+            self.pending.extend(records)
+        elapsed_us = (time.perf_counter() - start) * 1e6
+        self.ui_calls += 1
+        self.ui_time_total_us += elapsed_us
+        self.ui_time_max_us = max(self.ui_time_max_us, elapsed_us)
+
+    def close(self):
+        """
+        Writes everything pending, closes and compresses the last segment, and stops the thread.
+        """
+        if not self.running:
+            return
+        self.running = False
+        self.wakeup.set()
+        if self.thread is not threading.current_thread():
+            self.thread.join(5.0)
+        self.flush()
+        with self.write_lock:
+            self._close_segment()
+        for worker in self.compressing:
+            worker.join(5.0)
+
+    def install_crash_handlers(self):
+        """
+        Writes pending records and the traceback when an exception goes unhandled,
+        on the main thread or any other thread.
+        """
+        previous_hook = sys.excepthook
+        previous_thread_hook = threading.excepthook
+
+        def on_crash(exc_type, exc_value, exc_traceback, thread_name):
+            details = "".join(traceback.format_exception(exc_type, exc_value, exc_traceback)).rstrip()
+            with self.lock:
+                self.pending.append((time.time(), "ERROR", f"[CRASH] Unhandled exception in {thread_name}:\n{details}"))
+            self.flush()
+
+        def excepthook(exc_type, exc_value, exc_traceback):
+            on_crash(exc_type, exc_value, exc_traceback, "main thread")
+            previous_hook(exc_type, exc_value, exc_traceback)
+
+        def thread_excepthook(args):
+            if args.exc_type is not SystemExit:
+                thread_name = args.thread.name if args.thread is not None else "thread"
+                on_crash(args.exc_type, args.exc_value, args.exc_traceback, thread_name)
+            previous_thread_hook(args)
+
+        sys.excepthook = excepthook
+        threading.excepthook = thread_excepthook
+
+    # === Writer Thread ===
+    def run(self):
+        """
+        Writer loop: write the pending batch every flush interval.
+        """
+        while self.running:
+            self.wakeup.wait(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """
+        Formats and writes every pending record, rotating the segment when it is due.
+        """
+        with self.write_lock:
+            with self.lock:
+                if not self.pending:
+                    return
+                batch = self.pending
+                self.pending = []
+
+            text = "".join(f"[{format_clock(timestamp)}] [{level}] {message}\n" for timestamp, level, message in batch)
+            data = text.encode("utf-8")
+
+            try:
+                if self.file is None or self._rotation_due():
+                    self._open_segment()
+                self.file.write(data)
+                self.file.flush()
+            except OSError:
+                self.write_errors += 1
+                return
+            self.segment_bytes += len(data)
+            self.bytes_written += len(data)
+            self.records_written += len(batch)
+
+    def _rotation_due(self) -> bool:
+        return self.segment_bytes >= self.max_bytes or time.monotonic() - self.segment_opened >= self.max_age
+
+    def _segment_path(self, segment: int) -> str:
+        return f"{self.base_path}_{segment:03d}.log"
+
+    def _open_segment(self):
+        """
+        Closes the current segment (compressing it) and opens the next one.
+        """
+        self._close_segment()
+        os.makedirs(os.path.dirname(self.base_path) or ".", exist_ok=True)
+        self.segment += 1
+        self.file = open(self._segment_path(self.segment), "ab")
+        self.segment_bytes = 0
+        self.segment_opened = time.monotonic()
+
+    def _close_segment(self):
+        if self.file is None:
+            return
+        path = self.file.name
+        self.file.close()
+        self.file = None
+        if self.compress:
+            # Compressing a full segment takes a while; keep it off the writer loop too
+            worker = threading.Thread(target=compress_segment, args=(path,), name="session-log-gzip", daemon=True)
+            worker.start()
+            self.compressing = [w for w in self.compressing if w.is_alive()] + [worker]
+
+    # === Stats ===
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Records and bytes written, segment number, pending records and the UI thread's cost.
+        """
+        with self.lock:
+            pending = len(self.pending)
+        return {
+            "records_written": self.records_written,
+            "bytes_written": self.bytes_written,
+            "segment": self.segment,
+            "pending": pending,
+            "write_errors": self.write_errors,
+            "ui_calls": self.ui_calls,
+            "ui_avg_us": round(self.ui_time_total_us / self.ui_calls, 2) if self.ui_calls else 0.0,
+            "ui_max_us": round(self.ui_time_max_us, 2),
+        }
+
+# === Helper Functions ===
+def compress_segment(path: str):
+    """
+    Gzips a closed segment and removes the original.
+
+    Args:
+        path (str): Segment file path.
+    """
+    try:
+        with open(path, "rb") as source, gzip.open(path + ".gz", "wb") as target:
+            shutil.copyfileobj(source, target)
+        os.remove(path)
+    except OSError:
+        pass
@@ -8,11 +8,14 @@ Created: 18-04-2025
 """
 
 import sys
+import html
+import time
 import requests
 from bs4 import BeautifulSoup
 import webbrowser
 import math
 import json
+from array import array
 import numpy as np
 import matplotlib.pyplot as plt
 from io import BytesIO
@@ -23,20 +26,45 @@ from PySide6.QtWidgets import (
     QScrollArea, QFrame, QHBoxLayout,QTextEdit,QFileDialog, 
     QTabWidget, QSplitter, QSizePolicy, QLineEdit,QGroupBox,
     QDoubleSpinBox, QFormLayout, QSlider, QSpinBox, QSpacerItem,
-    QTextBrowser, QLayout)
+    QTextBrowser, QLayout, QListView)
 
-from PySide6.QtCore import Qt, QTimer, QDateTime, QSize, QRectF, Signal
+from PySide6.QtCore import Qt, QTimer, QDateTime, QSize, QRectF, Signal, QAbstractListModel, QModelIndex
 
 from PySide6.QtGui import (QFont, QTextCursor, QPainter, QColor,
     QConicalGradient, QPen, QPainterPath, QIcon, QPixmap, QImage)
 
 from appFunctions import DEFAULT_SETTINGS
+from appLogStore import LogStore, parse_log_line
 
 import os
 
 os.environ["QT_QPA_PLATFORM"] = "xcb"
 os.environ["QT_SCALE_FACTOR"] = "0.95"
 
+# === Helper Functions ===
+def append_lines(editor: QTextEdit, lines, scroll: bool = True):
+    """
+    Appends HTML lines to a text view as one edit, so the document is laid out once.
+
+    @param editor: The QTextEdit to append to (its maximumBlockCount caps the lines kept).
+    @param lines: HTML strings, one per line.
+    @param scroll: Scroll to the newest line afterwards.
+    """
+    cursor = QTextCursor(editor.document())
+    cursor.movePosition(QTextCursor.End)
+    cursor.beginEditBlock()
+    first = editor.document().isEmpty()
+    for line in lines:
+        if not first:
+            cursor.insertBlock()
+        first = False
+        cursor.insertHtml(line)
+    cursor.endEditBlock()
+
+    if scroll:
+        scroll_bar = editor.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.maximum())
+
 
 class GitHubInfoPanel(QWidget):
     """
@@ -208,7 +236,22 @@ class SystemLogViewer(QWidget):
     """
     A tabbed system log viewer for categorized logging during a session.
     Includes searching, saving, and loading logs.
+
+    Records live once in a columnar LogStore with a token index. Each level
+    tab is a QListView over its own LogListModel, which holds only row numbers
+    and renders only the visible rows. Searching filters every tab to the
+    matching rows.
     """
+
+    COLOR_MAP = {  # <--- TODO: FIX FOR MAIN APP
+        "BROADCAST": "#ff53b9",
+        "HANDSHAKE": "#3dfee5",
+        "INFO": "#e0e0e0",
+        "WARN": "#ffcc00",
+        "ERROR": "#ff4444",
+        "DEBUG": "#00c8ff"
+    }
+
     def __init__(self):
         super().__init__()
 
@@ -222,7 +265,7 @@ class SystemLogViewer(QWidget):
                 color: #1e1e21;
                 font-family: Adwaita Sans;
             }
-            QTextEdit {
+            QListView {
                 background-color: #1e1e21;
                 color: #f1f3f3;
                 font-family: Adwaita Mono;
@@ -329,17 +372,23 @@ class SystemLogViewer(QWidget):
         top_layout.addWidget(self.status,0, Qt.AlignmentFlag.AlignCenter)
 
         # === LEFT TAB BAR ===
+        # Every tab is a virtualized list over the same store, filtered by level
+        self.store = LogStore()
         self.tabs = QTabWidget()
         self.tabs.setTabPosition(QTabWidget.West)
-        self.tab_editors = {}
+        self.tab_models = {}
+        self.tab_views = {}
 
         for tag in ["ALL", "BROADCAST", "HANDSHAKE", "INFO", "WARN", "ERROR", "DEBUG"]: # <--- TODO: FIX FOR MAIN APP
-            editor = QTextEdit()
-            editor.setReadOnly(True)
-            editor.setLineWrapMode(QTextEdit.NoWrap)
-            editor.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-            self.tabs.addTab(editor, tag)
-            self.tab_editors[tag] = editor
+            model = LogListModel(self.store, None if tag == "ALL" else {tag}, self.COLOR_MAP, self)
+            view = QListView()
+            view.setModel(model)
+            view.setUniformItemSizes(True)      # Row height is never measured per row
+            view.setSelectionMode(QListView.ExtendedSelection)
+            view.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+            self.tabs.addTab(view, tag)
+            self.tab_models[tag] = model
+            self.tab_views[tag] = view
 
         # === CONTROL BUTTONS ===
         self.clear_btn = QPushButton("Clear")
@@ -406,41 +455,35 @@ class SystemLogViewer(QWidget):
         @param message: The log message text.
         @param level: Log level (INFO, WARN, ERROR, DEBUG).
         """
-        timestamp = QDateTime.currentDateTime().toString("hh:mm:ss.zzz")
-        entry = f"[{timestamp}] [{level.upper()}] {message}"
-
-        color_map = {  # <--- TODO: FIX FOR MAIN APP
-            "BROADCAST": "#ff53b9",
-            "HANDSHAKE": "#3dfee5",
-            "INFO": "#e0e0e0",
-            "WARN": "#ffcc00",
-            "ERROR": "#ff4444",
-            "DEBUG": "#00c8ff"
-        }
-        color = color_map.get(level.upper(), "#e0e0e0") # <--- TODO: FIX FOR MAIN APP
-
-        # HTML formatted line
-        html_entry = f"<span style='color:{color}'>{entry}</span>"
+        self.log_batch([(time.time(), level.upper(), message)])
 
-        # Add to ALL tab and specific category
-        self.tab_editors["ALL"].append(html_entry)
-        if level.upper() in self.tab_editors:
-            self.tab_editors[level.upper()].append(html_entry)
+    def log_batch(self, records):
+        """
+        Appends a batch of log records to the store and to every tab's rows.
 
-        """# Save raw entry to log file
-        with open(self.session_log_path, "a", encoding="utf-8") as f:
-            f.write(entry + "\n")"""
+        @param records: List of (timestamp, level, message) tuples, level in upper case.
+        """
+        view = self.tabs.currentWidget()
+        scroll_bar = view.verticalScrollBar()
+        at_bottom = scroll_bar.value() >= scroll_bar.maximum()
+
+        first, end = self.store.extend(records)
+        for model in self.tab_models.values():
+            if end:
+                model.append_rows(first, end)
+            else:
+                model.refresh()     # The store dropped its oldest rows
 
-        if self.auto_scroll:
-            current_editor = self.tab_editors[self.tabs.tabText(self.tabs.currentIndex())]
-            current_editor.moveCursor(QTextCursor.End)
+        if self.auto_scroll and at_bottom:
+            view.scrollToBottom()
 
     def clear_logs(self):
         """
         Clears all logs from the UI.
         """
-        for editor in self.tab_editors.values():
-            editor.clear()
+        self.store.clear()
+        for model in self.tab_models.values():
+            model.refresh()
 
     def save_logs(self):
         """
@@ -448,9 +491,9 @@ class SystemLogViewer(QWidget):
         """
         file_path, _ = QFileDialog.getSaveFileName(self, "Save Logs As", self.log_dir, "Log Files (*.log)")
         if file_path:
-            content = self.tab_editors["ALL"].toPlainText()
             with open(file_path, "w", encoding="utf-8") as f:
-                f.write(content)
+                for row in range(self.store.first_row, self.store.end_row):
+                    f.write(self.store.format_row(row) + "\n")
 
     def load_logs(self):
         """
@@ -458,57 +501,93 @@ class SystemLogViewer(QWidget):
         """
         file_path, _ = QFileDialog.getOpenFileName(self, "Load Log File", self.log_dir, "Log Files (*.log)")
         if file_path:
+            day_start = time.mktime(datetime.fromtimestamp(os.path.getmtime(file_path)).date().timetuple())
+            records = []
             with open(file_path, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-
-            self.clear_logs()   # # <--- TODO: FIX FOR MAIN APP
-            for line in lines:
-                level = "BROADCAST"
-                if "[HANDSHAKE]" in line:
-                    level = "HANDSHAKE"
-                if "[INFO]" in line:
-                    level = "INFO"
-                if "[ERROR]" in line:
-                    level = "ERROR"
-                elif "[WARN]" in line:
-                    level = "WARN"
-                elif "[DEBUG]" in line:
-                    level = "DEBUG"
-                self.log(line.strip(), level=level)
+                for line in f:
+                    line = line.rstrip("\n")
+                    if not line:
+                        continue
+                    record = parse_log_line(line, day_start)
+                    if record is None:
+                        # Not a saved viewer line: keep it whole under the level it mentions
+                        level = next((tag for tag in self.tab_models if f"[{tag}]" in line), "INFO")
+                        record = (day_start, level, line)
+                    records.append(record)
+
+            # Loaded in one go, straight into the store
+            self.store.clear()
+            self.store.extend(records)
+            for model in self.tab_models.values():
+                model.refresh()
     
     def apply_search(self, text):
         """
-        Filters and highlights matching text in the log viewer.
+        Filters every tab to the rows matching the search.
         
-        @param text: Search string to highlight in logs.
+        @param text: Search string; every word must appear (as a word prefix) in a row.
         """
-        current_tab = self.tabs.tabText(self.tabs.currentIndex())
-        editor = self.tab_editors[current_tab]
+        for model in self.tab_models.values():
+            model.set_search(text)
 
-        cursor = editor.textCursor()
-        document = editor.document()
-
-        # Reset formatting across the whole document
-        #cursor.select(QTextCursor.Document)
-        #cursor.setCharFormat(editor.currentCharFormat())
+class LogListModel(QAbstractListModel):
+    """
+    List model over a LogStore, filtered by level and search text.
 
-        if not text:
-            return  # Nothing to highlight
+    Holds only the matching row numbers; the text of a row is formatted when
+    the view asks for it, which with uniform item sizes is only for visible rows.
+    """
+    def __init__(self, store, levels=None, colors=None, parent=None):
+        """
+        @param store: The shared LogStore.
+        @param levels: Set of levels shown, every level if None.
+        @param colors: Level -> color name for the row text.
+        @param parent: Qt parent.
+        """
+        super().__init__(parent)
+        self.store = store
+        self.levels = levels
+        self.search = ""
+        self.colors = {level: QColor(color) for level, color in (colors or {}).items()}
+        self.default_color = QColor("#e0e0e0")
+        self.row_ids = array("I")
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.row_ids)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.row_ids[index.row()]
+        if role == Qt.DisplayRole:
+            return self.store.format_row(row)
+        if role == Qt.ForegroundRole:
+            return self.colors.get(self.store.level(row), self.default_color)
+        return None
 
-        # Highlight matches
-        #highlight_format = editor.currentCharFormat()
-        #highlight_format.setBackground(Qt.yellow)
+    def append_rows(self, first, end):
+        """
+        Adds the matching rows among newly stored rows [first, end).
+        """
+        new_rows = self.store.rows(self.levels, self.search, first, end)
+        if not new_rows:
+            return
+        count = len(self.row_ids)
+        self.beginInsertRows(QModelIndex(), count, count + len(new_rows) - 1)
+        self.row_ids.extend(new_rows)
+        self.endInsertRows()
 
-        # Start searching from the top
-        cursor = document.find(text, 0)
-        match_found = False
+    def refresh(self):
+        """
+        Recomputes every matching row.
+        """
+        self.beginResetModel()
+        self.row_ids = self.store.rows(self.levels, self.search)
+        self.endResetModel()
 
-        while not cursor.isNull():
-            #cursor.mergeCharFormat(highlight_format)
-            if not match_found:
-                editor.setTextCursor(cursor)  # Scroll to first match
-                match_found = True
-            cursor = document.find(text, cursor.position())
+    def set_search(self, text):
+        self.search = text
+        self.refresh()
 
 class ServoCenterTuner(QGroupBox):
     """
@@ -1203,6 +1282,8 @@ class LogConsoleWidget(QWidget):
     """
     A compact log viewer widget with scrollable text output and a clear button.
     """
+    MAX_LINES = 500     # Lines kept in the console
+
     def __init__(self):
         super().__init__()
         self.setMinimumSize(200, 200)
@@ -1222,6 +1303,7 @@ class LogConsoleWidget(QWidget):
         # === Scrollable log viewer ===
         self.log_output = QTextEdit(self)
         self.log_output.setReadOnly(True)
+        self.log_output.document().setMaximumBlockCount(self.MAX_LINES)
         self.log_output.setFont(QFont("Adwaita Mono", 10)) # TODO: Fix fornt for Ver 1.2
         # TODO: Fix the border-radius for Ver 1.2
         self.log_output.setStyleSheet("""
@@ -1284,10 +1366,23 @@ class LogConsoleWidget(QWidget):
 
         @param message: Text to display in the log console.
         """
-        self.log_output.append(message)
-        self.log_output.verticalScrollBar().setValue(
-            self.log_output.verticalScrollBar().maximum()
-        )
+        self.add_logs([message])
+
+    def add_logs(self, messages):
+        """
+        Append several log messages with a single repaint and scroll.
+
+        @param messages: Lines to display in the log console.
+        """
+        append_lines(self.log_output, [html.escape(message) for message in messages], scroll=True)
+
+    def add_logs_batch(self, records):
+        """
+        Append a batch of log sink records as "[LEVEL] message" lines.
+
+        @param records: List of (timestamp, level, message) tuples.
+        """
+        self.add_logs([f"[{level}] {message}" for _, level, message in records])
 
     def clear_logs(self):
         """
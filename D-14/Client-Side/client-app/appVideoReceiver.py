@@ -0,0 +1,675 @@
+"""
+appVideoReceiver.py
+
+Receives binary video datagrams and reassembles chunked JPEG frames.
+
+Packets are read with recv_into into one reusable packet buffer, and each chunk
+payload is copied once, straight to its offset inside a preallocated frame
+buffer taken from a pool. Completed frames are handed out as memoryviews so the
+JPEG decoder reads the pool buffer directly.
+
+When the host sends XOR parity (FEC), parity chunks are stored after the data
+in the same frame buffer, and a group with exactly one missing chunk is rebuilt
+in place as soon as the parity and the other chunks of the group are present.
+
+Author: HalfasleepDev
+Created: 18-10-2026
+"""
+
+# === Imports ===
+import json
+import time
+from collections import deque
+
+import numpy as np
+
+from udpProtocols import (parse_video_chunk, receiver_report_packet, video_tune_packet, video_fec_group,
+                          VIDEO_FLAG_PARITY, VIDEO_FLAG_ANALYSIS, VIDEO_FLAGS_OFFSET, VIDEO_FEC_HEADER)
+
+# === Constants ===
+FRAME_ID_MASK = 0xFFFFFFFF
+FRAME_ID_HALF = 0x80000000
+
+PACKET_BUFFER_SIZE = 65536
+FRAME_BUFFER_SIZE = 262144      # 256 KB, well above a 720p JPEG at quality 40
+ZERO_PAD = bytes(PACKET_BUFFER_SIZE)
+
+# === Helper Functions ===
+def is_newer_frame(frame_id: int, reference_id: int) -> bool:
+    """
+    Compares two frame ids, allowing for 32-bit wraparound.
+
+    Args:
+        frame_id (int): The frame id being checked.
+        reference_id (int): The frame id it is compared against.
+
+    Returns:
+        bool: True if frame_id comes after reference_id.
+    """
+    diff = (frame_id - reference_id) & FRAME_ID_MASK
+    return diff != 0 and diff < FRAME_ID_HALF
+
+def fec_groups(chunk_count: int, group_size: int) -> int:
+    """
+    Returns:
+        int: Number of parity groups for a frame, 0 without FEC.
+    """
+    return (chunk_count + group_size - 1) // group_size if group_size else 0
+
+# === Class Definitions ===
+class FrameBufferPool:
+    """
+    A fixed set of reusable per-frame byte arrays.
+
+    Attributes:
+        capacity (int): Size of each buffer in bytes.
+        free (list): Buffers ready to be handed out.
+        allocations (int): Buffers allocated after start-up (pool exhausted or frame too large).
+    """
+
+    def __init__(self, count: int, capacity: int = FRAME_BUFFER_SIZE):
+        """
+        Preallocates the buffers.
+
+        Args:
+            count (int): Number of buffers to create up front.
+            capacity (int): Size of each buffer in bytes.
+        """
+        self.capacity = capacity
+        self.free = [bytearray(capacity) for _ in range(count)]
+        self.allocations = 0
+
+    def acquire(self, size: int) -> bytearray:
+        """
+        Takes a buffer that can hold at least `size` bytes.
+
+        Args:
+            size (int): Bytes needed.
+
+        Returns:
+            bytearray: A buffer from the pool, or a new one if none fit.
+        """
+        if self.free and size <= self.capacity:
+            return self.free.pop()
+        self.allocations += 1
+        return bytearray(max(size, self.capacity))
+
+    def release(self, buffer: bytearray):
+        """
+        Returns a buffer to the pool.
+
+        Args:
+            buffer (bytearray): The buffer to reuse.
+        """
+        if len(buffer) == self.capacity:
+            self.free.append(buffer)
+
+class PartialFrame:
+    """
+    A frame that is still collecting chunks.
+
+    Attributes:
+        frame_id (int): Frame id from the datagram header.
+        chunk_count (int): Number of chunks the frame was split into.
+        chunk_size (int): Payload stride; chunk i starts at i * chunk_size.
+        buffer (bytearray): Pool buffer the chunks are written into, parity chunks after the data.
+        present (bytearray): 1 for each chunk index already received.
+        received (int): Number of unique chunks received (or recovered) so far.
+        length (int): Frame length in bytes, known once the last chunk or any parity chunk arrives.
+        timestamp (int): Host capture time in ms.
+        first_seen (float): Monotonic time the first chunk arrived.
+        bytes_copied (int): Payload bytes copied into the buffer for this frame.
+        fec_group (int): Data chunks per parity chunk, 0 without FEC.
+        parity_present (bytearray): 1 for each group whose parity chunk arrived.
+        rebuilt (bytearray): 1 for each chunk index rebuilt from parity (until its original arrives).
+        recovered (int): Chunks rebuilt from parity whose original hasn't arrived.
+    """
+    __slots__ = ("frame_id", "chunk_count", "chunk_size", "buffer", "present", "received",
+                 "length", "timestamp", "first_seen", "bytes_copied",
+                 "fec_group", "parity_present", "rebuilt", "recovered")
+
+    def __init__(self, frame_id: int, chunk_count: int, chunk_size: int, buffer: bytearray,
+                 timestamp: int, first_seen: float, fec_group: int = 0):
+        self.frame_id = frame_id
+        self.chunk_count = chunk_count
+        self.chunk_size = chunk_size
+        self.buffer = buffer
+        self.present = bytearray(chunk_count)
+        self.received = 0
+        self.length = 0
+        self.timestamp = timestamp
+        self.first_seen = first_seen
+        self.bytes_copied = 0
+        self.fec_group = fec_group
+        self.parity_present = bytearray(fec_groups(chunk_count, fec_group))
+        self.rebuilt = bytearray(chunk_count) if fec_group else None
+        self.recovered = 0
+
+class FrameReassembler:
+    """
+    Reassembles several frames at once from chunks arriving in any order.
+
+    Chunks are written directly into pooled frame buffers. Partial frames are
+    expired once they are older than the deadline, and only frames newer than the
+    last emitted frame are returned.
+
+    A completed frame is returned as a memoryview into its pool buffer. The view
+    stays valid until the next call to push(), which recycles the buffer.
+
+    Attributes:
+        frame_deadline (float): Seconds a partial frame may wait for missing chunks.
+        max_pending (int): Maximum number of frames reassembled at the same time.
+        pool (FrameBufferPool): Preallocated frame buffers.
+        frames_completed (int): Frames fully reassembled and returned.
+        frames_expired (int): Partial frames dropped by the deadline or pending limit.
+        frames_stale (int): Partial frames dropped because a newer frame completed first.
+        chunks_received (int): Valid chunks accepted.
+        chunks_duplicate (int): Chunks received twice for the same frame.
+        chunks_lost (int): Chunks missing from expired frames.
+        chunks_late (int): Chunks that arrived for an already returned or expired frame.
+        chunks_recovered (int): Missing chunks rebuilt from FEC parity, less those whose original arrived
+                                later (counted once their frame completes or is dropped).
+        parity_received (int): FEC parity chunks accepted.
+        frames_recovered (int): Completed frames that needed at least one recovered chunk.
+        packets_invalid (int): Datagrams that failed header validation.
+        last_frame_bytes (int): Size of the last completed frame.
+        last_frame_copied (int): Bytes copied while building the last completed frame.
+        last_first_seen (float): Monotonic time the first chunk of the last completed frame arrived.
+    """
+
+    def __init__(self, frame_deadline_ms: int = 250, max_pending: int = 8, buffer_size: int = FRAME_BUFFER_SIZE):
+        """
+        Initializes the reassembler and its buffer pool.
+
+        Args:
+            frame_deadline_ms (int): Deadline in ms before a partial frame is dropped.
+            max_pending (int): Maximum number of frames being reassembled at once.
+            buffer_size (int): Size of each pooled frame buffer.
+        """
+        self.frame_deadline = frame_deadline_ms / 1000.0
+        self.max_pending = max_pending
+
+        # One extra buffer for the frame currently handed out to the decoder
+        self.pool = FrameBufferPool(max_pending + 1, buffer_size)
+        self.held = None
+
+        self.pending = {}
+        self.last_emitted_id = None
+        self.dropped_ids = deque(maxlen=32)    # Recently dropped frames, so late chunks don't restart them
+        self.rebuilt_ids = deque(maxlen=32)    # Recently finished frames with rebuilt chunks (see rebuilt)
+        self.rebuilt = {}                      # Frame id -> its PartialFrame.rebuilt, for originals arriving late
+
+        # === Counters ===
+        self.frames_completed = 0
+        self.frames_expired = 0
+        self.frames_stale = 0
+        self.chunks_received = 0
+        self.chunks_duplicate = 0
+        self.chunks_lost = 0
+        self.chunks_late = 0
+        self.chunks_recovered = 0
+        self.parity_received = 0
+        self.frames_recovered = 0
+        self.packets_invalid = 0
+
+        # === Copy Accounting ===
+        self.bytes_copied = 0
+        self.bytes_completed = 0
+        self.last_frame_bytes = 0
+        self.last_frame_copied = 0
+        self.last_first_seen = 0.0
+
+        # --- Completeness of the most recent frames (1.0 = every chunk arrived) ---
+        self.completeness = deque(maxlen=120)
+
+    def push(self, data, now: float = None):
+        """
+        Writes a datagram's payload into its frame and returns the frame once it is complete.
+
+        Args:
+            data (bytes | memoryview): Raw video datagram.
+            now (float, optional): Monotonic time, defaults to time.monotonic().
+
+        Returns:
+            tuple | None: (frame_id, timestamp, memoryview) for a completed frame, otherwise None.
+        """
+        # --- Recycle the buffer of the previously returned frame ---
+        if self.held is not None:
+            self.pool.release(self.held)
+            self.held = None
+
+        if now is None:
+            now = time.monotonic()
+
+        self.expire(now)
+
+        parsed = parse_video_chunk(data)
+        if parsed is None:
+            self.packets_invalid += 1
+            return None
+
+        frame_id, chunk_index, chunk_count, chunk_size, timestamp, flags, payload = parsed
+
+        # --- Drop chunks of frames that are older than what has been shown ---
+        if (self.last_emitted_id is not None and not is_newer_frame(frame_id, self.last_emitted_id)) \
+                or frame_id in self.dropped_ids:
+            self.chunks_late += 1
+            rebuilt = self.rebuilt.get(frame_id)
+            if rebuilt is not None and not flags & VIDEO_FLAG_PARITY and chunk_index < len(rebuilt) \
+                    and rebuilt[chunk_index]:
+                # Reordered, not lost: the original of a rebuilt chunk turned up after all
+                rebuilt[chunk_index] = 0
+                self.chunks_recovered -= 1
+            return None
+
+        fec_group = video_fec_group(flags)
+
+        frame = self.pending.get(frame_id)
+        if frame is None:
+            if len(self.pending) >= self.max_pending:
+                self._drop(min(self.pending.values(), key=lambda f: f.first_seen))
+            # Parity chunks live after the data, one chunk_size slot per group
+            buffer = self.pool.acquire((chunk_count + fec_groups(chunk_count, fec_group)) * chunk_size)
+            frame = PartialFrame(frame_id, chunk_count, chunk_size, buffer, timestamp, now, fec_group)
+            self.pending[frame_id] = frame
+        elif frame.chunk_count != chunk_count or frame.chunk_size != chunk_size or frame.fec_group != fec_group:
+            self.packets_invalid += 1
+            return None
+
+        if flags & VIDEO_FLAG_PARITY:
+            group = self._push_parity(frame, chunk_index, payload)
+        else:
+            group = self._push_data(frame, chunk_index, payload)
+        if group is None:
+            return None
+
+        if frame.fec_group:
+            self._recover(frame, group)
+
+        if frame.received < frame.chunk_count:
+            return None
+
+        # --- Frame complete ---
+        del self.pending[frame_id]
+        self.completeness.append(1.0)
+        self.frames_completed += 1
+        if frame.recovered:
+            self.chunks_recovered += frame.recovered
+            self.frames_recovered += 1
+            self._remember_rebuilt(frame)
+        self.last_emitted_id = frame_id
+
+        self.bytes_copied += frame.bytes_copied
+        self.bytes_completed += frame.length
+        self.last_frame_bytes = frame.length
+        self.last_frame_copied = frame.bytes_copied
+        self.last_first_seen = frame.first_seen
+
+        # Anything still pending that is older than this frame will never be shown
+        for old in [f for f in self.pending.values() if not is_newer_frame(f.frame_id, frame_id)]:
+            self._drop(old, stale=True)
+
+        self.held = frame.buffer
+        return frame_id, frame.timestamp, memoryview(frame.buffer)[:frame.length]
+
+    def _push_data(self, frame: PartialFrame, chunk_index: int, payload) -> int | None:
+        """
+        Scatters a data chunk to its final offset (the only copy).
+
+        Returns:
+            int | None: The chunk's FEC group, or None for a duplicate.
+        """
+        if frame.present[chunk_index]:
+            if frame.rebuilt is not None and frame.rebuilt[chunk_index]:
+                # Reordered, not lost: the original arrived after its rebuild
+                frame.rebuilt[chunk_index] = 0
+                frame.recovered -= 1
+                self.chunks_received += 1
+            else:
+                self.chunks_duplicate += 1
+            return None
+
+        chunk_size = frame.chunk_size
+        offset = chunk_index * chunk_size
+        size = len(payload)
+        frame.buffer[offset:offset + size] = payload
+        frame.bytes_copied += size
+        frame.present[chunk_index] = 1
+        frame.received += 1
+        self.chunks_received += 1
+
+        if chunk_index == frame.chunk_count - 1:
+            frame.length = offset + size
+            if frame.fec_group and size < chunk_size:
+                # Parity treats the short last chunk as zero padded
+                frame.buffer[offset + size:offset + chunk_size] = ZERO_PAD[:chunk_size - size]
+
+        return chunk_index // frame.fec_group if frame.fec_group else 0
+
+    def _push_parity(self, frame: PartialFrame, group: int, payload) -> int | None:
+        """
+        Stores a parity chunk in its slot after the frame data.
+
+        Returns:
+            int | None: The parity group, or None for a duplicate or out-of-range group.
+        """
+        if group >= len(frame.parity_present):
+            self.packets_invalid += 1
+            return None
+        if frame.parity_present[group]:
+            self.chunks_duplicate += 1
+            return None
+
+        chunk_size = frame.chunk_size
+        offset = (frame.chunk_count + group) * chunk_size
+        frame.buffer[offset:offset + chunk_size] = payload[VIDEO_FEC_HEADER.size:]
+        frame.parity_present[group] = 1
+        frame.length = VIDEO_FEC_HEADER.unpack_from(payload)[0]
+        self.parity_received += 1
+        return group
+
+    def _recover(self, frame: PartialFrame, group: int):
+        """
+        Rebuilds the missing chunk of a group that has its parity and all other chunks.
+
+        Args:
+            frame (PartialFrame): The frame being reassembled.
+            group (int): FEC group to check.
+        """
+        if not frame.parity_present[group]:
+            return
+
+        start = group * frame.fec_group
+        end = min(start + frame.fec_group, frame.chunk_count)
+        missing = [i for i in range(start, end) if not frame.present[i]]
+        if len(missing) != 1:
+            return
+
+        # XOR of the parity and every other chunk of the group is the missing chunk
+        chunk_size = frame.chunk_size
+        chunks = np.frombuffer(frame.buffer, np.uint8, (frame.chunk_count + len(frame.parity_present)) * chunk_size)
+        chunks = chunks.reshape(-1, chunk_size)
+        target = chunks[missing[0]]
+        np.copyto(target, chunks[frame.chunk_count + group])
+        for i in range(start, end):
+            if i != missing[0]:
+                np.bitwise_xor(target, chunks[i], out=target)
+
+        frame.present[missing[0]] = 1
+        frame.rebuilt[missing[0]] = 1
+        frame.received += 1
+        frame.recovered += 1
+
+    def expire(self, now: float = None):
+        """
+        Drops partial frames that have passed the deadline.
+
+        Args:
+            now (float, optional): Monotonic time, defaults to time.monotonic().
+        """
+        if not self.pending:
+            return
+        if now is None:
+            now = time.monotonic()
+
+        for frame in [f for f in self.pending.values() if now - f.first_seen > self.frame_deadline]:
+            self._drop(frame)
+
+    def _drop(self, frame: PartialFrame, stale: bool = False):
+        """
+        Removes a partial frame, returns its buffer to the pool and records its loss.
+
+        Args:
+            frame (PartialFrame): The frame to drop.
+            stale (bool): True if a newer frame completed first, False if it expired.
+        """
+        del self.pending[frame.frame_id]
+        self.pool.release(frame.buffer)
+        self.dropped_ids.append(frame.frame_id)
+        if stale:
+            self.frames_stale += 1
+        else:
+            self.frames_expired += 1
+        self.chunks_lost += frame.chunk_count - frame.received
+        self.chunks_recovered += frame.recovered
+        if frame.recovered:
+            self._remember_rebuilt(frame)
+        self.completeness.append(frame.received / frame.chunk_count)
+
+    def _remember_rebuilt(self, frame: PartialFrame):
+        """
+        Keeps a finished frame's rebuilt-chunk map, so an original that arrives late
+        takes its chunk back out of chunks_recovered.
+        """
+        if len(self.rebuilt_ids) == self.rebuilt_ids.maxlen:
+            self.rebuilt.pop(self.rebuilt_ids[0], None)
+        self.rebuilt_ids.append(frame.frame_id)
+        self.rebuilt[frame.frame_id] = frame.rebuilt
+
+    def reset(self):
+        """
+        Clears all pending frames (e.g. after a reconnect) without touching the counters.
+        """
+        for frame in list(self.pending.values()):
+            self.pool.release(frame.buffer)
+        self.pending.clear()
+        self.dropped_ids.clear()
+        self.rebuilt_ids.clear()
+        self.rebuilt.clear()
+        self.last_emitted_id = None
+
+    def stats(self) -> dict:
+        """
+        Returns a snapshot of the reassembly counters.
+
+        Returns:
+            dict: Frame/chunk counters, chunk loss % (after FEC), FEC recovery, average frame
+                completeness and copy accounting.
+        """
+        total_chunks = self.chunks_received + self.chunks_recovered + self.chunks_lost
+        return {
+            "frames_completed": self.frames_completed,
+            "frames_expired": self.frames_expired,
+            "frames_stale": self.frames_stale,
+            "frames_pending": len(self.pending),
+            "chunks_received": self.chunks_received,
+            "chunks_duplicate": self.chunks_duplicate,
+            "chunks_lost": self.chunks_lost,
+            "chunks_late": self.chunks_late,
+            "chunks_recovered": self.chunks_recovered,
+            "parity_received": self.parity_received,
+            "frames_recovered": self.frames_recovered,
+            # Share of chunks lost on the link that FEC rebuilt
+            "fec_recovery_pct": (100.0 * self.chunks_recovered / (self.chunks_recovered + self.chunks_lost))
+                                if (self.chunks_recovered + self.chunks_lost) else 0.0,
+            "packets_invalid": self.packets_invalid,
+            "chunk_loss_pct": (100.0 * self.chunks_lost / total_chunks) if total_chunks else 0.0,
+            "avg_completeness": (sum(self.completeness) / len(self.completeness)) if self.completeness else 1.0,
+            "last_frame_bytes": self.last_frame_bytes,
+            "last_frame_copied": self.last_frame_copied,
+            # 1.0 means every byte of a completed frame was copied exactly once (socket buffer -> frame buffer)
+            "copies_per_byte": (self.bytes_copied / self.bytes_completed) if self.bytes_completed else 0.0,
+            "pool_allocations": self.pool.allocations,
+        }
+
+class VideoReceiver:
+    """
+    Socket front end for the reassembler that reads every datagram with recv_into.
+
+    Besides video chunks, the host may send small JSON packets on the same socket:
+    "video_state" from its quality controller is kept in `host_video_state`, and
+    "frame_trace" host timings are passed to `tracer`. Receiver reports are sent back to the address the video
+    comes from.
+
+    Chunks of the low-res analysis stream go to their own reassembler, and each
+    completed analysis frame is passed to `on_analysis_frame`.
+
+    Attributes:
+        sock (socket.socket): Bound UDP video socket.
+        reassembler (FrameReassembler): Frame reassembly and loss tracking.
+        analysis_reassembler (FrameReassembler): Reassembly of the analysis stream.
+        on_analysis_frame (Callable | None): Called with (frame_id, timestamp, memoryview)
+            for each analysis frame; the view is only valid during the call.
+        packet (bytearray): Reusable receive buffer.
+        packet_view (memoryview): View over the receive buffer.
+        source_addr (tuple | None): Address of the host video sender.
+        host_video_state (dict | None): Last "video_state" packet from the host.
+        clock (ClockOffsetEstimator | None): Converts host capture times to the client clock.
+        tracer (FrameTracer | None): Per-stage frame tracer fed with host traces.
+        last_latency_ms (int): Capture-to-reassembly latency of the last completed frame.
+        last_receive_span (tuple): Client wall times (ms) of the first and last chunk of the last completed frame.
+    """
+
+    def __init__(self, sock, reassembler: FrameReassembler = None, packet_size: int = PACKET_BUFFER_SIZE):
+        """
+        Initializes the receiver.
+
+        Args:
+            sock (socket.socket): Bound UDP video socket.
+            reassembler (FrameReassembler, optional): Reassembler to use, a default one if None.
+            packet_size (int): Size of the receive buffer.
+        """
+        self.sock = sock
+        self.reassembler = reassembler if reassembler is not None else FrameReassembler()
+        self.analysis_reassembler = FrameReassembler(max_pending=2)
+        self.on_analysis_frame = None
+        self.packet = bytearray(packet_size)
+        self.packet_view = memoryview(self.packet)
+
+        self.source_addr = None
+        self.host_video_state = None
+        self.host_state_changed = False
+        self.clock = None
+        self.tracer = None
+        self.last_receive_span = (0.0, 0.0)
+
+        # === Receiver Report Window ===
+        self.last_latency_ms = 0
+        self.window_latency_total = 0
+        self.window_latency_count = 0
+        self.window_start = time.monotonic()
+        self.report_base = self.reassembler.stats()
+
+    def receive(self):
+        """
+        Reads one datagram and feeds it to the reassembler.
+
+        Socket errors (socket.timeout, BlockingIOError, OSError) are passed to the caller.
+
+        Returns:
+            tuple | None: (frame_id, timestamp, memoryview) once a frame completes, otherwise None.
+                The memoryview is valid until the next call to receive().
+        """
+        n, addr = self.sock.recvfrom_into(self.packet)
+
+        # --- Host control packets (JSON) share the video socket ---
+        if n and self.packet[0] == 0x7B:   # "{"
+            self._handle_host_packet(self.packet_view[:n])
+            return None
+
+        self.source_addr = addr
+
+        if n > VIDEO_FLAGS_OFFSET and self.packet[VIDEO_FLAGS_OFFSET] & VIDEO_FLAG_ANALYSIS:
+            analysis = self.analysis_reassembler.push(self.packet_view[:n])
+            if analysis is not None and self.on_analysis_frame is not None:
+                self.on_analysis_frame(*analysis)
+            return None
+
+        completed = self.reassembler.push(self.packet_view[:n])
+        if completed is not None:
+            if self.tracer is not None:
+                now_wall = time.time() * 1000.0
+                first_wall = now_wall - (time.monotonic() - self.reassembler.last_first_seen) * 1000.0
+                self.last_receive_span = (first_wall, now_wall)
+            if self.clock is not None and self.clock.synced:
+                self.last_latency_ms = int(self.clock.latency_from_host(completed[1]))
+            else:
+                self.last_latency_ms = int(time.time() * 1000) - completed[1]
+            self.window_latency_total += self.last_latency_ms
+            self.window_latency_count += 1
+        return completed
+
+    def _handle_host_packet(self, data):
+        """
+        Stores JSON packets sent by the host on the video socket.
+
+        Args:
+            data (memoryview): The raw packet.
+        """
+        try:
+            payload = json.loads(bytes(data))
+        except ValueError:
+            self.reassembler.packets_invalid += 1
+            return
+        if payload.get("type") == "video_state":
+            self.host_video_state = payload
+            self.host_state_changed = True
+        elif payload.get("type") == "frame_trace" and self.tracer is not None:
+            try:
+                self.tracer.host_trace(payload)
+            except (KeyError, TypeError, ValueError):
+                self.reassembler.packets_invalid += 1
+
+    def send_report(self) -> dict | None:
+        """
+        Sends a receiver report covering the time since the previous one.
+
+        Returns:
+            dict | None: The report sent, or None if no video has arrived yet.
+        """
+        if self.source_addr is None:
+            return None
+
+        now = time.monotonic()
+        stats = self.reassembler.stats()
+        base = self.report_base
+
+        completed = stats["frames_completed"] - base["frames_completed"]
+        dropped = (stats["frames_expired"] - base["frames_expired"]) + (stats["frames_stale"] - base["frames_stale"])
+        received = stats["chunks_received"] - base["chunks_received"]
+        # A late original can take back a rebuild counted in an earlier window
+        recovered = max(0, stats["chunks_recovered"] - base["chunks_recovered"])
+        lost = stats["chunks_lost"] - base["chunks_lost"] + recovered
+        elapsed = now - self.window_start
+
+        # Loss is reported as seen on the link (before FEC) so the host can size the parity
+        report = receiver_report_packet(
+            completed,
+            dropped,
+            round(100.0 * lost / (received + lost), 2) if (received + lost) else 0.0,
+            (self.window_latency_total // self.window_latency_count) if self.window_latency_count else None,
+            round(completed / elapsed, 1) if elapsed > 0 else 0.0,
+            recovered,
+        )
+        self.sock.sendto(json.dumps(report).encode(), self.source_addr)
+
+        self.report_base = stats
+        self.window_start = now
+        self.window_latency_total = 0
+        self.window_latency_count = 0
+        return report
+
+    def send_tune(self, fec_group: int = None, mtu: int = None) -> bool:
+        """
+        Asks the host to change the FEC group size (0 turns FEC off) and/or the MTU its datagrams are sized for.
+
+        Args:
+            fec_group (int, optional): Data chunks per parity chunk.
+            mtu (int, optional): MTU in bytes, capped by the host's path MTU.
+
+        Returns:
+            bool: False if no video has arrived yet, so the host address is unknown.
+        """
+        if self.source_addr is None:
+            return False
+        self.sock.sendto(json.dumps(video_tune_packet(fec_group, mtu)).encode(), self.source_addr)
+        return True
+
+    def stats(self) -> dict:
+        """
+        Returns the reassembler counters.
+
+        Returns:
+            dict: See FrameReassembler.stats().
+        """
+        return self.reassembler.stats()
@@ -10,7 +10,7 @@ Created: 19-02-2025
 # === Imports ===
 from PySide6.QtCore import (QCoreApplication, QDate, QDateTime, QLocale,
     QMetaObject, QObject, QPoint, QRect, QTimer, Signal, QSize, QTime, 
-    QUrl, QThread, Signal, QEvent, Qt, QThreadPool, QRunnable, Slot)
+    QUrl, QThread, Signal, QEvent, Qt, QThreadPool, QRunnable, Slot, QSocketNotifier)
 from PySide6.QtGui import (QBrush, QColor, QConicalGradient, QCursor,
     QFont, QFontDatabase, QGradient, QIcon,QImage, QKeySequence, 
     QLinearGradient, QPainter, QPalette, QPixmap, QRadialGradient, 
@@ -32,6 +32,12 @@ import threading
 
 from appFunctions import toggleDebugCV, showError, load_settings, save_settings
 from appClientNetwork import NetworkManager
+from appVideoReceiver import FrameReassembler, VideoReceiver
+from appFrameTrace import FrameTracer
+from appLogSink import LogSink
+from appSessionLog import SessionLogWriter
+from appClockSync import wall_ms
+from udpProtocols import heartbeat_packet
 from appUiAnimations import AnimatedToolTip, LoadingScreen, install_hover_animation
 from openCVFunctions import FrameProcessor
 from MainWindow import Ui_MainWindow
@@ -53,14 +59,18 @@ class HeartbeatWorker(QObject):
     A QObject-based worker class that periodically sends heartbeat packets to a server via UDP.
 
     This class is designed to run in a separate QThread and use QTimer to emit heartbeat signals
-    at regular intervals.
+    at regular intervals. Each heartbeat is also a time-sync probe: the host answers with its
+    receive/send times, which feed the shared ClockOffsetEstimator. A short burst of probes at
+    start gets the offset estimate going quickly.
 
     Attributes:
         finished (Signal): Emitted when the worker is stopped and cleaned up.
         server_ip (str): The IP address of the server to send heartbeat packets to.
         heartbeat_port (int): The port on the server to send heartbeat packets to.
+        clock (ClockOffsetEstimator | None): Estimator fed with the host's replies.
         sock (socket.socket): The UDP socket used to send heartbeat messages.
         timer (QTimer): The timer used to schedule periodic heartbeat emissions.
+        notifier (QSocketNotifier): Reads host replies as soon as they arrive.
         running (bool): Indicates whether the worker is actively sending heartbeats.
     """
 
@@ -68,19 +78,28 @@ class HeartbeatWorker(QObject):
     finished = Signal()
     heartbeat_log_signal = Signal(str,str)
 
-    def __init__(self, server_ip, heartbeat_port):
+    HEARTBEAT_INTERVAL_MS = 1000    # Heartbeat and time-sync probe interval
+    SYNC_BURST = 8                  # Probes sent quickly at start
+    SYNC_BURST_INTERVAL_MS = 100
+
+    def __init__(self, server_ip, heartbeat_port, clock=None):
         """
         Initializes the HeartbeatWorker with server information.
 
         Args:
             server_ip (str): IP address of the heartbeat server.
             heartbeat_port (int): UDP port for sending heartbeat messages.
+            clock (ClockOffsetEstimator, optional): Estimator to feed with time-sync replies.
         """
         super().__init__()
         self.server_ip = server_ip
         self.heartbeat_port = heartbeat_port
+        self.clock = clock
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
         self.timer = None
+        self.notifier = None
+        self.sent = 0
         self.running = False
 
     def start(self):
@@ -93,9 +112,12 @@ class HeartbeatWorker(QObject):
         #self.heartbeat_log_signal(f"[Heartbeat] Info: Pulse Start", "INFO")
 
         self.timer = QTimer(self)  # Create timer with self as parent (safe post-moveToThread)
-        self.timer.setInterval(4000)  # Emit heartbeat every 4 seconds
+        self.timer.setInterval(self.SYNC_BURST_INTERVAL_MS)
         self.timer.timeout.connect(self.sendHeartbeat)
 
+        self.notifier = QSocketNotifier(self.sock.fileno(), QSocketNotifier.Read, self)
+        self.notifier.activated.connect(self.readReplies)
+
         self.running = True
         self.timer.start()
 
@@ -103,22 +125,47 @@ class HeartbeatWorker(QObject):
         """
         Sends a heartbeat packet to the server via UDP.
 
-        The packet includes a type identifier and the current timestamp in milliseconds.
+        The packet carries its send time for the time-sync exchange and the current
+        clock offset estimate, so the host can convert client timestamps too.
         """
         if not self.running:
             return
 
-        packet = {
-            "type": "heartbeat",
-            "timestamp": int(time.time() * 1000)
-        }
+        if self.clock is not None and self.clock.synced:
+            stats = self.clock.stats()
+            packet = heartbeat_packet(stats["offset_ms"], stats["drift_ppm"], stats["base_ms"])
+        else:
+            packet = heartbeat_packet()
 
         try:
             self.sock.sendto(json.dumps(packet).encode(), (self.server_ip, self.heartbeat_port))
 
         except Exception as e:
-            self.heartbeat_log_signal(f"[Heartbeat] Error: {e}", "ERROR")
-            
+            self.heartbeat_log_signal.emit(f"[Heartbeat] Error: {e}", "ERROR")
+
+        self.sent += 1
+        if self.sent == self.SYNC_BURST:
+            self.timer.setInterval(self.HEARTBEAT_INTERVAL_MS)
+
+    def readReplies(self):
+        """
+        Reads heartbeat_ack replies and adds each time-sync exchange to the estimator.
+        """
+        while True:
+            try:
+                data = self.sock.recv(1024)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            t3 = wall_ms()
+
+            try:
+                payload = json.loads(data.decode())
+            except (UnicodeDecodeError, json.JSONDecodeError):
+                continue
+            if payload.get("type") == "heartbeat_ack" and self.clock is not None:
+                self.clock.add_sample(payload["t0"], payload["t1"], payload["t2"], t3)
 
     @Slot()
     def stop(self):
@@ -133,6 +180,9 @@ class HeartbeatWorker(QObject):
             self.timer.stop()
             self.timer.deleteLater()
 
+        if self.notifier:
+            self.notifier.setEnabled(False)
+
         self.sock.close()
         self.finished.emit()
 
@@ -177,24 +227,36 @@ class VideoThread(QThread):
     """
     A threaded UDP video receiver that reconstructs JPEG frames from chunked packets.
 
-    This class listens on a specified UDP port, handles header metadata to reassemble
-    frames, decodes them, and emits QImage frames for GUI display. If the connection
-    times out, it emits a heartbeat signal to indicate disconnection.
+    This class listens on a specified UDP port, passes each binary video datagram to a
+    FrameReassembler (which handles reordering, loss and expiry), decodes completed
+    frames, and emits QImage frames for GUI display. If the connection times out, it
+    emits a heartbeat signal to indicate disconnection.
 
     Signals:
-        frame_received (QImage): Emitted when a new video frame is reconstructed.
+        frame_received (QImage, int): Emitted with the frame and its id when a new video frame is reconstructed.
         heartbeat_signal (bool): Emitted with False when server disconnect is detected.
+        log_signal (str, str): Emits log messages (e.g. host video controller changes).
 
     Attributes:
         server_ip (str): IP of the video stream server.
         video_port (int): Port to listen on for video data.
         processor (Optional): A processing pipeline for image enhancement or AI.
+        reassembler (FrameReassembler): Rebuilds frames and tracks loss counters.
+        receiver (VideoReceiver): Reads datagrams with recv_into into preallocated buffers.
+        analysis_image (numpy.ndarray | None): Latest decoded low-res analysis frame for the CV processor.
+        control_stats (Callable | None): Returns the control channel RTT/loss stats for the overlay.
+        tracer (FrameTracer): Per-stage capture-to-paint timing of every frame.
         fps (float): Current frame rate (frames per second).
         last_video_latency_ms (int): Time in ms between sending and receiving frame.
     """
 
-    frame_received = Signal(QImage)
+    frame_received = Signal(QImage, int)
     heartbeat_signal = Signal(bool)  # Sends a flag that the Host has been disconnected
+    log_signal = Signal(str, str)
+
+    REPORT_INTERVAL = 0.5   # Seconds between receiver reports sent to the host
+    ANALYSIS_MAX_AGE = 0.5  # Seconds an analysis frame is used before falling back to the display frame
+    TRACE_INTERVAL = 10.0   # Seconds between frame trace summaries in the system log
 
     def __init__(self, server_ip, video_port):
         """
@@ -218,11 +280,20 @@ class VideoThread(QThread):
         self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.sock.bind(('', self.video_port))
 
-        self.total_chunks = 0
-        self.current_chunks = 0
-        self.frame_chunks = []
+        self.reassembler = FrameReassembler(frame_deadline_ms=250)
+        self.receiver = VideoReceiver(self.sock, self.reassembler)
+        self.receiver.on_analysis_frame = self.on_analysis_frame
         self.last_frame_timestamp = 0
 
+        self.analysis_image = None
+        self.analysis_time = 0.0
+        self.analysis_new = False
+
+        self.control_stats = None
+
+        self.tracer = FrameTracer()
+        self.receiver.tracer = self.tracer
+
         self.last_frame_time = time.time()
         self.frame_counter = 0
         self.fps = 0
@@ -237,106 +308,128 @@ class VideoThread(QThread):
         """
         self.processor = processor
 
+    def on_analysis_frame(self, frame_id, timestamp, frame_view):
+        """
+        Decodes a low-res analysis frame; the drive-assist CV runs on it instead of the display frame.
+
+        Args:
+            frame_id (int): Analysis stream frame id.
+            timestamp (int): Host capture time in ms.
+            frame_view (memoryview): JPEG data, only valid during this call.
+        """
+        try:
+            image = cv2.imdecode(np.frombuffer(frame_view, np.uint8), cv2.IMREAD_COLOR)
+        except cv2.error:
+            image = None
+        if image is not None:
+            self.analysis_image = image
+            self.analysis_time = time.monotonic()
+            self.analysis_new = True
+
     def run(self):
         """
         Main thread loop: receives packets, assembles frames, processes them, and emits the result.
 
-        Handles JSON headers, collects JPEG frame chunks, and manages timeout-triggered disconnects.
+        Chunks may arrive in any order; incomplete frames are expired by the reassembler,
+        and timeouts trigger a disconnect.
         """
-        BUFFER_SIZE = 65536
+        last_report = time.monotonic()
+        last_trace = time.monotonic()
+        traces_logged = 0       # tracer.host_traces at the last [TRACE] line
 
         while self.running:
             try:
-                data, _ = self.sock.recvfrom(BUFFER_SIZE)
-
-                # Try decoding a JSON header packet
-                '''try:
-                    header = json.loads(data.decode())
-                    self.total_chunks = header["chunks"]
-                    self.last_frame_timestamp = header["timestamp"]
-                    self.frame_chunks = [None] * self.total_chunks  # Preallocate
-                    self.current_chunks = 0
+                completed = self.receiver.receive()
+
+                # --- Periodic receiver report for the host quality controller ---
+                if time.monotonic() - last_report >= self.REPORT_INTERVAL:
+                    self.receiver.send_report()
+                    last_report = time.monotonic()
+
+                if self.receiver.host_state_changed:
+                    self.receiver.host_state_changed = False
+                    state = self.receiver.host_video_state
+                    self.log_signal.emit(f"[VIDEO] Host set Q{state['quality']} {state['width']}x{state['height']} "
+                                         f"@{state['fps']}fps FEC 1/{state.get('fec_group') or '-'} "
+                                         f"({state['reason']})", "DEBUG")
+
+                # Only while traced frames arrive (host frame_trace is off by default)
+                if time.monotonic() - last_trace >= self.TRACE_INTERVAL:
+                    if self.tracer.host_traces != traces_logged:
+                        traces_logged = self.tracer.host_traces
+                        self.log_signal.emit(f"[TRACE] {self.tracer.format_stats()}", "DEBUG")
+                    last_trace = time.monotonic()
+
+                if completed is None:
                     continue
-                except (json.JSONDecodeError, UnicodeDecodeError):
-                    pass
 
-                # Collect JPEG chunks
-                self.frame_chunks.append(data)
-                self.current_chunks += 1'''
-                try:
-                    header = json.loads(data.decode())
-                    self.total_chunks = header["chunks"]
-                    self.last_frame_timestamp = header["timestamp"]
-                    self.frame_chunks = [None] * self.total_chunks  # Preallocated
-                    self.current_chunks = 0
-                    continue
-                except (json.JSONDecodeError, UnicodeDecodeError):
-                    pass
+                frame_id, self.last_frame_timestamp, frame_view = completed
+                self.last_video_latency_ms = self.receiver.last_latency_ms
+                tracer = self.tracer
+                recv_first, recv_last = self.receiver.last_receive_span
+                tracer.mark(frame_id, "recv_first", recv_first)
+                tracer.mark(frame_id, "recv_last", recv_last)
 
-                # Only accept chunk if frame is initialized
-                if self.frame_chunks and 0 <= self.current_chunks < self.total_chunks:
-                    self.frame_chunks[self.current_chunks] = data
-                    self.current_chunks += 1
-                else:
-                    # Desync or uninitialized — reset
-                    #print("Dropped chunk due to out-of-range or uninitialized state")
-                    self.frame_chunks = []
-                    self.current_chunks = 0
-                    #self.total_chunks = 0
-
-                # Drop the frame if too many chunks are received
-                if self.current_chunks > self.total_chunks:
-                    self.frame_chunks.clear()
-                    self.current_chunks = 0
+                # Decode JPEG straight from the reassembly buffer (no intermediate copy)
+                tracer.mark(frame_id, "decode_start")
+                nparr = np.frombuffer(frame_view, np.uint8)
+                try:
+                    frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+                except cv2.error:
+                    frame = None
+                if frame is None:
                     continue
-
-                # Reassemble and display complete frame
-                if self.current_chunks == self.total_chunks:
-                    frame_data = b''.join(self.frame_chunks)
-                    now = int(time.time() * 1000)
-                    self.last_video_latency_ms = now - self.last_frame_timestamp
-
-                    # Decode JPEG to OpenCV frame
-                    nparr = np.frombuffer(frame_data, np.uint8)
-                    try:
-                        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                    except cv2.error:
-                        frame = None
-                    if frame is None:
-                        self.frame_chunks = []
-                        self.current_chunks = 0
-                        continue
-                    #frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-
-                    if frame is not None:
-                        # --- Update FPS ---
-                        self.frame_counter += 1
-                        now = time.time()
-                        elapsed = now - self.last_frame_time
-                        if elapsed >= 1.0:
-                            self.fps = self.frame_counter / elapsed
-                            self.frame_counter = 0
-                            self.last_frame_time = now
-
-                        # --- Overlay FPS and latency ---
-                        overlay = f"FPS: {self.fps:.1f} | Latency: {self.last_video_latency_ms} ms"
-                        cv2.putText(frame, overlay, (10, 30), cv2.FONT_HERSHEY_SIMPLEX,
-                                    0.5, (0, 255, 0), 1, cv2.LINE_AA)
-
-                        # --- Optional Frame Processing (AI/Floor Detection) ---
-                        if self.processor:
-                            frame = self.processor.detect_floor_region(frame)
-
-                        # Convert to QImage and emit
-                        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                        h, w, ch = frame.shape
-                        bytes_per_line = ch * w
-                        q_img = QImage(frame.data, w, h, bytes_per_line, QImage.Format_RGB888)
-                        self.frame_received.emit(q_img)
-
-                    # Reset state for next frame
-                    self.frame_chunks = []
-                    self.current_chunks = 0
+                tracer.mark(frame_id, "decode_end")
+
+                # --- Update FPS ---
+                self.frame_counter += 1
+                now = time.time()
+                elapsed = now - self.last_frame_time
+                if elapsed >= 1.0:
+                    self.fps = self.frame_counter / elapsed
+                    self.frame_counter = 0
+                    self.last_frame_time = now
+
+                # --- Overlay FPS, latency, chunk loss (after FEC) and FEC recoveries ---
+                stats = self.reassembler.stats()
+                overlay = (f"FPS: {self.fps:.1f} | Latency: {self.last_video_latency_ms} ms | "
+                           f"Loss: {stats['chunk_loss_pct']:.1f}% | FEC: {stats['chunks_recovered']}")
+                state = self.receiver.host_video_state
+                if state:
+                    overlay += f" | Q{state['quality']} {state['height']}p"
+                control = self.control_stats() if self.control_stats else None
+                if control and control["rtt_avg_ms"] is not None:
+                    overlay += (f" | RTT: {control['rtt_avg_ms']:.0f}/{control['rtt_p95_ms']:.0f} ms "
+                                f"Cmd loss: {control['loss_pct']:.1f}%")
+                cv2.putText(frame, overlay, (10, 30), cv2.FONT_HERSHEY_SIMPLEX,
+                            0.5, (0, 255, 0), 1, cv2.LINE_AA)
+
+                # --- Optional Frame Processing (AI/Floor Detection) ---
+                if self.processor:
+                    if self.analysis_image is not None and time.monotonic() - self.analysis_time < self.ANALYSIS_MAX_AGE:
+                        # Detect on each new low-res frame, draw the latest results on every display frame
+                        if self.analysis_new:
+                            self.analysis_new = False
+                            tracer.mark(frame_id, "analyze_start")
+                            self.processor.analyze(self.analysis_image, frame.shape[:2])
+                            tracer.mark(frame_id, "analyze_end")
+                    else:
+                        # Same as detect_floor_region, split so each step is traced
+                        tracer.mark(frame_id, "analyze_start")
+                        self.processor.analyze(frame, frame.shape[:2])
+                        tracer.mark(frame_id, "analyze_end")
+                    tracer.mark(frame_id, "overlay_start")
+                    frame = self.processor.draw_overlay(frame)
+                    tracer.mark(frame_id, "overlay_end")
+
+                # Convert to QImage and emit
+                tracer.mark(frame_id, "qimage_start")
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                h, w, ch = frame.shape
+                bytes_per_line = ch * w
+                q_img = QImage(frame.data, w, h, bytes_per_line, QImage.Format_RGB888)
+                tracer.mark(frame_id, "qimage_end")
+                self.frame_received.emit(q_img, frame_id)
 
             except BlockingIOError:
                 # No data yet — non-blocking mode
@@ -377,6 +470,8 @@ class MainWindow(QMainWindow):
         OBJECT_VIS_ENABLED, FLOOR_VIS_ENABLED, ... (bool): OpenCV visual debug flags.
         IS_DRIVE_ASSIST_ENABLED (bool): State of Drive Assist mode.
         logSignal (Signal): Emits log messages to system log widgets.
+        logSink (LogSink): Queues log records and updates the log widgets in batches on a UI timer.
+        sessionLog (SessionLogWriter): Writes every log record to rotating session files in the background.
         displayVehicleMovementSignal (Signal): Updates vehicle movement UI.
         showErrorSignal (Signal): Triggers global error popups.
     """
@@ -435,16 +530,28 @@ class MainWindow(QMainWindow):
         for btn in animButtons:
             install_hover_animation(btn)
 
+        # === Log Pipeline (widgets are updated in batches, never per record) ===
+        self.logSink = LogSink(parent=self)
+        self.logSink.add_view(self.ui.systemLogPage.log_batch)
+        self.logSink.add_view(self.ui.networkConnectionLogWidget.add_logs_batch, {"BROADCAST", "HANDSHAKE"})
+        self.logSink.add_view(self.ui.vehicleSystemAlertLogWidget.add_logs_batch, {"INFO", "WARN"})
+
+        # Session file: written in the background, flushed on exit and on unhandled exceptions
+        self.sessionLog = SessionLogWriter(self.ui.systemLogPage.session_log_path)
+        self.sessionLog.install_crash_handlers()
+        self.logSink.add_tap(self.sessionLog.write)
+
         # === Networking Setup ===
         self.handshake_done = threading.Event()
         self.network = NetworkManager(self)
+        self.network.resume_done_signal.connect(self.resume_done)
 
         # === Load Saved Credentials ===
         self.load_credentials() # Load Credentials On Startup
 
         # === Signal & UI Connections ===
         self.ui.carConnectLoginWidget.connect_btn.clicked.connect(self.attempt_connection)  # Car Login Button
-        self.logSignal.connect(self.logToSystem)    # Log to all systems
+        self.logSignal.connect(self.logToSystem, Qt.DirectConnection)    # Log to all systems (queued by the sink, any thread)
         self.ui.projectInfoWidgetCustom.logErrorSignal.connect(self.logToSystem)    # Car Login Error to system
         self.showErrorSignal.connect(self.showGlobalError)  # Global popup
         
@@ -645,22 +752,18 @@ class MainWindow(QMainWindow):
 
     
     # === Central Logging Handler ===
-    def logToSystem(self, message: str, type: str): #? FIXME: Vehicle control logs could slow down the thread
+    def logToSystem(self, message: str, type: str):
         """
         Logs a message to the system and auxiliary log widgets.
 
+        Safe from any thread: the record is queued and the widgets are updated
+        in batches by the log sink's timer.
+
         Args:
             message (str): The message to log.
             type (str): Log type (e.g., INFO, WARN, BROADCAST).
         """
-        self.ui.systemLogPage.log(message, type)
-        match type:
-            case "BROADCAST" | "HANDSHAKE":
-                self.ui.networkConnectionLogWidget.add_log(f"[{type}] {message}")
-            case "INFO" | "WARN":
-                self.ui.vehicleSystemAlertLogWidget.add_log(f"[{type}] {message}")
-                #QCoreApplication.processEvents()
-        QCoreApplication.processEvents()
+        self.logSink.emit(message, type)
 
     # === Show Error Dialog Globally ===
     def showGlobalError(self, title: str, message: str, severity: str, duration =0):
@@ -732,23 +835,12 @@ class MainWindow(QMainWindow):
        QApplication.restoreOverrideCursor()
        #QCoreApplication.processEvents()
        if self.VEHICLE_CONNECTION:
-                self.heartbeat_thread = QThread()
-                self.heartbeat_worker = HeartbeatWorker(self.network.server_ip, self.network.heartbeat_port)
-                self.heartbeat_worker.moveToThread(self.heartbeat_thread)
-
-                self.heartbeat_thread.started.connect(self.heartbeat_worker.start)
-                
-
-                self.heartbeat_worker.finished.connect(self.heartbeat_thread.quit)
-                self.heartbeat_worker.finished.connect(self.heartbeat_worker.deleteLater)
-                self.heartbeat_thread.finished.connect(self.heartbeat_thread.deleteLater)
-
-                self.heartbeat_thread.start()
-
-                #TODO: Fix the log signal for heartbeat
-                #self.heartbeat_worker.heartbeat_log_signal.connect(self.logToSystem)
+                self.start_heartbeat()
 
                 self.ui.VehicleTuningSettingsPage.IS_VEHICLE_READY = True
+                # The host only sends the analysis stream while it knows drive assist is on
+                if self.IS_DRIVE_ASSIST_ENABLED:
+                    self.network.send_drive_assist_command("ENABLE_DRIVE_ASSIST")
                 self.settings["username"] = username
                 self.settings["password"] = password
                 save_settings(self.settings, self.SETTINGS_FILE)
@@ -761,6 +853,41 @@ class MainWindow(QMainWindow):
                     pass
                 self.threadpool.waitForDone()
 
+    # === Start Heartbeat Thread ===
+    def start_heartbeat(self):
+        """
+        Starts a HeartbeatWorker on its own QThread for the current session.
+        """
+        self.heartbeat_thread = QThread()
+        self.heartbeat_worker = HeartbeatWorker(self.network.server_ip, self.network.heartbeat_port, self.network.clock)
+        self.heartbeat_worker.moveToThread(self.heartbeat_thread)
+
+        self.heartbeat_thread.started.connect(self.heartbeat_worker.start)
+
+        self.heartbeat_worker.finished.connect(self.heartbeat_thread.quit)
+        self.heartbeat_worker.finished.connect(self.heartbeat_worker.deleteLater)
+        self.heartbeat_thread.finished.connect(self.heartbeat_thread.deleteLater)
+
+        self.heartbeat_thread.start()
+
+        #TODO: Fix the log signal for heartbeat
+        #self.heartbeat_worker.heartbeat_log_signal.connect(self.logToSystem)
+
+    # === Start Video Thread ===
+    def start_video_thread(self):
+        """
+        Creates, configures and starts the video thread and its frame processor.
+        """
+        self.thread = VideoThread(self.network.server_ip, self.network.video_port)
+        self.processor = FrameProcessor(self, self.thread)
+        self.processor.initKalmanFilter()
+        self.thread.set_processor(self.processor)
+        self.thread.control_stats = self.network.control_stats
+        self.thread.receiver.clock = self.network.clock
+        self.thread.tracer.clock = self.network.clock
+        self.thread.start()
+        self.THREAD_RUNNING = True
+
     # === Initialize Drive Page ===
     def iniDrivePage(self):
         """
@@ -781,20 +908,16 @@ class MainWindow(QMainWindow):
             self.thread.heartbeat_signal.connect(self.checkHeartBeat)'''
 
             if not self.OPENED_DRIVE_PAGE:
-                self.thread = VideoThread(self.network.server_ip, self.network.video_port)
-                self.processor = FrameProcessor(self, self.thread)
-                self.processor.initKalmanFilter()
-                self.thread.set_processor(self.processor)
-                self.thread.start()
-                self.THREAD_RUNNING = True
+                self.start_video_thread()
                 self.OPENED_DRIVE_PAGE = True
             
             self.thread.frame_received.connect(self.update_frame)
             self.thread.heartbeat_signal.connect(self.checkHeartBeat)
+            self.thread.log_signal.connect(self.logToSystem)
             self.updateVehicleMovement("SET")
             self.ui.videoStreamWidget.setStyleSheet("QWidget{background-color:  #0c0c0d;}")
             self.ui.drivePage.commandSignal.connect(self.changeKeyInfo)
-            #? Maybe hindering performance because it is running on the same main thread?
+            # Non-blocking: acks are matched on the control channel's I/O thread
             self.ui.drivePage.commandSignal.connect(self.network.send_keyboard_command)
             
         else:
@@ -998,7 +1121,9 @@ class MainWindow(QMainWindow):
         """
         Handles loss of heartbeat signal from the vehicle.
 
-        Cleans up threads, resets UI elements, and displays a disconnection popup.
+        Cleans up threads and resets UI elements, then tries to resume the session
+        with the host's token (one round trip, no discovery or handshake). The
+        disconnection popup is shown only if the session can't be resumed.
 
         Args:
             online (bool): False if the heartbeat is lost.
@@ -1017,13 +1142,45 @@ class MainWindow(QMainWindow):
                 self.thread.stop()
                 self.ui.videoStreamLabel.setText("No Conncection")
                 self.ui.videoStreamWidget.setStyleSheet("QWidget{background-color: #f1f3f3;}")
-            
-            # Popup
-            showError(self.ui.centralwidget, "Vehicle Error", "Vehicle disconnected or connection timeout", "ERROR")
+
+            # Resume, or popup if there is no session to resume
+            if self.network.can_resume():
+                self.logToSystem("Resuming session...", "HANDSHAKE")
+                self.threadpool.start(Worker(self.network.resume_session))
+            else:
+                showError(self.ui.centralwidget, "Vehicle Error", "Vehicle disconnected or connection timeout", "ERROR")
         #TODO: Temp fix for heartbeat log signal?
         else:
             self.heartbeat_worker.heartbeat_log_signal.connect(self.logToSystem)
     
+    # === Session Resume Result ===
+    def resume_done(self, resumed: bool):
+        """
+        Restarts the heartbeat and video after a resumed session, or reports the disconnect.
+
+        Args:
+            resumed (bool): True if the host resumed the session.
+        """
+        if not resumed:
+            showError(self.ui.centralwidget, "Vehicle Error", "Vehicle disconnected or connection timeout", "ERROR")
+            return
+
+        self.ui.vehicleTypeLabel.setText(self.vehicle_model)
+
+        # Video first: the host starts streaming on the first heartbeat, by then the port is bound
+        if self.THREAD_RUNNING == True:
+            self.start_video_thread()
+            self.thread.frame_received.connect(self.update_frame)
+            self.thread.heartbeat_signal.connect(self.checkHeartBeat)
+            self.thread.log_signal.connect(self.logToSystem)
+            self.ui.videoStreamWidget.setStyleSheet("QWidget{background-color:  #0c0c0d;}")
+
+        self.start_heartbeat()
+        if self.IS_DRIVE_ASSIST_ENABLED:
+            self.network.send_drive_assist_command("ENABLE_DRIVE_ASSIST")
+
+        showError(self.ui.centralwidget, "Connection Restored", f"Resumed session with vehicle {self.vehicle_model}", "SUCCESS", 3000)
+
     # === Emergency Disconnect Logic ===
     def emergencyDisconnect(self):
         """
@@ -1041,6 +1198,8 @@ class MainWindow(QMainWindow):
             self.logToSystem("Vehicle forcefully disconnected", "ERROR")
             self.ui.vehicleTypeLabel.setText("Unknown")
             QMetaObject.invokeMethod(self.heartbeat_worker, "stop", Qt.QueuedConnection)
+            self.network.close_control_channel()
+            self.network.session_token = None   # A forced disconnect is not resumed
 
             # Video stream
             if self.THREAD_RUNNING == True:
@@ -1055,7 +1214,7 @@ class MainWindow(QMainWindow):
             #VEHICLE_CONNECTION = False
     
     # === Frame Display and Emergency Stop Check ===
-    def update_frame(self, q_img):
+    def update_frame(self, q_img, frame_id=-1):
         """
         Receives a new frame and updates the video label with it.
 
@@ -1063,9 +1222,14 @@ class MainWindow(QMainWindow):
 
         Args:
             q_img (QImage): Frame to display.
+            frame_id (int): Host frame id, used to finish the frame's trace.
         """
         #pixmap = QPixmap.fromImage(q_img)
+        tracer = self.thread.tracer
+        tracer.mark(frame_id, "paint_start")
         self.ui.videoStreamLabel.setPixmap(QPixmap.fromImage(q_img))
+        tracer.mark(frame_id, "paint_end")
+        tracer.painted(frame_id)
         
         if self.alert_triggered and not self.alert_cooldown:
             self.network.send_drive_assist_command("EMERGENCY_STOP")
@@ -1098,11 +1262,17 @@ class MainWindow(QMainWindow):
         if self.VEHICLE_CONNECTION:
             #self.send_command("DISCONNECT")
             QMetaObject.invokeMethod(self.heartbeat_worker, "stop", Qt.QueuedConnection)
+            self.network.close_control_channel()
         self.VEHICLE_CONNECTION = False
         #self.client_socket.close()
         if self.THREAD_RUNNING == True:
             self.thread.stop()
 
+        stats = self.sessionLog.stats()
+        self.logToSystem(f"Session log: {stats['records_written'] + stats['pending']} records, "
+                         f"UI cost avg {stats['ui_avg_us']} us / max {stats['ui_max_us']} us", "DEBUG")
+        self.sessionLog.close()
+
         event.accept()
         #self.client_socket.close()
         
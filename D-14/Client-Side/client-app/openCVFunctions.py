@@ -12,11 +12,21 @@ import cv2
 import numpy as np
 import os
 
+# Pixel sizes below were tuned on the 1280x720 display stream and are scaled to the analysed frame
+REFERENCE_WIDTH = 1280
+
 class FrameProcessor:
     def __init__(self, mainWindow, videoThread):
         self.mainWindow = mainWindow
         self.videoThread = videoThread
 
+        # Detection can run on a low-resolution analysis frame while the results are drawn on the
+        # display frame, so drawing is recorded as overlay ops and replayed with a coordinate scale
+        self.overlay_ops = []
+        self.scale = 1.0
+        self.to_display = (1.0, 1.0)
+        self.source_size = None
+
     '''Initialize the Kalman Filter'''
     def initKalmanFilter(self):
         self.kalman = cv2.KalmanFilter(4, 2)
@@ -34,47 +44,84 @@ class FrameProcessor:
     def detect_floor_region(self, frame):
         # If openCV is enabled
         if self.mainWindow.IS_DRIVE_ASSIST_ENABLED:
-            self.mainWindow.frame_counter += 1
-            self.mainWindow.alert_triggered = False
+            self.analyze(frame, frame.shape[:2])
+            return self.draw_overlay(frame)
+        
+        else:
+            return frame
 
-            height, width = frame.shape[:2]
+    '''Run detection on an analysis frame (any resolution) and record the overlay for a display frame'''
+    def analyze(self, frame, display_size):
+        self.overlay_ops = []
+        if not self.mainWindow.IS_DRIVE_ASSIST_ENABLED:
+            return
 
-            # Step 1: Detect obstacles in bottom half
-            self.detect_obstacles(frame, height)
+        self.mainWindow.frame_counter += 1
+        self.mainWindow.alert_triggered = False
 
-            # Step 2: Sample ambient light for color correction
-            hsv, ambient_hue_shift, ambient_val_shift = self.sample_ambient_light(frame)
+        height, width = frame.shape[:2]
+        display_height, display_width = display_size
 
-            # Step 3: Sample floor color and compute adaptive HSV thresholds
-            lower_floor, upper_floor, sample_box_coords = self.sample_floor_color(frame, hsv, ambient_hue_shift, ambient_val_shift)
+        # Tracking state is in analysis pixels, start over if the analysis size changes
+        if self.source_size != (width, height):
+            self.source_size = (width, height)
+            self.mainWindow.last_floor_contour = None
+            if hasattr(self, 'smoothed_curve'):
+                del self.smoothed_curve
+            self.initKalmanFilter()
+        self.scale = width / REFERENCE_WIDTH
+        self.to_display = (display_width / width, display_height / height)
 
-            # Step 4: Draw sample region on frame for debugging
-            
-            self.draw_floor_sampling_box(frame, sample_box_coords)
+        # Step 1: Detect obstacles in bottom half
+        self.detect_obstacles(frame, height)
 
-            # Step 5: Draw alert line if obstacles are near
-            if self.mainWindow.COLLISION_ASSIST_ENABLED:
-                self.draw_alert_line(frame, width)
+        # Step 2: Sample ambient light for color correction
+        hsv, ambient_hue_shift, ambient_val_shift = self.sample_ambient_light(frame)
 
-            # Step 6: Display alert zone GUI message
-            self.check_alert_popup(frame)
+        # Step 3: Sample floor color and compute adaptive HSV thresholds
+        lower_floor, upper_floor, sample_box_coords = self.sample_floor_color(frame, hsv, ambient_hue_shift, ambient_val_shift)
 
-            # Step 7: Create mask to isolate floor area
-            floor_mask = self.create_floor_mask(hsv, lower_floor, upper_floor, height)
+        # Step 4: Draw sample region on frame for debugging
+        
+        self.draw_floor_sampling_box(sample_box_coords)
 
-            # Step 8: Find and track largest floor contour
-            largest = self.get_largest_floor_contour(floor_mask)
+        # Step 5: Draw alert line if obstacles are near
+        if self.mainWindow.COLLISION_ASSIST_ENABLED:
+            self.draw_alert_line(display_width)
 
-            if largest is not None:
-                self.update_kalman_path(frame, largest)
+        # Step 6: Display alert zone GUI message
+        self.check_alert_popup(display_width)
 
-            return frame
-        
-        else:
-            return frame
+        # Step 7: Create mask to isolate floor area
+        floor_mask = self.create_floor_mask(hsv, lower_floor, upper_floor, height)
+
+        # Step 8: Find and track largest floor contour
+        largest = self.get_largest_floor_contour(floor_mask)
+
+        if largest is not None:
+            self.update_kalman_path(frame, largest)
+
+    '''Draw the overlay recorded by the last analyze() call'''
+    def draw_overlay(self, frame):
+        for draw, args, kwargs in self.overlay_ops:
+            draw(frame, *args, **kwargs)
+        return frame
+
+    '''Scale a reference (1280 wide) pixel size to the analysed frame'''
+    def px(self, size):
+        return max(1, int(size * self.scale))
+
+    '''Map an analysis-frame point to display-frame coordinates'''
+    def to_canvas(self, point):
+        return (int(point[0] * self.to_display[0]), int(point[1] * self.to_display[1]))
+
+    '''Record a drawing call; points are in display coordinates'''
+    def draw(self, func, *args, **kwargs):
+        self.overlay_ops.append((func, args, kwargs))
 
     '''Detect obstacles using background subtraction and edge detection'''
     def detect_obstacles(self, frame, height):
+        alert_line_y = self.mainWindow.alert_line_y / self.to_display[1]
         roi = frame[int(height * 0.5):, :]
         gray_bottom = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
 
@@ -91,11 +138,11 @@ class FrameProcessor:
         # Detect obstacle contours
         contours, _ = cv2.findContours(combined_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         for cnt in contours:
-            if cv2.contourArea(cnt) > 1000:
+            if cv2.contourArea(cnt) > 1000 * self.scale ** 2:
                 x, y, w, h = cv2.boundingRect(cnt)
                 depth_y = y + int(height * 0.5)
 
-                if depth_y + h > self.mainWindow.alert_line_y:
+                if depth_y + h > alert_line_y:
                     self.mainWindow.alert_triggered = True
 
                 # Simulated depth color
@@ -104,17 +151,18 @@ class FrameProcessor:
 
                 # Draw box
                 if self.mainWindow.OBJECT_VIS_ENABLED:
-                    cv2.rectangle(frame, (x, depth_y), (x + w, depth_y + h), color, 2)
-                    cv2.putText(frame, "Obstacle", (x, depth_y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+                    top_left = self.to_canvas((x, depth_y))
+                    self.draw(cv2.rectangle, top_left, self.to_canvas((x + w, depth_y + h)), color, 2)
+                    self.draw(cv2.putText, "Obstacle", (top_left[0], top_left[1] - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
 
     '''Sample ambient color for HSV correction'''
     def sample_ambient_light(self, frame):
         hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
         height, width = hsv.shape[:2]
 
-        x_a = width // 2 - 300
-        y_a = 90
-        sample = hsv[y_a:y_a + 30, x_a:x_a + 600]
+        x_a = width // 2 - self.px(300)
+        y_a = self.px(90)
+        sample = hsv[y_a:y_a + self.px(30), x_a:x_a + self.px(600)]
         blurred = cv2.GaussianBlur(sample, (5, 5), 0)
         mean = np.mean(blurred.reshape(-1, 3).astype(np.float32), axis=0)
         h_shift = int(mean[0] - 90)
@@ -122,16 +170,17 @@ class FrameProcessor:
 
         # Draw ambient sample box
         if self.mainWindow.AMBIENT_VIS_ENABLED:
-            cv2.rectangle(frame, (x_a, y_a), (x_a + 600, y_a + 30), (255, 100, 0), 1)
-            cv2.putText(frame, "Ambient", (x_a - 10, y_a - 5),cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 100, 0), 1)
+            top_left = self.to_canvas((x_a, y_a))
+            self.draw(cv2.rectangle, top_left, self.to_canvas((x_a + self.px(600), y_a + self.px(30))), (255, 100, 0), 1)
+            self.draw(cv2.putText, "Ambient", (top_left[0] - 10, top_left[1] - 5),cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 100, 0), 1)
 
         return hsv, h_shift, v_shift
 
     '''Smart floor color sampling and adaptive HSV margin calculation'''
     def sample_floor_color(self, frame, hsv, h_shift, v_shift):
         height, width = hsv.shape[:2]
-        sample_w, sample_h = 300, 50
-        y_start = height - sample_h - 100
+        sample_w, sample_h = self.px(300), self.px(50)
+        y_start = height - sample_h - self.px(100)
         x_center = width // 2
 
         # Edge-based mask to avoid obstacle regions
@@ -142,7 +191,7 @@ class FrameProcessor:
         '''x_start = self.find_clean_sample_x(obstacle_mask, y_start, sample_w, sample_h, width, x_center)
         self.last_sample_x = x_start'''
         clean_sample_found = False
-        for dx in range(0, width // 2, 10):
+        for dx in range(0, width // 2, self.px(10)):
             for direction in [-1, 1]:
                 x_start = x_center + dx * direction - sample_w // 2
                 if x_start < 0 or x_start + sample_w > width:
@@ -178,8 +227,9 @@ class FrameProcessor:
         self.auto_h_margin = h_margin
         self.auto_s_margin = s_margin
         self.auto_v_margin = v_margin
-        cv2.putText(frame, f"Auto HSV Margin: H={h_margin} S={s_margin} V={v_margin}", (frame.shape[1] - 340, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-        cv2.putText(frame, f"Ambient Shift – Hue: {h_shift:+.0f}, Value: {v_shift:+.0f}", (frame.shape[1] - 340, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        display_width = int(width * self.to_display[0])
+        self.draw(cv2.putText, f"Auto HSV Margin: H={h_margin} S={s_margin} V={v_margin}", (display_width - 340, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        self.draw(cv2.putText, f"Ambient Shift – Hue: {h_shift:+.0f}, Value: {v_shift:+.0f}", (display_width - 340, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
         #self.ambient_debug.setText(f"Ambient Shift – Hue: {h_shift:+.0f}, Value: {v_shift:+.0f}")
 
         corrected_h = np.clip(h - h_shift * 0.4, 0, 180)
@@ -201,31 +251,32 @@ class FrameProcessor:
         return getattr(self, 'last_sample_x', center - w // 2)'''
 
     '''Draw the yellow box used to sample floor HSV color'''
-    def draw_floor_sampling_box(self, frame, coords):
+    def draw_floor_sampling_box(self, coords):
         x, y, w, h = coords
         if self.mainWindow.FLOOR_SAMPLE_VIS_ENABLED:
-            cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 255, 0), 2)
-            cv2.putText(frame, "Floor Sample", (x - 10, y - 5),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
+            top_left = self.to_canvas((x, y))
+            self.draw(cv2.rectangle, top_left, self.to_canvas((x + w, y + h)), (255, 255, 0), 2)
+            self.draw(cv2.putText, "Floor Sample", (top_left[0] - 10, top_left[1] - 5),
+                      cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
 
     '''Draw a horizontal alert line across screen center'''
-    def draw_alert_line(self, frame, width):
+    def draw_alert_line(self, width):
         x_start = width // 2 - 400
         x_end = width // 2 + 400
         color = (0, 0, 255) if self.mainWindow.alert_triggered else (200, 200, 200)
-        cv2.line(frame, (x_start, self.mainWindow.alert_line_y), (x_end, self.mainWindow.alert_line_y), color, 2)
-        cv2.putText(frame, "ALERT ZONE", (x_start, self.mainWindow.alert_line_y - 10),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+        self.draw(cv2.line, (x_start, self.mainWindow.alert_line_y), (x_end, self.mainWindow.alert_line_y), color, 2)
+        self.draw(cv2.putText, "ALERT ZONE", (x_start, self.mainWindow.alert_line_y - 10),
+                  cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
 
     '''Update GUI alert zone message based on object detection'''
-    def check_alert_popup(self, frame):
+    def check_alert_popup(self, width):
         if self.mainWindow.alert_triggered and not getattr(self, 'alert_shown', False):
             self.alert_shown = True
-            cv2.putText(frame, "NOTICE: Collision Zone Entered", (frame.shape[1] - 310, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
+            self.draw(cv2.putText, "NOTICE: Collision Zone Entered", (width - 310, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
             #self.alert_zone_debug.setText("NOTICE: Collision Zone Entered")
         elif not self.mainWindow.alert_triggered:
             self.alert_shown = False
-            cv2.putText(frame, "SAFE", (frame.shape[1] - 310, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+            self.draw(cv2.putText, "SAFE", (width - 310, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
             #self.alert_zone_debug.setText("SAFE")
 
     '''Create binary mask for floor using HSV range and region-of-interest'''
@@ -247,7 +298,7 @@ class FrameProcessor:
         contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         if contours:
             largest = max(contours, key=cv2.contourArea)
-            if cv2.contourArea(largest) > 5000:
+            if cv2.contourArea(largest) > 5000 * self.scale ** 2:
                 self.mainWindow.last_floor_contour = largest
             elif self.mainWindow.last_floor_contour is not None:
                 largest = self.mainWindow.last_floor_contour
@@ -260,7 +311,8 @@ class FrameProcessor:
     '''Draw the tracked contour and Kalman filtered center point'''
     def update_kalman_path(self, frame, contour):
         if self.mainWindow.KALMAN_CENTER_VIS_ENABLED:
-            cv2.drawContours(frame, [contour], -1, (0, 255, 0), 3)
+            display_contour = (contour * np.array(self.to_display)).astype(np.int32)
+            self.draw(cv2.drawContours, [display_contour], -1, (0, 255, 0), 3)
         M = cv2.moments(contour)
         if M["m00"] > 0:
             cx = int(M["m10"] / M["m00"])
@@ -270,9 +322,10 @@ class FrameProcessor:
             prediction = self.kalman.predict()
             kx, ky = int(prediction[0]), int(prediction[1])
             if self.mainWindow.KALMAN_CENTER_VIS_ENABLED:
-                cv2.circle(frame, (kx, ky), 5, (0, 255, 255), -1)
-                cv2.putText(frame, "Kalman Center", (kx - 40, ky - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+                kx, ky = self.to_canvas((kx, ky))
+                self.draw(cv2.circle, (kx, ky), 5, (0, 255, 255), -1)
+                self.draw(cv2.putText, "Kalman Center", (kx - 40, ky - 10),
+                          cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
         self.draw_kalman_smoothed_curve(frame, contour, self.mainWindow.frame_counter)
 
 
@@ -293,7 +346,7 @@ class FrameProcessor:
                 pt1 = self.smoothed_curve[i]
                 pt2 = self.smoothed_curve[i + 1]
                 if self.mainWindow.KALMAN_CENTER_VIS_ENABLED:
-                    cv2.line(frame, pt1, pt2, (255, 0, 0), 2)
+                    self.draw(cv2.line, self.to_canvas(pt1), self.to_canvas(pt2), (255, 0, 0), 2)
             return
 
         # Centerline from contour
@@ -348,13 +401,14 @@ class FrameProcessor:
 
             # Draw final path
             if self.mainWindow.PATH_VIS_ENABLED:
-                for i in range(len(path_points) - 1):
+                display_points = [self.to_canvas(point) for point in path_points]
+                for i in range(len(display_points) - 1):
                     if i == 0:
-                        cv2.line(frame, path_points[i], path_points[i + 1], (255, 255, 0), 2)
-                    cv2.line(frame, path_points[i], path_points[i + 1], (255, 0, 0), 2)
+                        self.draw(cv2.line, display_points[i], display_points[i + 1], (255, 255, 0), 2)
+                    self.draw(cv2.line, display_points[i], display_points[i + 1], (255, 0, 0), 2)
 
                 # Draw predicted center
-                cv2.circle(frame, (int(prediction[0]), int(prediction[1])), 5, (0, 255, 255), -1)
+                self.draw(cv2.circle, self.to_canvas((int(prediction[0]), int(prediction[1]))), 5, (0, 255, 255), -1)
 
         except Exception as e:
             print("Path fitting error:", e)
@@ -0,0 +1,82 @@
+"""
+test_appLogStore.py
+
+Unit tests for LogStore search and row queries (pure Python, no Qt needed).
+
+Run from this folder with: python -m pytest test_appLogStore.py
+
+Author: HalfasleepDev
+Created: 18-10-2026
+"""
+
+# === Imports ===
+import unittest
+
+from appLogStore import LogStore, SCAN_MAX_ROWS
+
+# === Class Definitions ===
+class LogStoreSearchTest(unittest.TestCase):
+    def setUp(self):
+        self.store = LogStore()
+        self.store.extend([
+            (1.0, "INFO", "[HEARTBEAT] Heartbeat ok rtt=4ms"),
+            (2.0, "WARN", "[CONTROL] Delay > 200ms"),
+            (3.0, "INFO", "[VIDEO] Frame 12 decoded"),
+            (4.0, "ERROR", "[VIDEO] Frame 13 lost"),
+            (5.0, "INFO", "Connected to host"),
+        ])
+
+    def test_empty_search_matches_every_row(self):
+        self.assertIsNone(self.store.search(""))
+        self.assertEqual(list(self.store.rows()), [0, 1, 2, 3, 4])
+
+    def test_tokens_match_word_prefixes(self):
+        self.assertEqual(list(self.store.search("fram")), [2, 3])
+        self.assertEqual(list(self.store.search("heart")), [0])
+        self.assertEqual(list(self.store.search("rame")), [])
+
+    def test_every_token_must_match(self):
+        self.assertEqual(list(self.store.search("video lost")), [3])
+        self.assertEqual(list(self.store.search("video host")), [])
+
+    def test_search_is_case_insensitive(self):
+        self.assertEqual(list(self.store.search("CONNECTED")), [4])
+
+    def test_rows_filters_by_level(self):
+        self.assertEqual(list(self.store.rows({"INFO"})), [0, 2, 4])
+        self.assertEqual(list(self.store.rows({"INFO", "ERROR"}, "video")), [2, 3])
+        self.assertEqual(list(self.store.rows({"DEBUG"})), [])
+
+    def test_rows_limits_the_range(self):
+        self.assertEqual(list(self.store.rows(None, "", 1, 3)), [1, 2])
+        self.assertEqual(list(self.store.rows(None, "frame", 3, 5)), [3])
+
+    def test_appended_rows_match_like_a_full_search(self):
+        first, end = self.store.extend([
+            (6.0, "INFO", "[VIDEO] Frame 14 decoded"),
+            (7.0, "WARN", "Frame budget exceeded"),
+            (8.0, "INFO", "[HEARTBEAT] Heartbeat ok"),
+        ])
+        self.assertEqual((first, end), (5, 8))
+        self.assertEqual(list(self.store.rows(None, "frame", first, end)), [5, 6])
+        self.assertEqual(list(self.store.rows({"INFO"}, "video fr", first, end)), [5])
+        self.assertEqual(list(self.store.rows(None, "frame")), [2, 3, 5, 6])
+
+    def test_scan_and_index_agree(self):
+        messages = [f"[{tag}] item {i} value={i % 7}" for i, tag in
+                    zip(range(SCAN_MAX_ROWS + 100), ["VIDEO", "CONTROL", "NETWORK"] * (SCAN_MAX_ROWS + 100))]
+        self.store.extend((float(i), "INFO", message) for i, message in enumerate(messages))
+        for text in ("video", "value=3", "contr item", "net 4"):
+            scanned = self.store.scan(text, self.store.first_row, self.store.end_row)
+            self.assertEqual(list(scanned), list(self.store.search(text)), text)
+
+    def test_trim_keeps_row_numbers(self):
+        store = LogStore(max_rows=8)
+        store.extend((float(i), "INFO", f"line {i}") for i in range(6))
+        self.assertEqual(store.extend((float(i), "INFO", f"line {i}") for i in range(6, 10)), (0, 0))
+        self.assertEqual(store.first_row, 4)
+        self.assertEqual(list(store.rows(None, "line")), list(range(4, 10)))
+        self.assertEqual(store.record(9)[3], "line 9")
+
+if __name__ == "__main__":
+    unittest.main()
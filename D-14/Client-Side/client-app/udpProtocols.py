@@ -8,10 +8,18 @@ Created: 24-04-2025
 """
 
 import time
+import struct
 
 def current_time():
     return int(time.time() * 1000)
 
+# ====== Discovery Packets ======
+# ------ Unicast Probe (answered with an advertise packet) ------
+def discover_packet():
+    return {
+        "type": "discover"
+    }
+
 # ====== Handshake Packets ======
 # ------ Credentials ------
 def credential_packet(username, password):
@@ -22,10 +30,11 @@ def credential_packet(username, password):
     }
 
 # ------ Host Version Request ------
-def version_request_packet(CLIENT_VER: str):
+def version_request_packet(CLIENT_VER: str, CONTROL_FORMATS=("binary", "json")):
     return {
         "type": "version_request",
-        "client_ver": CLIENT_VER
+        "client_ver": CLIENT_VER,
+        "control_formats": list(CONTROL_FORMATS)
     }
 
 # ------ Host Setup Request ------
@@ -77,16 +86,93 @@ def send_tune_data_packet(PHASE: str, MIN_DUTY_SERVO=0, MAX_DUTY_SERVO=0, NEUTRA
         }
     
 
+# ------ Combined Handshake (every step in one request) ------
+def handshake_packet(username, password, CLIENT_VER: str, TUNE: dict, CONTROL_FORMATS=("binary", "json")):
+    return {
+        "type": "handshake",
+        "credentials": credential_packet(username, password),
+        "version_request": version_request_packet(CLIENT_VER, CONTROL_FORMATS),
+        "tune": TUNE
+    }
+
+# ------ Session Resume (token from handshake_complete) ------
+def session_resume_packet(SESSION_TOKEN: str, CLIENT_VER: str):
+    return {
+        "type": "session_resume",
+        "token": SESSION_TOKEN,
+        "client_ver": CLIENT_VER
+    }
+
 # ====== Movement Packets ======
 # ------ Keyboard Commands ------
-def keyboard_command_packet(cmd: str, esc_intensity, servo_intensity):
-    return {
+def keyboard_command_packet(cmd: str, esc_intensity, servo_intensity, seq: int = None):
+    packet = {
         "type": "keyboard_command",
         "command": cmd,
         "esc_intensity": esc_intensity,
         "servo_intensity": servo_intensity,
         "timestamp": current_time()
     }
+    if seq is not None:
+        packet["seq"] = seq
+    return packet
+
+# ------ Binary Control (negotiated in version_request) ------
+# Command:  magic (2s) | version (B) | command (B) | seq (I) | esc_intensity (h) | servo_intensity (h) |
+#           timestamp_ms (Q)
+# Ack:      magic (2s) | version (B) | command (B) | status (B) | seq (I) | esc_pw (H) | servo_pw (H) |
+#           timestamp_ms (Q)
+# Intensities are quantized to 1/CONTROL_INTENSITY_SCALE.
+CONTROL_MAGIC = b"DK"
+CONTROL_ACK_MAGIC = b"DA"
+CONTROL_PROTOCOL_VER = 1
+CONTROL_PACKET = struct.Struct("!2sBBIhhQ")
+CONTROL_ACK = struct.Struct("!2sBBBIHHQ")
+CONTROL_INTENSITY_SCALE = 10000
+
+CONTROL_ACK_OK = 0
+CONTROL_ACK_IGNORED = 1                 # Ignored command during emergency
+CONTROL_ACK_SUPERSEDED = 2              # Not applied: out of order, stale or replaced by a newer command
+CONTROL_ACK_FAULT = 3                   # Not applied: the actuator outputs are failing (held at neutral)
+CONTROL_ACK_MESSAGES = {
+    CONTROL_ACK_IGNORED: "Ignored command during emergency",
+    CONTROL_ACK_FAULT: "Ignored command during actuator fault",
+}
+
+CONTROL_COMMANDS = ("NONE", "UP", "DOWN", "LEFT", "RIGHT", "LEFTUP", "LEFTDOWN", "RIGHTUP", "RIGHTDOWN",
+                    "BRAKE", "NEUTRAL", "CENTER", "EMERGENCY_STOP", "CLEAR_EMERGENCY",
+                    "ENABLE_DRIVE_ASSIST", "DISABLE_DRIVE_ASSIST")
+CONTROL_COMMAND_IDS = {name: index for index, name in enumerate(CONTROL_COMMANDS)}
+
+def control_packet(cmd: str, esc_intensity, servo_intensity, seq: int):
+    return CONTROL_PACKET.pack(CONTROL_MAGIC, CONTROL_PROTOCOL_VER, CONTROL_COMMAND_IDS[cmd], seq & 0xFFFFFFFF,
+                               round((esc_intensity or 0.0) * CONTROL_INTENSITY_SCALE),
+                               round((servo_intensity or 0.0) * CONTROL_INTENSITY_SCALE),
+                               current_time())
+
+def parse_control_ack(data):
+    """
+    Decodes a binary control ack into the same dict a JSON command_ack carries.
+
+    Args:
+        data (bytes): The raw datagram.
+
+    Returns:
+        dict | None: The ack payload, or None if the datagram is not a valid binary ack.
+    """
+    if len(data) != CONTROL_ACK.size:
+        return None
+    magic, version, command, status, seq, esc_pw, servo_pw, timestamp = CONTROL_ACK.unpack(data)
+    if magic != CONTROL_ACK_MAGIC or version != CONTROL_PROTOCOL_VER or command >= len(CONTROL_COMMANDS):
+        return None
+    return {
+        "type": "command_ack",
+        "command": CONTROL_ACK_MESSAGES.get(status, CONTROL_COMMANDS[command]),
+        "seq": seq,
+        "esc_pw": esc_pw,
+        "servo_pw": servo_pw,
+        "timestamp": timestamp
+    }
 
 # ------ Drive Assist Commands ------
 def drive_assist_command_packet(cmd: str, intensity):
@@ -97,8 +183,101 @@ def drive_assist_command_packet(cmd: str, intensity):
         "timestamp": current_time()
     }
 
+# ------ Video Receiver Report ------
+def receiver_report_packet(frames_completed: int, frames_dropped: int, chunk_loss_pct: float, latency_ms, fps: float,
+                           fec_recovered: int = 0):
+    return {
+        "type": "receiver_report",
+        "frames_completed": frames_completed,
+        "frames_dropped": frames_dropped,
+        "chunk_loss_pct": chunk_loss_pct,
+        "latency_ms": latency_ms,
+        "fps": fps,
+        "fec_recovered": fec_recovered,
+        "timestamp": current_time()
+    }
+
+# ------ Video Tune ------
+def video_tune_packet(fec_group: int = None, mtu: int = None):
+    packet = {
+        "type": "video_tune",
+        "timestamp": current_time()
+    }
+    if fec_group is not None:
+        packet["fec_group"] = fec_group
+    if mtu is not None:
+        packet["mtu"] = mtu
+    return packet
+
+# ------ Heartbeat / Time Sync ------
+def heartbeat_packet(clock_offset_ms=None, clock_drift_ppm=None, clock_base_ms=None):
+    """
+    Heartbeat that doubles as a time-sync probe; the host answers with a heartbeat_ack.
+
+    The client's current clock offset estimate (host - client), the client time
+    it was measured at and its drift are passed along so the host can convert
+    client timestamps too.
+    """
+    packet = {
+        "type": "heartbeat",
+        "timestamp": current_time(),
+        "t0": time.time() * 1000.0
+    }
+    if clock_offset_ms is not None:
+        packet["clock_offset_ms"] = clock_offset_ms
+        packet["clock_drift_ppm"] = clock_drift_ppm
+        packet["clock_base_ms"] = clock_base_ms
+    return packet
+
 # ------ Shutdown Command ------
 def shutdown_host_packet():
     return {
         "type": "shutdown_systems"
     }
+
+# ====== Video Packets ======
+# ------ Binary Video Datagram (ver 2) ------
+# magic (2s) | version (B) | flags (B) | frame_id (I) | chunk_index (H) | chunk_count (H) |
+# chunk_size (H) | timestamp_ms (Q)
+# flags: bit 0 = parity chunk, bit 1 = analysis stream, bits 4-7 = FEC group size (0 = no FEC).
+# The analysis stream (low-res frames for the client CV) has its own frame ids.
+# A parity chunk uses chunk_index as its group index and its payload starts with
+# the frame length (I) followed by chunk_size bytes of XOR parity.
+VIDEO_MAGIC = b"DC"
+VIDEO_PROTOCOL_VER = 2
+VIDEO_HEADER = struct.Struct("!2sBBIHHHQ")
+VIDEO_FEC_HEADER = struct.Struct("!I")
+VIDEO_FLAG_PARITY = 0x01
+VIDEO_FLAG_ANALYSIS = 0x02
+VIDEO_FLAGS_OFFSET = 3      # Byte offset of the flags in the header
+
+def video_fec_group(flags: int) -> int:
+    return flags >> 4
+
+def parse_video_chunk(data):
+    """
+    Splits a video datagram into its header fields and JPEG payload.
+
+    Passing a memoryview keeps the payload a zero-copy view of the receive buffer.
+
+    Args:
+        data (bytes | memoryview): The raw datagram.
+
+    Returns:
+        tuple | None: (frame_id, chunk_index, chunk_count, chunk_size, timestamp, flags, payload),
+        or None if the datagram is not a valid video chunk.
+    """
+    if len(data) < VIDEO_HEADER.size:
+        return None
+    magic, version, flags, frame_id, chunk_index, chunk_count, chunk_size, timestamp = VIDEO_HEADER.unpack_from(data)
+    if magic != VIDEO_MAGIC or version != VIDEO_PROTOCOL_VER:
+        return None
+    if chunk_count == 0 or chunk_index >= chunk_count or chunk_size == 0:
+        return None
+    if flags & VIDEO_FLAG_PARITY:
+        # Parity payload is the frame length followed by exactly one chunk_size block
+        if video_fec_group(flags) < 2 or len(data) - VIDEO_HEADER.size != VIDEO_FEC_HEADER.size + chunk_size:
+            return None
+    elif len(data) - VIDEO_HEADER.size > chunk_size:
+        return None
+    return frame_id, chunk_index, chunk_count, chunk_size, timestamp, flags, data[VIDEO_HEADER.size:]
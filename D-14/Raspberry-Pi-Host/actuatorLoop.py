@@ -0,0 +1,388 @@
+"""
+actuatorLoop.py
+
+Fixed-rate actuator loop for the ESC and steering servo.
+
+The network layer only sets target pulse widths. A dedicated thread wakes at a
+fixed rate (200 Hz by default), slews each output toward its target within a
+configurable rate limit and writes it to pigpio. A command is never blocked by
+a slow or smoothed movement, and a newer target simply replaces the old one
+mid-slew.
+
+Throttle is only rate limited while moving away from neutral. Returning to
+neutral, braking and emergency stops are applied on the next tick; reversing
+drops to neutral on the next tick and is rate limited from there.
+
+A failed pigpio write (daemon gone, socket error) doesn't end the loop: it
+parks both setpoints at neutral, tries one neutral write and flags a fault
+that the network layer checks before applying and acking commands. Writes
+are retried every FAULT_RETRY seconds until one succeeds.
+
+Author: HalfasleepDev
+Created: 18-10-2026
+"""
+
+# === Imports ===
+import threading
+import time
+
+from hostLogger import log
+
+# === Constants ===
+JITTER_BUCKETS_US = [50, 100, 250, 500, 1000, 2000, 5000]     # Upper edges, the last bucket is open ended
+FAULT_RETRY = 0.5       # Seconds between output write attempts while faulted
+
+# === Class Definitions ===
+class JitterHistogram:
+    """
+    Counts how late each loop iteration woke up relative to its schedule.
+
+    Attributes:
+        edges (list[int]): Bucket upper edges in microseconds.
+        counts (list[int]): Samples per bucket, one more than there are edges.
+        samples (int): Total samples.
+        max_us (float): Worst lateness seen.
+    """
+
+    def __init__(self, edges: list = JITTER_BUCKETS_US):
+        """
+        Initializes an empty histogram.
+
+        Args:
+            edges (list[int]): Bucket upper edges in microseconds.
+        """
+        self.edges = list(edges)
+        self.reset()
+
+    def reset(self):
+        """
+        Clears every bucket.
+        """
+        self.counts = [0] * (len(self.edges) + 1)
+        self.samples = 0
+        self.total_us = 0.0
+        self.max_us = 0.0
+
+    def add(self, late_us: float):
+        """
+        Records one sample.
+
+        Args:
+            late_us (float): Lateness in microseconds.
+        """
+        index = 0
+        while index < len(self.edges) and late_us > self.edges[index]:
+            index += 1
+        self.counts[index] += 1
+        self.samples += 1
+        self.total_us += late_us
+        self.max_us = max(self.max_us, late_us)
+
+    def percentile(self, pct: float) -> float:
+        """
+        Returns the upper edge of the bucket holding the given percentile.
+
+        Args:
+            pct (float): Percentile between 0 and 100.
+
+        Returns:
+            float: Bucket edge in microseconds (max_us for the open bucket).
+        """
+        if not self.samples:
+            return 0.0
+        target = self.samples * pct / 100.0
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return float(self.edges[index]) if index < len(self.edges) else self.max_us
+        return self.max_us
+
+    def snapshot(self) -> dict:
+        """
+        Returns:
+            dict: Bucket labels -> counts, plus mean, p99 and max lateness in microseconds.
+        """
+        labels = [f"<={edge}us" for edge in self.edges] + [f">{self.edges[-1]}us"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "samples": self.samples,
+            "mean_us": round(self.total_us / self.samples, 1) if self.samples else 0.0,
+            "p99_us": self.percentile(99),
+            "max_us": round(self.max_us, 1),
+        }
+
+class ActuatorLoop:
+    """
+    Drives the ESC and servo toward their setpoints at a fixed rate.
+
+    Attributes:
+        rate_hz (float): Loop rate.
+        esc_slew (float): Throttle rate limit away from neutral, in us/s (0 = unlimited).
+        servo_slew (float): Steering rate limit, in us/s (0 = unlimited).
+        center_slew (float): Steering rate limit while re-centering, in us/s.
+        esc_target (int): ESC setpoint.
+        servo_target (int): Servo setpoint.
+        jitter (JitterHistogram): Wake-up lateness of the loop.
+        ticks (int): Loop iterations since start.
+        overruns (int): Ticks skipped because the loop fell a full period behind.
+        writes (int): pigpio writes issued.
+        write_errors (int): pigpio writes that raised.
+        fault (Exception | None): Last write error, until a write succeeds again.
+    """
+
+    def __init__(self, core, rate_hz: float = 200.0, esc_slew: float = 4000.0,
+                 servo_slew: float = 8000.0, center_slew: float = 1000.0):
+        """
+        Initializes the loop with both outputs at neutral.
+
+        Args:
+            core (DriveCoreHost): Owner of the pigpio handle, pins and duty limits.
+            rate_hz (float): Loop rate.
+            esc_slew (float): Throttle rate limit away from neutral, in us/s.
+            servo_slew (float): Steering rate limit, in us/s.
+            center_slew (float): Steering rate limit while re-centering, in us/s.
+        """
+        self.core = core
+        self.rate_hz = rate_hz
+        self.period = 1.0 / rate_hz
+        self.esc_slew = esc_slew
+        self.servo_slew = servo_slew
+        self.center_slew = center_slew
+
+        self.lock = threading.Lock()
+        self.esc_target = core.neutral_duty_esc
+        self.servo_target = core.neutral_servo
+        self.servo_target_slew = servo_slew
+        self.esc_output = float(self.esc_target)
+        self.servo_output = float(self.servo_target)
+        self.esc_written = None
+        self.servo_written = None
+
+        self.thread = None
+        self.stop_event = threading.Event()
+
+        self.jitter = JitterHistogram()
+        self.ticks = 0
+        self.overruns = 0
+        self.writes = 0
+        self.write_errors = 0
+        self.fault = None
+        self.fault_time = 0.0
+
+    # === Setpoints ===
+    def set_targets(self, esc: int = None, servo: int = None):
+        """
+        Updates one or both setpoints.
+
+        Args:
+            esc (int, optional): ESC pulse width.
+            servo (int, optional): Servo pulse width, reached at the steering rate limit.
+        """
+        with self.lock:
+            if esc is not None:
+                self.esc_target = esc
+            if servo is not None:
+                self.servo_target = servo
+                self.servo_target_slew = self.servo_slew
+
+    def center(self):
+        """
+        Returns the steering to neutral at the (slower) centering rate.
+        """
+        with self.lock:
+            self.servo_target = self.core.neutral_servo
+            self.servo_target_slew = self.center_slew
+
+    def emergency_stop(self):
+        """
+        Brakes and centers the steering on the next tick, bypassing the rate limits.
+        """
+        with self.lock:
+            self.esc_target = self.core.brake_esc
+            self.servo_target = self.core.neutral_servo
+            self.esc_output = float(self.esc_target)
+            self.servo_output = float(self.servo_target)
+
+    def neutral(self):
+        """
+        Sets throttle to neutral and centers the steering.
+        """
+        with self.lock:
+            self.esc_target = self.core.neutral_duty_esc
+            self.servo_target = self.core.neutral_servo
+            self.servo_target_slew = self.center_slew
+
+    def targets(self) -> tuple:
+        """
+        Returns:
+            tuple[int, int]: Current ESC and servo setpoints.
+        """
+        with self.lock:
+            return self.esc_target, self.servo_target
+
+    # === Loop ===
+    def start(self):
+        """
+        Starts the loop thread if it is not already running.
+        """
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name="actuator", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 1.0):
+        """
+        Stops the loop thread.
+
+        Args:
+            timeout (float): Seconds to wait for the thread.
+        """
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def run(self):
+        """
+        Loop body: sleep to the next deadline, record the lateness, step both outputs.
+        """
+        next_tick = time.perf_counter()
+        last = next_tick
+
+        while not self.stop_event.is_set():
+            next_tick += self.period
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            now = time.perf_counter()
+            late = now - next_tick
+            self.jitter.add(late * 1e6)
+
+            if late > self.period:
+                # Fell behind (GC pause, CPU contention): skip the missed ticks instead of bursting
+                missed = int(late / self.period)
+                self.overruns += missed
+                next_tick += missed * self.period
+
+            if self.fault is None or now - self.fault_time >= FAULT_RETRY:
+                try:
+                    self.step(now - last)
+                except Exception as e:
+                    self._on_write_error(e, now)
+                else:
+                    if self.fault is not None:
+                        log.warn("actuator", "Output writes recovered after %d errors", self.write_errors)
+                        self.fault = None
+            last = now
+            self.ticks += 1
+
+    def _on_write_error(self, error: Exception, now: float):
+        """
+        Parks both outputs at neutral after a failed write and flags the fault.
+
+        The next attempt rewrites both outputs, so a recovered daemon starts
+        from neutral rather than from whatever was last written.
+
+        Args:
+            error (Exception): What the pigpio call raised.
+            now (float): perf_counter time of the failed step.
+        """
+        self.write_errors += 1
+        if self.fault is None:
+            log.error("actuator", "Output write failed, holding neutral: %s", error)
+        self.fault = error
+        self.fault_time = now
+
+        neutral = self.core.neutral_duty_esc
+        with self.lock:
+            self.esc_target = neutral
+            self.servo_target = self.core.neutral_servo
+            self.esc_output = float(neutral)
+            self.servo_output = float(self.servo_target)
+        self.esc_written = None
+        self.servo_written = None
+        try:
+            self.core.pi.set_servo_pulsewidth(self.core.ESC_PIN, neutral)
+        except Exception:
+            pass
+
+    def step(self, dt: float):
+        """
+        Moves both outputs toward their setpoints and writes any change.
+
+        Args:
+            dt (float): Seconds since the previous step.
+        """
+        neutral = self.core.neutral_duty_esc
+        with self.lock:
+            esc_target = self.esc_target
+            if (esc_target - neutral) * (self.esc_output - neutral) < 0:
+                # Reversing: drop to neutral now, then rate limit away from it
+                self.esc_output = float(neutral)
+            if (self.esc_slew and esc_target != self.core.brake_esc
+                    and abs(esc_target - neutral) > abs(self.esc_output - neutral)):
+                # Accelerating: rate limit toward the target
+                self.esc_output = self._slew(self.esc_output, esc_target, self.esc_slew * dt)
+            else:
+                # Slowing or braking: apply now
+                self.esc_output = float(esc_target)
+
+            if self.servo_target_slew:
+                self.servo_output = self._slew(self.servo_output, self.servo_target, self.servo_target_slew * dt)
+            else:
+                self.servo_output = float(self.servo_target)
+
+            esc_pw = int(round(self.esc_output))
+            servo_pw = int(round(self.servo_output))
+
+        # Only write on change so calibration writes from the tune menu are not overridden
+        if esc_pw != self.esc_written:
+            self.core.pi.set_servo_pulsewidth(self.core.ESC_PIN, esc_pw)
+            self.esc_written = esc_pw
+            self.writes += 1
+        if servo_pw != self.servo_written:
+            self.core.pi.set_servo_pulsewidth(self.core.SERVO_PIN, servo_pw)
+            self.servo_written = servo_pw
+            self.writes += 1
+
+        self.core.current_esc_pw = esc_pw
+        self.core.current_servo_pw = servo_pw
+
+    @staticmethod
+    def _slew(current: float, target: float, max_step: float) -> float:
+        """
+        Moves current toward target by at most max_step.
+        """
+        if current < target:
+            return min(current + max_step, target)
+        return max(current - max_step, target)
+
+    # === Stats ===
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Rate, tick/overrun/write counts, outputs, setpoints and the jitter histogram.
+        """
+        with self.lock:
+            return {
+                "rate_hz": self.rate_hz,
+                "ticks": self.ticks,
+                "overruns": self.overruns,
+                "writes": self.writes,
+                "write_errors": self.write_errors,
+                "fault": str(self.fault) if self.fault is not None else None,
+                "esc": {"target": self.esc_target, "output": int(round(self.esc_output))},
+                "servo": {"target": self.servo_target, "output": int(round(self.servo_output))},
+                "jitter": self.jitter.snapshot(),
+            }
+
+    def format_stats(self) -> str:
+        """
+        Returns:
+            str: One-line summary of loop timing.
+        """
+        jitter = self.jitter.snapshot()
+        return (f"{self.rate_hz:.0f}Hz ticks={self.ticks} overruns={self.overruns} writes={self.writes} "
+                f"jitter mean={jitter['mean_us']}us p99<={jitter['p99_us']:.0f}us max={jitter['max_us']}us")
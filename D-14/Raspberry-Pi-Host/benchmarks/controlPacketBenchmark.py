@@ -0,0 +1,103 @@
+"""
+controlPacketBenchmark.py
+
+Compares the per-packet cost of the JSON and binary control formats: the
+client encoding a command, the host decoding it, the host encoding the ack and
+the client decoding the ack. Run it on the Pi to see the host-side savings.
+
+Usage:
+    python benchmarks/controlPacketBenchmark.py [--packets 200000]
+
+Author: HalfasleepDev
+Created: 18-10-2026
+"""
+
+# === Imports ===
+import argparse
+import json
+import os
+import sys
+import time
+
+HOST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+CLIENT_DIR = os.path.join(HOST_DIR, "..", "Client-Side", "client-app")
+sys.path.insert(0, HOST_DIR)
+sys.path.insert(0, CLIENT_DIR)
+
+from udpHostProtocols import keyboard_command_ack_packet, parse_control_packet, control_ack_packet, CONTROL_ACK_OK
+from udpProtocols import keyboard_command_packet, control_packet, parse_control_ack
+
+# === Constants ===
+COMMAND = ("LEFTUP", 0.73, 0.41)
+ACK_PW = (1620, 1790)
+
+# === Helper Functions ===
+def timeLoop(func, packets: int) -> float:
+    """
+    Times func over a number of packets.
+
+    Args:
+        func (Callable): Called once per packet with the packet number.
+        packets (int): Iterations.
+
+    Returns:
+        float: Microseconds per packet.
+    """
+    start = time.perf_counter()
+    for seq in range(packets):
+        func(seq)
+    return (time.perf_counter() - start) / packets * 1e6
+
+def benchmarkJson(packets: int) -> dict:
+    """
+    Times each step of the JSON control round trip.
+    """
+    cmd, esc, servo = COMMAND
+    command = json.dumps(keyboard_command_packet(cmd, esc, servo, 1)).encode()
+    ack = json.dumps(keyboard_command_ack_packet(cmd, *ACK_PW, 1)).encode()
+    return {
+        "command_bytes": len(command),
+        "ack_bytes": len(ack),
+        "client_encode_us": timeLoop(lambda seq: json.dumps(keyboard_command_packet(cmd, esc, servo, seq)).encode(), packets),
+        "host_decode_us": timeLoop(lambda seq: json.loads(command.decode()), packets),
+        "host_ack_encode_us": timeLoop(lambda seq: json.dumps(keyboard_command_ack_packet(cmd, *ACK_PW, seq)).encode(), packets),
+        "client_ack_decode_us": timeLoop(lambda seq: json.loads(ack.decode()), packets),
+    }
+
+def benchmarkBinary(packets: int) -> dict:
+    """
+    Times each step of the binary control round trip.
+    """
+    cmd, esc, servo = COMMAND
+    command = control_packet(cmd, esc, servo, 1)
+    ack = control_ack_packet(cmd, CONTROL_ACK_OK, 1, *ACK_PW)
+    return {
+        "command_bytes": len(command),
+        "ack_bytes": len(ack),
+        "client_encode_us": timeLoop(lambda seq: control_packet(cmd, esc, servo, seq), packets),
+        "host_decode_us": timeLoop(lambda seq: parse_control_packet(command), packets),
+        "host_ack_encode_us": timeLoop(lambda seq: control_ack_packet(cmd, CONTROL_ACK_OK, seq, *ACK_PW), packets),
+        "client_ack_decode_us": timeLoop(lambda seq: parse_control_ack(ack), packets),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON vs binary control packet encode/decode cost")
+    parser.add_argument("--packets", type=int, default=200000)
+    args = parser.parse_args()
+
+    results = {"json": benchmarkJson(args.packets), "binary": benchmarkBinary(args.packets)}
+
+    print(f"{'':22}{'json':>10}{'binary':>10}{'speedup':>10}")
+    for key in results["json"]:
+        json_value, binary_value = results["json"][key], results["binary"][key]
+        if key.endswith("_bytes"):
+            print(f"{key:22}{json_value:>10}{binary_value:>10}")
+        else:
+            print(f"{key:22}{json_value:>10.2f}{binary_value:>10.2f}{json_value / binary_value:>9.1f}x")
+
+    host_json = results["json"]["host_decode_us"] + results["json"]["host_ack_encode_us"]
+    host_binary = results["binary"]["host_decode_us"] + results["binary"]["host_ack_encode_us"]
+    print(f"\nHost cost per command: json {host_json:.2f}us, binary {host_binary:.2f}us ({host_json / host_binary:.1f}x)")
+
+if __name__ == "__main__":
+    main()
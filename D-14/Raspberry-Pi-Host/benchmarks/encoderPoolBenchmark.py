@@ -0,0 +1,119 @@
+"""
+encoderPoolBenchmark.py
+
+Measures encoded fps of the host video pipeline per encoder worker count,
+using a loop of 1280x720 frames taken from any camera source (synthetic by
+default, so no camera is needed).
+
+Usage:
+    python benchmarks/encoderPoolBenchmark.py [--workers 1 2 3 4] [--seconds 5] [--quality 40]
+                                              [--source synthetic|opencv|replay|picamera2] [--path FILE]
+
+Author: HalfasleepDev
+Created: 18-10-2026
+"""
+
+# === Imports ===
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from videoPipeline import VideoPipeline, PipelineFrame
+from cameraSource import create_camera_source, CAMERA_SOURCES
+
+# === Constants ===
+WIDTH, HEIGHT = 1280, 720
+SOURCE_FRAMES = 30
+
+# === Helper Functions ===
+def captureFrames(source: str, path: str, count: int = SOURCE_FRAMES):
+    """
+    Captures a short loop of 720p frames, so the encoder isn't limited by the source.
+
+    Args:
+        source (str): Camera source backend.
+        path (str): Device or recording for the opencv/replay backends.
+        count (int): Number of frames in the loop.
+
+    Returns:
+        list[numpy.ndarray]: HxW frames.
+    """
+    camera = create_camera_source(source, (WIDTH, HEIGHT), 0, path=path)
+    camera.start()
+    try:
+        return [camera.read().image for _ in range(count)]
+    finally:
+        camera.stop()
+
+def runOnce(frames, workers: int, seconds: float, quality: int) -> dict:
+    """
+    Runs the pipeline with a given worker count and returns its stats.
+
+    Args:
+        frames (list): Source frames.
+        workers (int): Encoder worker count.
+        seconds (float): Measurement duration.
+        quality (int): JPEG quality.
+
+    Returns:
+        dict: Encoded fps, frames sent and average JPEG size.
+    """
+    state = {"next": 0, "sent": 0, "bytes": 0, "last_id": -1, "out_of_order": 0}
+
+    def capture(_):
+        frame = PipelineFrame(state["next"], int(time.time() * 1000), frames[state["next"] % len(frames)])
+        state["next"] += 1
+        return frame
+
+    def encode(frame):
+        _, buffer = cv2.imencode(".jpg", frame.image, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+        frame.jpeg = buffer.tobytes()
+        frame.image = None
+        return frame
+
+    def transmit(frame):
+        if frame.frame_id < state["last_id"]:
+            state["out_of_order"] += 1
+        state["last_id"] = frame.frame_id
+        state["sent"] += 1
+        state["bytes"] += len(frame.jpeg)
+
+    pipeline = VideoPipeline(capture, encode, transmit, queue_size=2, encoder_workers=workers)
+    pipeline.start()
+    time.sleep(1.0)                             # Warm up
+    sent_start, start = state["sent"], time.perf_counter()
+    time.sleep(seconds)
+    sent, elapsed = state["sent"] - sent_start, time.perf_counter() - start
+    pipeline.stop()
+
+    return {
+        "workers": workers,
+        "encoded_fps": round(sent / elapsed, 1),
+        "avg_jpeg_kb": round(state["bytes"] / max(state["sent"], 1) / 1024, 1),
+        "out_of_order": state["out_of_order"],
+    }
+
+# === Main Execution ===
+def main():
+    parser = argparse.ArgumentParser(description="Encoder pool fps per worker count")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 3, 4])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--quality", type=int, default=40)
+    parser.add_argument("--source", choices=CAMERA_SOURCES, default="synthetic")
+    parser.add_argument("--path", default="", help="Device for opencv, file or JPEG directory for replay")
+    args = parser.parse_args()
+
+    frames = captureFrames(args.source, args.path)
+    print(f"{args.source} source: {WIDTH}x{HEIGHT}, JPEG quality {args.quality}")
+    for workers in args.workers:
+        result = runOnce(frames, workers, args.seconds, args.quality)
+        print(f"workers={result['workers']}  encoded_fps={result['encoded_fps']:6.1f}  "
+              f"avg_jpeg={result['avg_jpeg_kb']} KB  out_of_order={result['out_of_order']}")
+
+if __name__ == "__main__":
+    main()
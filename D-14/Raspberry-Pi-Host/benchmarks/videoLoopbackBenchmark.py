@@ -0,0 +1,537 @@
+"""
+videoLoopbackBenchmark.py
+
+End-to-end video benchmark over loopback: the host video pipeline and the
+client receiver run in one process, connected through an in-process UDP
+impairment proxy that adds loss, reordering, jitter, delay and a bandwidth cap.
+
+Reports fps, frame completion rate, capture-to-decode latency percentiles and
+CPU time per frame, and saves them as JSON so runs can be compared.
+
+Usage:
+    python benchmarks/videoLoopbackBenchmark.py [--seconds 10] [--loss 1.0] [--reorder 2.0]
+        [--jitter-ms 5] [--delay-ms 2] [--bandwidth-mbps 20] [--queue-ms 100]
+        [--quality 40] [--fps 60] [--workers 2] [--fec 8] [--mtu 1500] [--adaptive]
+        [--source synthetic] [--path FILE] [--output results.json] [--compare previous.json]
+
+Author: HalfasleepDev
+Created: 18-10-2026
+"""
+
+# === Imports ===
+import argparse
+import heapq
+import json
+import os
+import random
+import select
+import socket
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+HOST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+CLIENT_DIR = os.path.join(HOST_DIR, "..", "Client-Side", "client-app")
+sys.path.insert(0, HOST_DIR)
+sys.path.insert(0, CLIENT_DIR)
+
+from cameraSource import create_camera_source, CAMERA_SOURCES
+from udpHostProtocols import current_time
+from videoController import AdaptiveQualityController
+from videoFec import build_parity_chunks
+from videoPipeline import VideoPipeline, PipelineFrame
+from videoSender import DatagramBatchSender, send_video_frame, chunk_size_for_mtu, DATAGRAM_HEADER_SIZE
+from appVideoReceiver import FrameReassembler, VideoReceiver
+
+# === Constants ===
+WIDTH, HEIGHT = 1280, 720
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# === Helper Functions ===
+def percentile(values, pct: float) -> float:
+    """
+    Nearest-rank percentile.
+
+    Args:
+        values (list[float]): Samples.
+        pct (float): Percentile, 0-100.
+
+    Returns:
+        float: The percentile, or 0.0 for no samples.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+# === Class Definitions ===
+class ImpairmentProxy:
+    """
+    A UDP relay between host and client that degrades the host -> client direction.
+
+    Each datagram is dropped with the loss probability, otherwise it is given a
+    departure time: the bandwidth cap serialises datagrams one after another,
+    then the base delay and a random jitter are added, and a share of datagrams
+    is held back an extra reorder delay so they overtake each other. Datagrams
+    that would wait longer than the queue limit for the link are tail dropped,
+    like a router buffer. The reverse direction (receiver reports) is relayed
+    without impairment.
+
+    Attributes:
+        forwarded (int): Datagrams delivered to the client.
+        dropped_loss (int): Datagrams dropped by random loss.
+        dropped_queue (int): Datagrams dropped because the link queue was full.
+        reordered (int): Datagrams held back to arrive out of order.
+    """
+
+    def __init__(self, client_addr, loss_pct: float = 0.0, reorder_pct: float = 0.0, reorder_ms: float = 10.0,
+                 jitter_ms: float = 0.0, delay_ms: float = 0.0, bandwidth_mbps: float = 0.0,
+                 queue_ms: float = 100.0, seed: int = 1):
+        """
+        Binds the proxy socket on loopback.
+
+        Args:
+            client_addr (tuple): Address of the client video socket.
+            loss_pct (float): Random loss, percent of datagrams.
+            reorder_pct (float): Percent of datagrams delayed an extra reorder_ms.
+            reorder_ms (float): Extra delay of reordered datagrams.
+            jitter_ms (float): Maximum random extra delay (uniform).
+            delay_ms (float): Fixed one-way delay.
+            bandwidth_mbps (float): Link rate, 0 = unlimited.
+            queue_ms (float): Longest a datagram may wait for the link before it is dropped.
+            seed (int): Random seed, so runs are repeatable.
+        """
+        self.client_addr = client_addr
+        self.loss = loss_pct / 100.0
+        self.reorder = reorder_pct / 100.0
+        self.reorder_delay = reorder_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.delay = delay_ms / 1000.0
+        self.bytes_per_second = bandwidth_mbps * 1e6 / 8 if bandwidth_mbps else 0.0
+        self.queue_limit = queue_ms / 1000.0
+        self.random = random.Random(seed)
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        self.sock.bind(("127.0.0.1", 0))
+        self.addr = self.sock.getsockname()
+        self.host_addr = None
+
+        self.scheduled = []         # Heap of (departure time, sequence, datagram)
+        self.sequence = 0
+        self.link_free_at = 0.0
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.cpu_time = 0.0
+
+        self.forwarded = 0
+        self.dropped_loss = 0
+        self.dropped_queue = 0
+        self.reordered = 0
+
+    def start(self):
+        """
+        Starts the relay thread.
+        """
+        self.thread = threading.Thread(target=self.run, name="impairment-proxy", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stops the relay thread and closes the socket.
+        """
+        self.stop_event.set()
+        self.thread.join(2.0)
+        self.sock.close()
+
+    def run(self):
+        """
+        Relay loop: receive, schedule, release due datagrams.
+        """
+        cpu_start = time.thread_time()
+        while not self.stop_event.is_set():
+            now = time.monotonic()
+            timeout = 0.05
+            if self.scheduled:
+                timeout = max(0.0, min(timeout, self.scheduled[0][0] - now))
+
+            readable, _, _ = select.select([self.sock], [], [], timeout)
+            if readable:
+                self._receive_all()
+
+            now = time.monotonic()
+            while self.scheduled and self.scheduled[0][0] <= now:
+                _, _, data = heapq.heappop(self.scheduled)
+                self.sock.sendto(data, self.client_addr)
+                self.forwarded += 1
+        self.cpu_time = time.thread_time() - cpu_start
+
+    def _receive_all(self):
+        """
+        Drains the socket, relaying reports to the host and scheduling video for the client.
+        """
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(65536, socket.MSG_DONTWAIT)
+            except BlockingIOError:
+                return
+
+            if addr == self.client_addr:
+                if self.host_addr is not None:
+                    self.sock.sendto(data, self.host_addr)
+                continue
+            self.host_addr = addr
+
+            if self.random.random() < self.loss:
+                self.dropped_loss += 1
+                continue
+
+            now = time.monotonic()
+            departure = now
+            if self.bytes_per_second:
+                start = max(now, self.link_free_at)
+                if start - now > self.queue_limit:
+                    self.dropped_queue += 1
+                    continue
+                self.link_free_at = start + len(data) / self.bytes_per_second
+                departure = self.link_free_at
+
+            departure += self.delay + self.random.random() * self.jitter
+            if self.random.random() < self.reorder:
+                departure += self.reorder_delay
+                self.reordered += 1
+
+            heapq.heappush(self.scheduled, (departure, self.sequence, data))
+            self.sequence += 1
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Relay counters.
+        """
+        return {
+            "forwarded": self.forwarded,
+            "dropped_loss": self.dropped_loss,
+            "dropped_queue": self.dropped_queue,
+            "reordered": self.reordered,
+        }
+
+class LoopbackClient:
+    """
+    The client side of the benchmark: VideoReceiver + JPEG decode, as in VideoThread.
+
+    Attributes:
+        latencies (list[float]): Capture-to-decode latency of each decoded frame, ms.
+        completed_ids (set[int]): Frame ids that were decoded.
+        cpu_time (float): CPU seconds used by the receive thread.
+    """
+
+    REPORT_INTERVAL = 0.5
+
+    def __init__(self, frame_deadline_ms: int = 250):
+        """
+        Binds the client video socket on loopback.
+
+        Args:
+            frame_deadline_ms (int): Reassembler deadline for partial frames.
+        """
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.1)
+        self.addr = self.sock.getsockname()
+        self.receiver = VideoReceiver(self.sock, FrameReassembler(frame_deadline_ms=frame_deadline_ms))
+
+        self.measuring = False
+        self.latencies = []
+        self.completed_ids = set()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.cpu_time = 0.0
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="loopback-client", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join(2.0)
+        self.sock.close()
+
+    def run(self):
+        """
+        Receive loop: reassemble, decode, record latency, send receiver reports.
+        """
+        last_report = time.monotonic()
+        cpu_start = time.thread_time()
+        while not self.stop_event.is_set():
+            try:
+                completed = self.receiver.receive()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            if time.monotonic() - last_report >= self.REPORT_INTERVAL:
+                self.receiver.send_report()
+                last_report = time.monotonic()
+
+            if completed is None:
+                continue
+
+            frame_id, timestamp, frame_view = completed
+            image = cv2.imdecode(np.frombuffer(frame_view, np.uint8), cv2.IMREAD_COLOR)
+            if image is None or not self.measuring:
+                continue
+            self.latencies.append(time.time() * 1000 - timestamp)
+            self.completed_ids.add(frame_id)
+        self.cpu_time = time.thread_time() - cpu_start
+
+class LoopbackHost:
+    """
+    The host side of the benchmark: camera source -> VideoPipeline -> batched sender,
+    built the same way as NetworkManager.video_stream.
+
+    Attributes:
+        sent_ids (list[int]): Frame ids transmitted while measuring.
+        bytes_sent (int): JPEG bytes transmitted while measuring.
+    """
+
+    def __init__(self, proxy_addr, args):
+        """
+        Creates the camera source, pipeline and connected video socket.
+
+        Args:
+            proxy_addr (tuple): Address of the impairment proxy.
+            args (argparse.Namespace): Benchmark options.
+        """
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 262144)
+        self.sock.connect(proxy_addr)
+        self.sender = DatagramBatchSender(self.sock)
+        self.chunk_size = chunk_size_for_mtu(args.mtu, DATAGRAM_HEADER_SIZE)
+
+        self.camera = create_camera_source(args.source, (WIDTH, HEIGHT), args.fps, path=args.path)
+        self.controller = AdaptiveQualityController(fec_group=args.fec) if args.adaptive else None
+        self.args = args
+
+        self.next_frame_id = 0
+        self.measuring = False
+        self.sent_ids = []
+        self.bytes_sent = 0
+        self.stop_event = threading.Event()
+        self.report_thread = None
+
+        self.pipeline = VideoPipeline(self.capture, self.encode, self.transmit, queue_size=2,
+                                      encoder_workers=args.workers)
+
+    # === Pipeline Stages ===
+    def capture(self, _):
+        camera_frame = self.camera.read()
+        frame = PipelineFrame(self.next_frame_id, current_time(), camera_frame.image)
+        self.next_frame_id = (self.next_frame_id + 1) & 0xFFFFFFFF
+        return frame
+
+    def encode(self, frame):
+        quality = self.controller.quality if self.controller else self.args.quality
+        fec_group = self.controller.fec_group if self.controller else self.args.fec
+
+        image = frame.image
+        if self.controller and self.controller.resolution != (WIDTH, HEIGHT):
+            image = cv2.resize(image, self.controller.resolution, interpolation=cv2.INTER_AREA)
+        _, buffer = cv2.imencode(".jpg", image, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+        frame.jpeg = memoryview(buffer).cast("B")
+        frame.image = None
+        frame.chunk_size = self.chunk_size
+        if fec_group:
+            frame.fec_group = fec_group
+            frame.parity = build_parity_chunks(frame.jpeg, frame.chunk_size, fec_group)
+        return frame
+
+    def transmit(self, frame):
+        send_video_frame(self.sender, frame)
+        if self.measuring:
+            self.sent_ids.append(frame.frame_id)
+            self.bytes_sent += len(frame.jpeg)
+
+    # === Lifecycle ===
+    def start(self):
+        self.camera.start()
+        self.pipeline.start()
+        self.report_thread = threading.Thread(target=self.handle_reports, name="loopback-reports", daemon=True)
+        self.report_thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.pipeline.stop()
+        self.report_thread.join(2.0)
+        self.camera.stop()
+        self.sock.close()
+
+    def handle_reports(self):
+        """
+        Feeds receiver reports to the quality controller (when --adaptive is on).
+        """
+        while not self.stop_event.is_set():
+            readable, _, _ = select.select([self.sock], [], [], 0.1)
+            if not readable:
+                continue
+            try:
+                payload = json.loads(self.sock.recv(4096))
+            except (OSError, ValueError):
+                continue
+            if self.controller and payload.get("type") == "receiver_report":
+                self.controller.on_report(payload)
+
+# === Benchmark ===
+def runBenchmark(args) -> dict:
+    """
+    Runs one benchmark and returns its results.
+
+    Args:
+        args (argparse.Namespace): Benchmark options.
+
+    Returns:
+        dict: Configuration and results.
+    """
+    client = LoopbackClient(args.deadline_ms)
+    proxy = ImpairmentProxy(client.addr, args.loss, args.reorder, args.reorder_ms, args.jitter_ms,
+                            args.delay_ms, args.bandwidth_mbps, args.queue_ms, args.seed)
+    host = LoopbackHost(proxy.addr, args)
+
+    client.start()
+    proxy.start()
+    host.start()
+
+    time.sleep(args.warmup)
+
+    # --- Measurement window ---
+    host.measuring = True
+    client.measuring = True
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    time.sleep(args.seconds)
+    host.measuring = False
+    time.sleep(args.deadline_ms / 1000.0)     # Let frames sent at the end of the window arrive
+    client.measuring = False
+    elapsed = time.perf_counter() - start
+    process_cpu = time.process_time() - cpu_start
+
+    host.stop()
+    proxy.stop()
+    client.stop()
+
+    sent = len(host.sent_ids)
+    decoded = len(client.completed_ids.intersection(host.sent_ids))
+    latencies = client.latencies
+    per_frame = 1000.0 / max(decoded, 1)
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "results": {
+            "fps": round(decoded / args.seconds, 1),
+            "frames_sent": sent,
+            "frames_decoded": decoded,
+            "completion_rate": round(decoded / sent, 4) if sent else 0.0,
+            "throughput_mbps": round(host.bytes_sent * 8 / elapsed / 1e6, 2),
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50), 1),
+                "p95": round(percentile(latencies, 95), 1),
+                "p99": round(percentile(latencies, 99), 1),
+                "mean": round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+                "max": round(max(latencies), 1) if latencies else 0.0,
+            },
+            # Client and proxy thread CPU covers their whole run, so it is divided by every frame they handled
+            "cpu_ms_per_frame": {
+                "process": round(process_cpu * per_frame, 2),
+                "client": round(client.cpu_time * 1000.0 / max(client.receiver.reassembler.frames_completed, 1), 2),
+                "proxy": round(proxy.cpu_time * 1000.0 / max(host.next_frame_id, 1), 2),
+            },
+            "sender": host.sender.stats(),
+            "proxy": proxy.stats(),
+            "reassembler": client.receiver.stats(),
+            "pipeline": host.pipeline.stats(),
+            "controller": host.controller.state() if host.controller else None,
+        },
+    }
+
+def printResults(result: dict, previous: dict = None):
+    """
+    Prints the headline numbers, with the change from a previous run if given.
+    """
+    r = result["results"]
+    rows = [
+        ("fps", r["fps"], ("fps",)),
+        ("completion", r["completion_rate"], ("completion_rate",)),
+        ("p50 ms", r["latency_ms"]["p50"], ("latency_ms", "p50")),
+        ("p95 ms", r["latency_ms"]["p95"], ("latency_ms", "p95")),
+        ("p99 ms", r["latency_ms"]["p99"], ("latency_ms", "p99")),
+        ("cpu ms/frame", r["cpu_ms_per_frame"]["process"], ("cpu_ms_per_frame", "process")),
+        ("Mbit/s", r["throughput_mbps"], ("throughput_mbps",)),
+    ]
+    for name, value, path in rows:
+        line = f"{name:>14}: {value}"
+        if previous is not None:
+            old = previous["results"]
+            for key in path:
+                old = old.get(key, {}) if isinstance(old, dict) else {}
+            if isinstance(old, (int, float)):
+                line += f"  (was {old}, {value - old:+.2f})"
+        print(line)
+    p = r["proxy"]
+    print(f"{'proxy':>14}: forwarded={p['forwarded']} loss={p['dropped_loss']} "
+          f"queue={p['dropped_queue']} reordered={p['reordered']}")
+    print(f"{'fec':>14}: recovered={r['reassembler']['chunks_recovered']} lost={r['reassembler']['chunks_lost']}")
+
+# === Main Execution ===
+def main():
+    parser = argparse.ArgumentParser(description="Loopback video benchmark with network impairment")
+    # --- Run ---
+    parser.add_argument("--seconds", type=float, default=10.0, help="Measurement window")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=1)
+    # --- Impairment ---
+    parser.add_argument("--loss", type=float, default=0.0, help="Packet loss, percent")
+    parser.add_argument("--reorder", type=float, default=0.0, help="Reordered packets, percent")
+    parser.add_argument("--reorder-ms", type=float, default=10.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--delay-ms", type=float, default=0.0)
+    parser.add_argument("--bandwidth-mbps", type=float, default=0.0, help="0 = unlimited")
+    parser.add_argument("--queue-ms", type=float, default=100.0, help="Link buffer before tail drop")
+    # --- Host ---
+    parser.add_argument("--source", choices=CAMERA_SOURCES, default="synthetic")
+    parser.add_argument("--path", default="")
+    parser.add_argument("--fps", type=float, default=60.0, help="Source rate, 0 = as fast as possible")
+    parser.add_argument("--quality", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--fec", type=int, default=0, help="FEC group size, 0 = off")
+    parser.add_argument("--mtu", type=int, default=1500)
+    parser.add_argument("--adaptive", action="store_true", help="Run the quality controller on receiver reports")
+    # --- Client ---
+    parser.add_argument("--deadline-ms", type=int, default=250)
+    # --- Output ---
+    parser.add_argument("--output", default=None, help="JSON file (default: benchmarks/results/loopback-<time>.json)")
+    parser.add_argument("--compare", default=None, help="Previous JSON result to compare against")
+    args = parser.parse_args()
+
+    result = runBenchmark(args)
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    printResults(result, previous)
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("loopback-%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Saved {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+cameraSource.py
+
+Camera sources for the host video pipeline.
+
+A source delivers frames with a full-resolution display image and, optionally,
+a low-resolution BGR analysis image for the client's drive-assist CV. The
+Picamera2 source produces both from the ISP in one capture. The OpenCV, synthetic
+and replay sources let the whole host video path run (and be benchmarked) on a
+dev box without the Pi camera.
+
+Backends (see create_camera_source):
+    picamera2   Raspberry Pi camera
+    opencv      cv2.VideoCapture device index or URL (USB webcam, RTSP, ...)
+    synthetic   Generated floor with moving obstacles
+    replay      Recorded video file (MP4, AVI, ...) or a directory / glob of JPEGs
+
+Author: HalfasleepDev
+Created: 18-10-2026
+"""
+
+# === Imports ===
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+# === Constants ===
+CAMERA_SOURCES = ("picamera2", "opencv", "synthetic", "replay")
+
+# === Class Definitions ===
+class CameraFrame:
+    """
+    One capture from a camera source.
+
+    Attributes:
+        image (numpy.ndarray): Display stream image (BGR or XRGB).
+        lores (numpy.ndarray | None): Analysis stream image (BGR), if enabled.
+        timestamp (float): Monotonic capture time.
+    """
+    __slots__ = ("image", "lores", "timestamp")
+
+    def __init__(self, image, lores, timestamp: float):
+        self.image = image
+        self.lores = lores
+        self.timestamp = timestamp
+
+class CameraSource:
+    """
+    Base class for camera sources.
+
+    Attributes:
+        size (tuple[int, int]): Display stream (width, height).
+        fps (float): Target capture rate (0 = as fast as possible for generated or replayed frames).
+        lores_size (tuple[int, int] | None): Analysis stream (width, height), None to disable it.
+        frames_read (int): Frames delivered since start.
+    """
+
+    def __init__(self, size, fps: float = 60.0, lores_size=None):
+        """
+        Initializes the source.
+
+        Args:
+            size (tuple[int, int]): Display stream (width, height).
+            fps (float): Target capture rate.
+            lores_size (tuple[int, int], optional): Analysis stream (width, height).
+        """
+        self.size = tuple(size)
+        self.fps = fps
+        self.lores_size = tuple(lores_size) if lores_size else None
+        self.frames_read = 0
+        self.next_frame = 0.0
+
+    def start(self):
+        """
+        Opens the device and starts capturing.
+        """
+
+    def read(self) -> CameraFrame:
+        """
+        Blocks until the next frame is available.
+
+        Returns:
+            CameraFrame: The captured frame.
+        """
+        raise NotImplementedError
+
+    def stop(self):
+        """
+        Stops capturing and releases the device.
+        """
+
+    def _pace(self):
+        """
+        Sleeps until the next frame is due; does nothing when fps is 0.
+        """
+        if not self.fps:
+            return
+        self.next_frame += 1.0 / self.fps
+        delay = self.next_frame - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            self.next_frame = time.monotonic()   # Fell behind, don't try to catch up
+
+    def _frame(self, image) -> CameraFrame:
+        """
+        Wraps a BGR image, scaling it to the display size and deriving the analysis image.
+
+        Args:
+            image (numpy.ndarray): BGR image of any size.
+
+        Returns:
+            CameraFrame: The frame to deliver.
+        """
+        if (image.shape[1], image.shape[0]) != self.size:
+            image = cv2.resize(image, self.size, interpolation=cv2.INTER_AREA)
+        lores = cv2.resize(image, self.lores_size, interpolation=cv2.INTER_AREA) if self.lores_size else None
+        self.frames_read += 1
+        return CameraFrame(image, lores, time.monotonic())
+
+class Picamera2Source(CameraSource):
+    """
+    Raspberry Pi camera via Picamera2, with the analysis stream from the ISP's lores output.
+    """
+
+    def start(self):
+        from picamera2 import Picamera2
+
+        self.picam2 = Picamera2()
+        config = self.picam2.create_video_configuration(
+            main={"format": "XRGB8888", "size": self.size},
+            # The ISP scales the lores stream for free, it only supports YUV420
+            lores={"format": "YUV420", "size": self.lores_size} if self.lores_size else None,
+            raw=None,      # no raw output request
+            controls={"FrameRate": float(self.fps or 60)}
+        )
+        self.picam2.configure(config)
+        self.picam2.start(show_preview=False)
+
+    def read(self) -> CameraFrame:
+        self.frames_read += 1
+        if not self.lores_size:
+            (image,), metadata = self.picam2.capture_arrays(["main"])
+            return CameraFrame(image, None, self._sensor_time(metadata))
+
+        (image, lores), metadata = self.picam2.capture_arrays(["main", "lores"])
+        return CameraFrame(image, cv2.cvtColor(lores, cv2.COLOR_YUV2BGR_I420), self._sensor_time(metadata))
+
+    @staticmethod
+    def _sensor_time(metadata) -> float:
+        """
+        Returns the sensor's start-of-exposure time (libcamera stamps it on the monotonic clock).
+        """
+        sensor_ns = metadata.get("SensorTimestamp") if metadata else None
+        return sensor_ns / 1e9 if sensor_ns else time.monotonic()
+
+    def stop(self):
+        self.picam2.stop()
+        self.picam2.close()
+
+class SyntheticSource(CameraSource):
+    """
+    Generated test frames: a floor gradient with obstacles moving across it.
+
+    Frames are paced to `fps`; with fps=0 they are produced as fast as possible.
+    """
+
+    OBSTACLES = 3
+
+    def start(self):
+        width, height = self.size
+        self.frame_index = 0
+        self.next_frame = time.monotonic()
+
+        # Static background: sky above the horizon, a lit floor below
+        self.background = np.zeros((height, width, 3), np.uint8)
+        rows = np.linspace(60, 200, height // 2, dtype=np.uint8)[:, None]
+        self.background[:height // 2] = (110, 90, 70)
+        self.background[height // 2:, :, 0] = rows
+        self.background[height // 2:, :, 1] = rows // 2 + 40
+        self.background[height // 2:, :, 2] = rows // 3 + 30
+
+    def read(self) -> CameraFrame:
+        self._pace()
+
+        width, height = self.size
+        image = self.background.copy()
+        t = self.frame_index
+        for i in range(self.OBSTACLES):
+            # Each obstacle sweeps across the floor at its own speed and distance
+            size = height // (8 - 2 * i)
+            x = int((t * (3 + 2 * i) + i * width // self.OBSTACLES) % (width + size)) - size
+            y = height // 2 + (i + 1) * height // (2 * (self.OBSTACLES + 1))
+            cv2.rectangle(image, (x, y), (x + size, y + size), (40 + 60 * i, 40, 200 - 50 * i), -1)
+        cv2.putText(image, f"SYNTHETIC {t}", (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 2)
+        self.frame_index += 1
+
+        return self._frame(image)
+
+class OpenCVSource(CameraSource):
+    """
+    A camera or stream opened with cv2.VideoCapture; the device paces the frames.
+    """
+
+    def __init__(self, size, fps: float = 60.0, lores_size=None, device=0):
+        """
+        Args:
+            device (int | str): Capture device index, or a URL/pipeline string.
+        """
+        super().__init__(size, fps, lores_size)
+        self.device = int(device) if str(device).isdigit() else device
+
+    def start(self):
+        self.capture = cv2.VideoCapture(self.device)
+        if not self.capture.isOpened():
+            raise RuntimeError(f"Could not open capture device {self.device!r}")
+        self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.size[0])
+        self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.size[1])
+        if self.fps:
+            self.capture.set(cv2.CAP_PROP_FPS, self.fps)
+
+    def read(self) -> CameraFrame:
+        ok, image = self.capture.read()
+        if not ok:
+            raise RuntimeError(f"Capture device {self.device!r} stopped delivering frames")
+        return self._frame(image)
+
+    def stop(self):
+        self.capture.release()
+
+class ReplaySource(CameraSource):
+    """
+    Replays a recorded video file or a sequence of JPEG images, looping at the end.
+
+    Frames are paced to `fps`; with fps=0 they are delivered as fast as they decode.
+    """
+
+    def __init__(self, size, fps: float = 60.0, lores_size=None, path: str = "", loop: bool = True):
+        """
+        Args:
+            path (str): Video file, directory of .jpg/.jpeg files, or glob pattern.
+            loop (bool): Restart from the beginning at the end of the recording.
+        """
+        super().__init__(size, fps, lores_size)
+        self.path = path
+        self.loop = loop
+
+    def start(self):
+        if os.path.isdir(self.path):
+            pattern = os.path.join(self.path, "*.jp*g")
+        elif any(c in self.path for c in "*?["):
+            pattern = self.path
+        else:
+            pattern = None
+
+        self.capture = None
+        self.images = sorted(glob.glob(pattern)) if pattern else []
+        if pattern and not self.images:
+            raise RuntimeError(f"No JPEG images match {pattern!r}")
+        if not pattern:
+            self.capture = cv2.VideoCapture(self.path)
+            if not self.capture.isOpened():
+                raise RuntimeError(f"Could not open recording {self.path!r}")
+
+        self.index = 0
+        self.next_frame = time.monotonic()
+
+    def read(self) -> CameraFrame:
+        self._pace()
+
+        if self.capture is not None:
+            ok, image = self.capture.read()
+            if not ok and self.loop:
+                self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ok, image = self.capture.read()
+            if not ok:
+                raise EOFError(f"End of recording {self.path!r}")
+        else:
+            if self.index >= len(self.images):
+                if not self.loop:
+                    raise EOFError(f"End of recording {self.path!r}")
+                self.index = 0
+            image = cv2.imread(self.images[self.index], cv2.IMREAD_COLOR)
+            self.index += 1
+
+        return self._frame(image)
+
+    def stop(self):
+        if self.capture is not None:
+            self.capture.release()
+
+# === Factory ===
+def create_camera_source(kind: str, size, fps: float = 60.0, lores_size=None, path: str = "") -> CameraSource:
+    """
+    Creates a camera source by name.
+
+    Args:
+        kind (str): One of CAMERA_SOURCES.
+        size (tuple[int, int]): Display stream (width, height).
+        fps (float): Target capture rate (0 = unpaced for synthetic/replay).
+        lores_size (tuple[int, int], optional): Analysis stream (width, height).
+        path (str): Device for "opencv", recording for "replay".
+
+    Returns:
+        CameraSource: The (not yet started) source.
+    """
+    if kind == "picamera2":
+        return Picamera2Source(size, fps, lores_size)
+    if kind == "opencv":
+        return OpenCVSource(size, fps, lores_size, path or 0)
+    if kind == "synthetic":
+        return SyntheticSource(size, fps, lores_size)
+    if kind == "replay":
+        return ReplaySource(size, fps, lores_size, path)
+    raise ValueError(f"Unknown camera source {kind!r}, expected one of {CAMERA_SOURCES}")
@@ -0,0 +1,198 @@
+"""
+commandCoalescer.py
+
+Latest-wins selection of drive commands drained from the control socket.
+
+After a Wi-Fi stall the control socket can hold a backlog of commands. Rather
+than replaying every outdated throttle step on the car, the listener drains
+the socket and passes the whole batch here. Only the newest command per
+control axis (throttle, steering) is applied, judged by the client's sequence
+number. Packets older than the newest already applied, or far older than the
+newest seen, are dropped. Age is measured against the client timestamp of
+the newest sequence number, so a client clock stepping backwards (an NTP
+correction) moves the reference back with it instead of making every later
+command look stale. Safety commands are never coalesced, and an
+EMERGENCY_STOP (or a drive assist toggle) is never dropped.
+
+Author: HalfasleepDev
+Created: 18-10-2026
+"""
+
+# === Imports ===
+import threading
+
+# === Constants ===
+SEQ_MASK = 0xFFFFFFFF
+SEQ_HALF = 0x80000000
+
+# Control axes each drive command sets (see NetworkManager.handle_control)
+COMMAND_AXES = {
+    "UP": ("esc", "servo"),
+    "DOWN": ("esc", "servo"),
+    "LEFT": ("esc", "servo"),
+    "RIGHT": ("esc", "servo"),
+    "LEFTUP": ("esc", "servo"),
+    "LEFTDOWN": ("esc", "servo"),
+    "RIGHTUP": ("esc", "servo"),
+    "RIGHTDOWN": ("esc", "servo"),
+    "BRAKE": ("esc",),
+    "NEUTRAL": ("esc",),
+    "CENTER": ("servo",),
+}
+DROPPABLE = set(COMMAND_AXES) | {"CLEAR_EMERGENCY"}     # Commands an out-of-order or stale packet may skip
+
+# === Helper Functions ===
+def is_newer_seq(seq: int, reference: int) -> bool:
+    """
+    Compares two sequence numbers, allowing for 32-bit wraparound.
+
+    Returns:
+        bool: True if seq comes after reference.
+    """
+    diff = (seq - reference) & SEQ_MASK
+    return diff != 0 and diff < SEQ_HALF
+
+# === Class Definitions ===
+class CommandCoalescer:
+    """
+    Picks which commands of a drained batch to apply.
+
+    Attributes:
+        stale_ms (int): Commands this much older (client clock) than the newest seen are dropped.
+        last_seq (int | None): Highest sequence number accepted so far.
+        newest_seq (int | None): Highest sequence number seen.
+        newest_timestamp (int): Client timestamp of newest_seq (the reference for stale_ms).
+        received (int): Commands seen.
+        applied (int): Commands selected to apply.
+        coalesced (int): Drive commands superseded by a newer one in the same batch.
+        dropped_out_of_order (int): Commands at or behind an already accepted sequence number.
+        dropped_stale (int): Commands older than stale_ms.
+        batches (int): Batches processed.
+        max_batch (int): Largest batch seen.
+    """
+
+    def __init__(self, stale_ms: int = 500):
+        """
+        Initializes the coalescer.
+
+        Args:
+            stale_ms (int): Age (client clock) beyond which a command is dropped.
+        """
+        self.stale_ms = stale_ms
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets the sequence state, e.g. when a new client session starts.
+        """
+        with self.lock:
+            self.last_seq = None
+            self.newest_seq = None
+            self.newest_timestamp = 0
+            self.received = 0
+            self.applied = 0
+            self.coalesced = 0
+            self.dropped_out_of_order = 0
+            self.dropped_stale = 0
+            self.batches = 0
+            self.max_batch = 0
+
+    def select(self, commands: list) -> tuple:
+        """
+        Splits a batch into the commands to apply and the ones to skip.
+
+        Commands without a sequence number (older clients) are applied in
+        arrival order and never coalesced; they come first in apply, so the
+        newest sequenced command of the batch is the last one applied. The
+        sequenced commands of the same batch are still coalesced.
+
+        Args:
+            commands (list): Items whose first element is the command payload dict, in arrival order.
+
+        Returns:
+            tuple[list, list]: (apply, skipped). apply is in sequence order; both keep the items as given.
+        """
+        with self.lock:
+            self.batches += 1
+            self.received += len(commands)
+            self.max_batch = max(self.max_batch, len(commands))
+
+            sequenced = [item for item in commands if item[0].get("seq") is not None]
+            unsequenced = [item for item in commands if item[0].get("seq") is None]
+            if not sequenced:
+                self.applied += len(unsequenced)
+                return unsequenced, []
+
+            # --- Sequence order; the newest sequence number's timestamp is the reference ---
+            reference = self.last_seq if self.last_seq is not None else sequenced[0][0]["seq"]
+            sequenced.sort(key=lambda item: (item[0]["seq"] - reference) & SEQ_MASK)
+            newest = sequenced[-1][0]
+            if self.newest_seq is None or is_newer_seq(newest["seq"], self.newest_seq):
+                self.newest_seq = newest["seq"]
+                self.newest_timestamp = newest.get("timestamp") or 0
+
+            # --- Drop out-of-order and stale packets ---
+            fresh, skipped = [], []
+            for item in sequenced:
+                payload = item[0]
+                command = payload.get("command")
+                if command not in DROPPABLE:
+                    # EMERGENCY_STOP and drive assist toggles always go through
+                    fresh.append(item)
+                elif self.last_seq is not None and not is_newer_seq(payload["seq"], self.last_seq):
+                    self.dropped_out_of_order += 1
+                    skipped.append(item)
+                elif self.newest_timestamp - (payload.get("timestamp") or 0) > self.stale_ms:
+                    self.dropped_stale += 1
+                    skipped.append(item)
+                else:
+                    fresh.append(item)
+
+            # --- Latest wins per axis; anything else is applied as is ---
+            newest_per_axis = {}
+            for index, item in enumerate(fresh):
+                for axis in COMMAND_AXES.get(item[0].get("command"), ()):
+                    newest_per_axis[axis] = index
+            keep = set(newest_per_axis.values())
+
+            apply = unsequenced
+            for index, item in enumerate(fresh):
+                if item[0].get("command") in COMMAND_AXES and index not in keep:
+                    self.coalesced += 1
+                    skipped.append(item)
+                else:
+                    apply.append(item)
+
+            for item in apply[len(unsequenced):]:
+                seq = item[0]["seq"]
+                if self.last_seq is None or is_newer_seq(seq, self.last_seq):
+                    self.last_seq = seq
+
+            self.applied += len(apply)
+            return apply, skipped
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Received, applied, coalesced and dropped counts, and batch sizes.
+        """
+        with self.lock:
+            return {
+                "received": self.received,
+                "applied": self.applied,
+                "coalesced": self.coalesced,
+                "dropped_out_of_order": self.dropped_out_of_order,
+                "dropped_stale": self.dropped_stale,
+                "batches": self.batches,
+                "max_batch": self.max_batch,
+            }
+
+    def format_stats(self) -> str:
+        """
+        Returns:
+            str: One-line summary of the counters.
+        """
+        s = self.stats()
+        return (f"received={s['received']} applied={s['applied']} coalesced={s['coalesced']} "
+                f"out_of_order={s['dropped_out_of_order']} stale={s['dropped_stale']} max_batch={s['max_batch']}")
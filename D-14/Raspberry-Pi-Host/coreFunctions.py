@@ -1,6 +1,8 @@
 import os
 import json
 
+from hostLogger import log
+
 DEFAULT_SETTINGS = {
     "min_duty_servo": 900,
     "max_duty_servo": 2100,
@@ -10,7 +12,28 @@ DEFAULT_SETTINGS = {
     "neutral_duty_esc": 1500,
     "brake_esc": 1470,
     "username": "D-14",                 #* <--- Default username
-    "password": "driveCore"             #* <--- Default password
+    "password": "driveCore",            #* <--- Default password
+    "encoder_workers": 2,               #* <--- JPEG encoder threads (Pi has 4 cores)
+    "video_delay_budget_ms": 60,        #* <--- Latency allowed above the best recent latency
+    "fec_group_size": 0,                #* <--- Video chunks per XOR parity chunk (0 = FEC off, max 15)
+    "video_mtu": 1500,                  #* <--- Link MTU used to size video datagrams (capped by the path MTU)
+    "analysis_size": [320, 180],        #* <--- Low-res analysis stream for the client CV
+    "analysis_fps": 15,                 #* <--- Analysis stream rate (0 = off)
+    "analysis_quality": 60,             #* <--- Analysis stream JPEG quality
+    "camera_source": "picamera2",       #* <--- picamera2 | opencv | synthetic | replay
+    "camera_path": "",                  #* <--- opencv device/URL or replay file/JPEG directory
+    "camera_fps": 60,                   #* <--- Capture rate (0 = unpaced for synthetic/replay)
+    "actuator_rate_hz": 200,            #* <--- ESC/servo update loop rate
+    "esc_slew_us_per_s": 4000,          #* <--- Throttle rate limit away from neutral (0 = unlimited)
+    "servo_slew_us_per_s": 8000,        #* <--- Steering rate limit (0 = unlimited)
+    "servo_center_slew_us_per_s": 1000, #* <--- Steering rate limit while re-centering
+    "frame_trace": False,               #* <--- Diagnostics only: send per-frame host timings to the client
+    "log_level": "INFO",                #* <--- DEBUG | INFO | WARN | ERROR (SIGUSR1 toggles DEBUG, SIGHUP reloads)
+    "log_format": "text",               #* <--- text | json (one object per line)
+    "log_categories": {                 #* <--- Per-category rate limit (records/s, burst) and 1-in-N sampling
+        "control": {"rate": 10, "burst": 20, "sample": 1},
+        "heartbeat": {"rate": 1, "burst": 5, "sample": 1}
+    }
 }
 
 def load_settings(SETTINGS_FILE):
@@ -20,7 +43,7 @@ def load_settings(SETTINGS_FILE):
                 loaded = json.load(f)
                 return {**DEFAULT_SETTINGS, **loaded}
             except json.JSONDecodeError:
-                print("[DEBUG] Invalid settings file. Loading defaults.")
+                log.warn("settings", "Invalid settings file. Loading defaults.")
     return DEFAULT_SETTINGS.copy()
  
 def save_settings(new_settings, SETTINGS_FILE):
@@ -5,13 +5,14 @@ import threading
 import time
 import io
 import cv2
-from picamera2 import Picamera2
 from PIL import Image               # pillow
 import numpy as np
 import pigpio
 from threading import Event
 
 from driveCoreNetwork import NetworkManager
+from actuatorLoop import ActuatorLoop
+from hostLogger import log
 
 from coreFunctions import load_settings, save_settings
 
@@ -57,6 +58,10 @@ class DriveCoreHost:
         # === Settings ===
         self.settings = load_settings(self.SETTINGS_FILE)
 
+        # === Logging (level changes at runtime: SIGUSR1 toggles DEBUG, SIGHUP reloads) ===
+        log.configure(self.settings)
+        log.install_signal_handlers(lambda: log.configure(load_settings(self.SETTINGS_FILE)))
+
         self.handshake_complete = threading.Event()
 
         self.pi = pigpio.pi()
@@ -64,8 +69,6 @@ class DriveCoreHost:
 
         self.network = NetworkManager(self)
 
-        self.restart_flag = Event()
-
         # ====== PWM Duty Cycles ======
         self.min_duty_servo = self.settings["min_duty_servo"]
         self.max_duty_servo = self.settings["max_duty_servo"]
@@ -78,6 +81,13 @@ class DriveCoreHost:
         self.current_esc_pw = self.neutral_duty_esc
         self.current_servo_pw = self.neutral_servo
 
+        # ====== Actuator Loop ======
+        self.actuator = ActuatorLoop(self,
+                                     rate_hz=self.settings["actuator_rate_hz"],
+                                     esc_slew=self.settings["esc_slew_us_per_s"],
+                                     servo_slew=self.settings["servo_slew_us_per_s"],
+                                     center_slew=self.settings["servo_center_slew_us_per_s"])
+
         # ====== Drive Assist ======
         self.emergency_active = False
         self.emergency_trigger_time = time.time()
@@ -89,7 +99,8 @@ class DriveCoreHost:
 
     def setup_pigpio(self, mode=None):
         if not self.pi.connected:
-            print("ERROR: pigpio daemon is not running!")
+            log.error("system", "pigpio daemon is not running!")
+            log.stop()
             exit(1)
         if mode == "FLASH":
             self.pi.set_mode(self.FLOOD_LIGHT_PIN, pigpio.OUTPUT)               # Setup Flood lights
@@ -152,44 +163,26 @@ class DriveCoreHost:
             return int(self.neutral_servo - (self.neutral_servo - self.min_duty_servo) * intensity)
         
     def run(self):
-        while True:
-            print("Starting system...")
-            self._start_system()
-
-            while self.client_online:
-                time.sleep(0.5)
-
-            print("Client disconnected — restarting system...")
-            self._stop_system()  # Clean shutdown
+        log.info("system", "Starting system...")
+        # Broadcast, handshake, control and heartbeat all run on the network event loop
+        self.network.serve_forever()
     
     def _start_system(self):
-        #self.network.reset_connection_state()  # clear timestamps, flags
-
-        # === Start broadcast ===
-        threading.Thread(target=self.network.broadcast_ip, daemon=True).start()
-
-        # === Start handshake ===
-        self.network.listen_for_handshake()
-        self.handshake_complete.wait()
-
-        # === Start subsystems ===
-        # Heartbeat thread
-        threading.Thread(target=self.network.listen_for_heartbeats, daemon=True).start()
-        threading.Thread(target=self.network.heartbeat_watchdog, daemon=True).start()
-
-        # Command listener thread
-        threading.Thread(target=self.network.command_listener, daemon=True).start()
-
-        # Video stream thread
-        threading.Thread(target=self.network.video_stream, daemon=True).start()
+        """
+        Session start hook (called from the network event loop).
+        """
+        # Actuator loop (owns the ESC/servo outputs)
+        self.actuator.neutral()
+        self.actuator.start()
 
     def _stop_system(self):
+        """
+        Session end hook (called from the network event loop).
+        """
+        self.actuator.neutral()
         self.handshake_complete.clear()
         self.client_online = False
         self.network.handshake_status = False
-        self.restart_flag.clear()
-        time.sleep(1)
-        # Close sockets, reset values, etc.
 
         
     '''def run(self):
@@ -211,8 +204,10 @@ class DriveCoreHost:
         threading.Thread(target=self.network.video_stream(), daemon=True).start()'''
         
     def shutdown(self):
+        self.actuator.stop()
         self.reset_pwm()
         self.pi.stop()
+        log.stop()
         
 if __name__ == "__main__":
     try:
@@ -5,18 +5,33 @@ import threading
 import time
 import io
 import cv2
-from picamera2 import Picamera2
 from PIL import Image               # pillow
 import numpy as np
 import os
+import select
+import secrets
 
 from threading import Event
 
-from udpHostProtocols import (broadcast_packet, auth_status_packet, version_info_packet,
-                             setup_info_packet, handshake_complete_packet, current_time, 
-                             keyboard_command_ack_packet, frame_ack_packet, last_ack_packet)
+from udpHostProtocols import (broadcast_packet, auth_status_packet, version_info_packet, heartbeat_ack_packet,
+                             setup_info_packet, handshake_complete_packet, handshake_result_packet,
+                             session_resumed_packet, current_time, 
+                             keyboard_command_ack_packet, frame_ack_packet, last_ack_packet,
+                             video_state_packet, frame_trace_packet, VIDEO_FLAG_ANALYSIS,
+                             parse_control_packet, control_ack_packet, CONTROL_MAGIC, CONTROL_FORMATS,
+                             CONTROL_ACK_OK, CONTROL_ACK_IGNORED, CONTROL_ACK_SUPERSEDED,
+                             CONTROL_ACK_FAULT)
 
 from coreFunctions import load_settings, save_settings
+from videoPipeline import VideoPipeline, PipelineFrame, DropOldestQueue
+from cameraSource import create_camera_source
+from videoController import AdaptiveQualityController
+from videoFec import build_parity_chunks, MAX_GROUP_SIZE
+from commandCoalescer import CommandCoalescer
+from hostLogger import log, INFO
+from hostEventLoop import EventLoop
+from videoSender import (DatagramBatchSender, send_video_frame, path_mtu, chunk_size_for_mtu,
+                         DATAGRAM_HEADER_SIZE)
 
 class NetworkManager:
     #cwd = os.getcwd
@@ -29,10 +44,22 @@ class NetworkManager:
     BROADCAST_PORT = 9999
     HEARTBEAT_PORT = 8888 
 
-    CHUNK_SIZE = 1024 #1024
     
     HEARTBEAT_TIMEOUT = 6.0  # seconds
+    HEARTBEAT_GRACE = 8.0    # Extra seconds for the first heartbeat of a session
+    BROADCAST_INTERVAL = 1.5 # Seconds the flood light stays on, then off, per advertise packet
+    RESUME_WINDOW = 60.0     # Seconds after a session drops during which its token can resume it
+    VIDEO_STOP_TIMEOUT = 2.0     # Seconds a stopping video thread may take before it is reported
+    VIDEO_STOP_POLL = 0.05       # Seconds between checks on a stopping video thread (never joined on the loop)
     TIMEOUT_MS = 200
+    CONTROL_BATCH_MAX = 64      # Datagrams drained from the control socket per batch
+    STALE_COMMAND_MS = 500      # Drive commands this much older than the newest are dropped
+
+    # ====== VIDEO ======
+    CAMERA_SIZE = (1280, 720)
+    VIDEO_QUEUE_SIZE = 2        # Frames buffered between pipeline stages (oldest dropped first)
+    VIDEO_STATS_INTERVAL = 10.0 # seconds
+    ACTUATOR_STATS_INTERVAL = 10.0  # seconds
 
     def __init__(self, core):
         self.core = core
@@ -46,93 +73,400 @@ class NetworkManager:
 
         self.client_ip = None
         self.handshake_status = False
+        self.control_format = "json"    # Negotiated in version_request
 
         # === Latency ===
         self.last_timestamp = None
         self.last_command_time = time.time()
+        self.command_coalescer = CommandCoalescer(self.STALE_COMMAND_MS)
+
+        # === Clock Sync (estimated by the client over the heartbeat) ===
+        self.clock_offset_ms = None     # Host clock minus client clock
+        self.clock_drift_ppm = 0.0
+        self.clock_offset_base = 0.0    # Client time (ms) the offset was measured at, the drift reference
+
+        # === Event Loop (control, heartbeat and broadcast sockets) ===
+        self.loop = EventLoop()
+        self.control_socket = None
+        self.broadcast_socket = None
+        self.broadcast_timer = None
+        self.session_active = False
+
+        # === Session Resume (token issued when the handshake completes) ===
+        self.session_token = None
+        self.session_token_expires = 0.0   # Monotonic; only checked while no session is active
+        self.handshake_result = None       # Combined handshake reply of the session, re-sent if the client lost it
+        self.handshake_addr = None         # Address (IP and port) the combined handshake came from
 
         # === Heartbeat ===
         self.heartbeat_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.heartbeat_socket.bind(("0.0.0.0", self.HEARTBEAT_PORT))
-        self.heartbeat_socket.settimeout(2.0) #0.5
+        self.heartbeat_socket.setblocking(False)
+        self.heartbeat_timer = None
+
+        # === Video ===
+        self.video_pipeline = None
+        self.video_controller = None
+        self.video_sender = None
+        self.video_thread = None
+        self.video_stop = Event()       # Stop event of the current video thread (a new one per thread)
+        self.stopping_video = None      # Previous session's video thread, until it has exited
+        self.drive_assist_enabled = False   # The analysis stream is only sent while the client runs drive assist
+        self.video_deferred = False     # Resumed session: video waits for the client's first heartbeat
+        self.video_chunk_size = chunk_size_for_mtu(self.settings["video_mtu"], DATAGRAM_HEADER_SIZE)
+
+    # === EVENT LOOP ===
+    def serve_forever(self):
+        """
+        Runs the host's network side on one event loop until shutdown.
+
+        The control (handshake and commands), heartbeat and broadcast sockets
+        live for the whole process and are handled as they become readable.
+        Each client session is started and torn down from the loop, so a
+        reconnect never leaves threads behind.
+        """
+        self.control_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.control_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.control_socket.bind(("0.0.0.0", self.CONTROL_PORT))
+        self.control_socket.setblocking(False)
+
+        self.broadcast_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.broadcast_socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        self.broadcast_socket.setblocking(False)
+
+        self.loop.add_reader(self.control_socket, self.on_control_readable)
+        self.loop.add_reader(self.heartbeat_socket, self.on_heartbeat_readable)
+        self.loop.call_later(self.ACTUATOR_STATS_INTERVAL, self.report_stats)
+
+        self.start_discovery()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.end_session()
+            if self.stopping_video is not None:
+                self.stopping_video.join(self.VIDEO_STOP_TIMEOUT)    # The loop is done, blocking is fine
+            for sock in (self.control_socket, self.broadcast_socket, self.heartbeat_socket):
+                self.loop.remove_reader(sock)
+                sock.close()
+            self.loop.close()
+
+    def stop(self):
+        """
+        Stops the event loop; callable from any thread.
+        """
+        self.loop.stop()
 
-        # === Steering ===
-        self.centering_thread = None
-        self.centering_cancel = threading.Event()
+    def report_stats(self):
+        if self.session_active:
+            log.info("actuator", "%s", self.core.actuator.format_stats())
+            log.info("control", "%s", self.command_coalescer.format_stats())
+        log.info("loop", "%s", self.loop.format_stats())
+        self.loop.call_later(self.ACTUATOR_STATS_INTERVAL, self.report_stats)
 
     # === ADVERTISE HOST IP ===
-    def broadcast_ip(self):
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-        message = json.dumps(broadcast_packet(self.VIDEO_PORT, self.CONTROL_PORT, self.HEARTBEAT_PORT))
+    def start_discovery(self):
+        """
+        Advertises the host and waits for a client handshake.
+        """
+        self.handshake_status = False
+        self.core.handshake_complete.clear()
         self.core.setup_pigpio("FLASH")
-        while not self.core.handshake_complete.is_set():
-            self.core.pi.write(self.core.FLOOD_LIGHT_PIN, 1)
-            sock.sendto(message.encode(), ('<broadcast>', self.BROADCAST_PORT))
-            print("Broadcasting...")
-            time.sleep(1.5)
-            self.core.pi.write(self.core.FLOOD_LIGHT_PIN, 0)
-            time.sleep(1.5)
-        sock.close()
-        self.core.pi.write(self.core.FLOOD_LIGHT_PIN, 0)
-        #self.core.pi.stop()
-    
+        log.info("handshake", "Waiting for client handshake...")
+        if self.broadcast_timer is not None:
+            self.broadcast_timer.cancel()
+        self.broadcast_ip(True)
+
+    def broadcast_ip(self, light_on=True):
+        """
+        Beacon timer: send an advertise packet with the flood light on, then turn it off.
+        """
+        if self.core.handshake_complete.is_set():
+            self.broadcast_timer = None
+            return
+
+        self.core.pi.write(self.core.FLOOD_LIGHT_PIN, 1 if light_on else 0)
+        if light_on:
+            message = json.dumps(broadcast_packet(self.VIDEO_PORT, self.CONTROL_PORT, self.HEARTBEAT_PORT))
+            try:
+                self.broadcast_socket.sendto(message.encode(), ('<broadcast>', self.BROADCAST_PORT))
+                log.debug("broadcast", "Broadcasting...")
+            except OSError as e:
+                log.warn("broadcast", "Broadcast failed: %s", e)
+        self.broadcast_timer = self.loop.call_later(self.BROADCAST_INTERVAL, self.broadcast_ip, not light_on)
+
+    def answer_discover(self, addr):
+        """
+        Answers a unicast discover probe with the advertise packet.
+        """
+        message = json.dumps(broadcast_packet(self.VIDEO_PORT, self.CONTROL_PORT, self.HEARTBEAT_PORT))
+        try:
+            self.control_socket.sendto(message.encode(), addr)
+            log.info("broadcast", "Answered discovery probe from %s", addr)
+        except OSError as e:
+            log.warn("broadcast", "Probe reply to %s failed: %s", addr, e)
+
+    def flash_light(self, times=2):
+        """
+        Blinks the flood light from timers (0.2 s on, 0.2 s off).
+        """
+        for i in range(times * 2):
+            self.loop.call_later(0.2 * i, self.core.pi.write, self.core.FLOOD_LIGHT_PIN, 1 if i % 2 == 0 else 0)
+
     # === HANDLE HANDSHAKE LOGIC ===
-    def listen_for_handshake(self):
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        sock.bind(("0.0.0.0", self.CONTROL_PORT))
-        print("Waiting for client handshake...")
+    def handle_handshake(self, payload, addr):
+        """
+        Answers one handshake packet: the combined handshake, or one step of the
+        step-by-step flow that older clients use.
+        """
+        payloadType = payload.get("type")
+
+        def send(reply):
+            self.control_socket.sendto(json.dumps(reply).encode(), addr)
+
+        if payloadType == "handshake":
+            self.handle_combined_handshake(payload, addr)
+
+        elif payloadType == "credentials":
+            log.info("handshake", "Credentials received from %s", addr, username=payload.get("username"))
+            self.client_ip = addr[0]
+            send(auth_status_packet(self.handle_client_response(payload)))
+
+        elif payloadType == "version_request":
+            log.info("handshake", "Client version received from %s: %s", addr, payload)
+            self.control_format = self.negotiate_control_format(payload)
+            send(version_info_packet(self.core.HOST_VER, self.handle_client_response(payload), self.control_format))
+
+        elif payloadType == "setup_request":
+            log.info("handshake", "Setup request received from %s: %s", addr, payload)
+            send(setup_info_packet(self.core.VEHICLE_MODEL, self.core.CONTROL_SCHEME))
+
+        elif payloadType == "handshake_tune_setup":
+            log.info("handshake", "Applying tune setup from %s: %s", addr, payload)
+            self.apply_tune(payload)
+            self.session_token = secrets.token_hex(16)
+            send(handshake_complete_packet(True, self.session_token, self.RESUME_WINDOW))
+            self.handshake_status = True
+            self.start_session()
+            self.flash_light()
+
+    def handle_combined_handshake(self, payload, addr):
+        """
+        Runs every handshake step from one request and answers once.
 
-        def send(payload, addr):
-            sock.sendto(json.dumps(payload).encode(), addr)
+        The request nests the step packets ("credentials", "version_request" and
+        "handshake_tune_setup"); the reply nests the step replies, up to the
+        first failed step. The host version is judged by the client, as in the
+        step-by-step flow.
 
-        while (not self.core.handshake_complete.is_set()) and (not self.handshake_status):
+        Args:
+            payload (dict): The client's handshake packet.
+            addr (tuple): Client address.
+        """
+        credentials = payload.get("credentials") or {}
+        version_request = payload.get("version_request") or {}
+        tune = payload.get("tune") or {}
+        log.info("handshake", "Combined handshake received from %s", addr, username=credentials.get("username"))
+        self.client_ip = addr[0]
+
+        def send(reply):
+            self.control_socket.sendto(json.dumps(reply).encode(), addr)
+
+        authenticated = bool(self.handle_client_response(credentials))
+        if not authenticated:
+            send(handshake_result_packet(auth_status_packet(False)))
+            return
 
-            data, addr = sock.recvfrom(1024)
-            payload = json.loads(data.decode())
+        compatible = bool(self.handle_client_response(version_request))
+        if compatible:
+            self.control_format = self.negotiate_control_format(version_request)
+        version_info = version_info_packet(self.core.HOST_VER, compatible, self.control_format)
+        if not compatible or tune.get("type") != "handshake_tune_setup":
+            send(handshake_result_packet(auth_status_packet(True), version_info))
+            return
 
-            payloadType = payload.get("type")
-            time.sleep(3)
-
-            if payloadType == "credentials":
-                print(f"[Handshake]: Credentials received from {addr}: {payload}")
-                self.client_ip = addr[0]
-                send(auth_status_packet(self.handle_client_response(payload)), addr)
-                '''response = {"type": "auth_status", "status": "ok"}
-                sock.sendto(json.dumps(response).encode(), addr)
-                handshake_complete.set()
-                break'''
-            elif payloadType == "version_request":
-                print(f"[Handshake]: Client version recieved from {addr}: {payload}")
-                send(version_info_packet(self.core.HOST_VER, self.handle_client_response(payload)), addr)
-            
-            elif payloadType == "setup_request":
-                print(f"[Handshake]: Setup request recieved from {addr}: {payload}")
-                send(setup_info_packet(self.core.VEHICLE_MODEL, self.core.CONTROL_SCHEME), addr)
-            
-            elif payloadType == "handshake_tune_setup":
-                print(f"[Handshake]: Applying tune setup from {addr}: {payload}")
-                self.apply_tune(payload)
-                send(handshake_complete_packet(True), addr)
-                self.handshake_status = True
-                self.core.client_online = True
-                #sock.close()
-                self.core.pi.write(self.core.FLOOD_LIGHT_PIN, 1)
-                time.sleep(0.2)
-                self.core.pi.write(self.core.FLOOD_LIGHT_PIN, 0)
-                time.sleep(0.2)
-                self.core.pi.write(self.core.FLOOD_LIGHT_PIN, 1)
-                time.sleep(0.2)
-                self.core.pi.write(self.core.FLOOD_LIGHT_PIN, 0)
+        self.apply_tune(tune)
+        self.session_token = secrets.token_hex(16)
+        result = handshake_result_packet(auth_status_packet(True), version_info,
+                                         setup_info_packet(self.core.VEHICLE_MODEL, self.core.CONTROL_SCHEME),
+                                         handshake_complete_packet(True, self.session_token, self.RESUME_WINDOW))
+        send(result)
+        self.handshake_status = True
+        self.start_session()
+        self.handshake_result = result
+        self.handshake_addr = addr
+        self.flash_light()
+
+    def handle_session_handshake(self, payload, addr):
+        """
+        Answers a handshake or credentials packet that arrives during a session.
 
-                self.core.handshake_complete.set()
+        The session starts as soon as the combined handshake is answered, so a
+        lost handshake_result leaves the client retrying (or falling back to the
+        steps): from the exact address that handshake came from, the stored
+        result is sent again. Any other sender, such as a restarted client app
+        on a new port, must pass the credentials check and then replaces the
+        session with a fresh one, which also resets the command sequence state.
+
+        Args:
+            payload (dict): The handshake or credentials packet.
+            addr (tuple): Sender address.
+
+        Returns:
+            bool: True if the session was replaced.
+        """
+        def send(reply):
+            self.control_socket.sendto(json.dumps(reply).encode(), addr)
+
+        if self.handshake_result is not None and addr == self.handshake_addr:
+            log.info("handshake", "Repeated handshake from %s, re-sending the result", addr)
+            send(self.handshake_result)
+            return False
+
+        combined = payload.get("type") == "handshake"
+        credentials = (payload.get("credentials") or {}) if combined else payload
+        if not self.handle_client_response(credentials):
+            log.warn("handshake", "Handshake from %s during a session rejected", addr)
+            send(handshake_result_packet(auth_status_packet(False)) if combined else auth_status_packet(False))
+            return False
+
+        log.info("handshake", "New handshake from %s, replacing the session", addr)
+        self.end_session()
+        self.start_discovery()
+        self.handle_handshake(payload, addr)
+        return True
+
+    def resume_session(self, payload, addr):
+        """
+        Resumes the last session from its token in one round trip.
+
+        The tune, control format and vehicle setup negotiated by the full
+        handshake are still in place, so only the session itself is restarted.
+        The token is single use; the reply carries the next one.
+
+        Args:
+            payload (dict): The client's session_resume.
+            addr (tuple): Client address (it may have changed since the drop).
+
+        Returns:
+            bool: True if the session was resumed.
+        """
+        token = payload.get("token")
+        valid = (self.session_token is not None and isinstance(token, str)
+                 and secrets.compare_digest(token, self.session_token)
+                 and (self.session_active or time.monotonic() < self.session_token_expires)
+                 and payload.get("client_ver") in self.core.SUPPORTED_VER)
+        if not valid:
+            log.warn("handshake", "Session resume from %s rejected", addr)
+            self.control_socket.sendto(json.dumps(session_resumed_packet(False)).encode(), addr)
+            return False
+
+        # The client may come back before its old session timed out here
+        self.end_session()
+        self.client_ip = addr[0]
+        self.session_token = secrets.token_hex(16)
+        reply = session_resumed_packet(True, self.session_token, self.core.HOST_VER, self.control_format)
+        self.control_socket.sendto(json.dumps(reply).encode(), addr)
+        log.info("handshake", "Session resumed by %s", addr)
+        self.handshake_status = True
+        # The client rebinds its video port only after this reply reaches its UI; its
+        # heartbeat comes after that, so the stream starts on the first heartbeat
+        self.start_session(defer_video=True)
+        return True
+
+    # === SESSION LIFECYCLE ===
+    def start_session(self, defer_video: bool = False):
+        """
+        Starts a client session: actuator, video thread and the heartbeat deadline.
+
+        Args:
+            defer_video (bool): Start the video on the client's first heartbeat instead of now.
+        """
+        # New session: the client's sequence numbers start over
+        self.command_coalescer.reset()
+        self.last_timestamp = None
+        self.drive_assist_enabled = False   # The client re-sends ENABLE_DRIVE_ASSIST if it is on
+        self.session_active = True
+        self.core.client_online = True
+        self.core.last_seen_timestamp = time.time()
+        self.core.handshake_complete.set()
+        self.core._start_system()
+        self.video_deferred = defer_video
+        if not defer_video:
+            self.start_video()
+
+        # The client starts its heartbeat after the handshake, allow it a grace period
+        self.heartbeat_timer = self.loop.call_later(self.HEARTBEAT_TIMEOUT + self.HEARTBEAT_GRACE,
+                                                    self.on_heartbeat_timeout)
+        log.info("system", "Session started with %s", self.client_ip)
+
+    def start_video(self):
+        """
+        Starts the session's video thread once the previous session's thread has exited.
+
+        That thread still holds the camera, so until it is gone this re-checks
+        from a timer instead of blocking the loop.
+        """
+        if not self.session_active or self.video_thread is not None:
+            return
+        if self.stopping_video is not None and self.stopping_video.is_alive():
+            self.loop.call_later(self.VIDEO_STOP_POLL, self.start_video)
+            return
+        self.stopping_video = None
+
+        self.video_stop = Event()
+        self.video_thread = threading.Thread(target=self.video_stream, args=(self.video_stop,), name="video", daemon=True)
+        self.video_thread.start()
+
+    def reap_video_thread(self, thread, since: float):
+        """
+        Timer: watches a stopping video thread and reports it if it overruns VIDEO_STOP_TIMEOUT.
+        """
+        if not thread.is_alive():
+            log.debug("video", "Video thread stopped after %.2fs", time.monotonic() - since)
+        elif time.monotonic() - since >= self.VIDEO_STOP_TIMEOUT:
+            log.warn("video", "Video thread did not stop within %.1fs", self.VIDEO_STOP_TIMEOUT)
+        else:
+            self.loop.call_later(self.VIDEO_STOP_POLL, self.reap_video_thread, thread, since)
+
+    def end_session(self):
+        """
+        Cancels the session's timers, tells the video thread to stop and parks the actuators.
+
+        Never blocks the loop: the video thread is left to exit on its own and
+        watched from a timer (see start_video and reap_video_thread).
+        """
+        if not self.session_active:
+            return
+        self.session_active = False
+        self.video_deferred = False
+        self.handshake_result = None
+        self.handshake_addr = None
+        self.core.client_online = False
+        if self.heartbeat_timer is not None:
+            self.heartbeat_timer.cancel()
+            self.heartbeat_timer = None
+
+        self.video_stop.set()
+        if self.video_thread is not None:
+            self.stopping_video = self.video_thread
+            self.video_thread = None
+            self.loop.call_later(self.VIDEO_STOP_POLL, self.reap_video_thread, self.stopping_video, time.monotonic())
+
+        self.core._stop_system()
+        self.session_token_expires = time.monotonic() + self.RESUME_WINDOW
+        log.info("system", "Session ended")
+
+    def on_heartbeat_timeout(self):
+        self.heartbeat_timer = None
+        log.warn("heartbeat", "Client disconnected. Restarting broadcast or handshake...")
+        self.end_session()
+        self.start_discovery()
 
     # === Handle Client responces ===
     def handle_client_response(self, payload):
         if payload.get("type") == "credentials":
             if (payload.get("username") != self.username) and (payload.get("password") != self.password):
-                print("[Handshake]: Invalid credentials.")
+                log.warn("handshake", "Invalid credentials.")
                 self.handshake_status = False
                 return False
             else:
@@ -142,7 +476,7 @@ class NetworkManager:
                 return True
             else:
                 self.handshake_status = False
-                print("[Handshake]: Incompatable client ver")
+                log.warn("handshake", "Incompatible client version %s", payload.get("client_ver"))
                 return False
 
         elif payload.get("type") == "":
@@ -152,6 +486,42 @@ class NetworkManager:
         elif payload.get("type") == "":
             return
     
+    def client_latency_ms(self, client_timestamp):
+        """
+        One-way latency of a client-stamped packet, on the host clock.
+
+        Args:
+            client_timestamp (int | float): Client timestamp in ms.
+
+        Returns:
+            float | None: Latency in ms, or None before the client has sent a clock offset.
+        """
+        if self.clock_offset_ms is None or client_timestamp is None:
+            return None
+        now = time.time() * 1000.0
+        # The client's estimator extrapolates drift from its own base time, on the client clock
+        offset = self.clock_offset_ms + self.clock_drift_ppm * 1e-6 * (client_timestamp - self.clock_offset_base)
+        return now - (client_timestamp + offset)
+
+    def negotiate_control_format(self, payload):
+        """
+        Picks the control packet format from the formats the client offers.
+
+        Clients that don't offer any (older versions) stay on JSON.
+
+        Args:
+            payload (dict): The client's version_request.
+
+        Returns:
+            str: "binary" or "json".
+        """
+        offered = payload.get("control_formats") or ["json"]
+        for control_format in CONTROL_FORMATS:
+            if control_format in offered:
+                log.info("handshake", "Control format: %s", control_format)
+                return control_format
+        return "json"
+
     # === apply vehicle tune ===
     def apply_tune(self, payload):
         type = payload.get("type")
@@ -178,8 +548,10 @@ class NetworkManager:
             self.settings = load_settings(self.SETTINGS_FILE)
 
             # Print The New Values Of The Duties
-            print(f"Servo:\nMax Duty{self.core.max_duty_servo}\nMin Duty{self.core.min_duty_servo}\nNeutral Duty{self.core.neutral_servo}\n")
-            print(f"Esc:\nMax Duty{self.core.max_duty_esc}\nMin Duty{self.core.min_duty_esc}\nNeutral Duty{self.core.neutral_duty_esc}\nBrake{self.core.brake_esc}")
+            log.info("tune", "Servo duties", max=self.core.max_duty_servo, min=self.core.min_duty_servo,
+                     neutral=self.core.neutral_servo)
+            log.info("tune", "ESC duties", max=self.core.max_duty_esc, min=self.core.min_duty_esc,
+                     neutral=self.core.neutral_duty_esc, brake=self.core.brake_esc)
 
             # Set Pi gpio
             self.core.setup_pigpio()
@@ -189,7 +561,7 @@ class NetworkManager:
             match payload.get("action"):
                 # Test for midpoint of the servo
                 case "servo_mid_cal":
-                    print("sevo test")
+                    log.info("tune", "Servo midpoint test", servo=payload.get("servo"))
                     servo_test = payload.get("servo")
 
                     # Set to desired point
@@ -261,7 +633,7 @@ class NetworkManager:
                     esc_max = payload.get("max")
                     esc_brake = payload.get("brake")
 
-                    print(payload)
+                    log.info("tune", "ESC test: %s", payload)
                     self.core.pi.set_servo_pulsewidth(self.core.SERVO_PIN, 0)
                     # WAIT
                     time.sleep(1)
@@ -310,302 +682,426 @@ class NetworkManager:
                     pass
     
     # === COMMAND RECEIVER ===
-    def command_listener(self):
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        sock.bind(("0.0.0.0", self.CONTROL_PORT))
-        print("Listening for control commands...")
+    def on_control_readable(self):
+        """
+        Drains the control socket: handshake packets before a session, commands during one.
+        """
+        batch = self.receive_control_batch(self.control_socket)
+        if not self.session_active:
+            for data, addr in batch:
+                try:
+                    payload = json.loads(data.decode())
+                except (UnicodeDecodeError, ValueError):
+                    continue
+                if payload.get("type") == "discover":
+                    # Unicast discovery probe from a client that knows this host
+                    self.answer_discover(addr)
+                elif payload.get("type") == "session_resume":
+                    self.resume_session(payload, addr)
+                else:
+                    self.handle_handshake(payload, addr)
+            return
 
-        while True:
-            data, addr = sock.recvfrom(1024)
-            payload = json.loads(data.decode())
+        # --- Judge everything queued as a whole ---
+        commands = []
+        for data, addr in batch:
+            if data[:2] == CONTROL_MAGIC:
+                # Binary control packets skip JSON entirely
+                payload = parse_control_packet(data)
+                if payload is not None:
+                    commands.append((payload, addr, True))
+                continue
+
+            try:
+                payload = json.loads(data.decode())
+            except (UnicodeDecodeError, ValueError):
+                continue
             payloadType = payload.get("type")
 
             if payloadType == "keyboard_command":
-                self.handle_control(sock, addr, payload)
+                commands.append((payload, addr, False))
             elif payloadType == "drive_assist_command":
-                self.handle_control(sock, addr, payload)
+                commands.append((payload, addr, False))
             elif payloadType == "sent_tune":
-                self.apply_tune(payload)
+                # Tune tests hold the outputs for seconds; keep them off the loop
+                threading.Thread(target=self.apply_tune, args=(payload,), name="tune-test", daemon=True).start()
             elif payloadType == "shutdown_systems":
-                self.send_last_ack(sock, addr)
+                self.send_last_ack(self.control_socket, addr)
                 self.core.shutdown()
+                self.stop()
+                return
+            elif payloadType == "session_resume":
+                if self.resume_session(payload, addr):
+                    # Commands queued before the resume belong to the previous session's sequence
+                    commands.clear()
+            elif payloadType in ("handshake", "credentials"):
+                if self.handle_session_handshake(payload, addr):
+                    # The previous session's queued commands don't carry over
+                    commands.clear()
             else:
                 pass
 
+        if not commands or not self.session_active:
+            return
+
+        # --- Newest command per axis wins; stale ones are acked but not applied ---
+        apply, skipped = self.command_coalescer.select(commands)
+        for payload, addr, binary in apply:
+            self.handle_control(self.control_socket, addr, payload, binary)
+        for payload, addr, binary in skipped:
+            self.send_control_ack(self.control_socket, addr, payload, binary, payload.get("command"), CONTROL_ACK_SUPERSEDED)
+
+    def receive_control_batch(self, sock):
+        """
+        Takes every datagram queued on the (non-blocking) control socket.
+
+        Args:
+            sock (socket.socket): The control socket.
+
+        Returns:
+            list[tuple[bytes, tuple]]: (data, addr) pairs in arrival order.
+        """
+        batch = []
+        try:
+            while len(batch) < self.CONTROL_BATCH_MAX:
+                batch.append(sock.recvfrom(1024))
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError as e:
+            # e.g. ICMP port unreachable from a client that went away
+            log.debug("control", "Control socket error: %s", e)
+        return batch
+
     # === HANDLE KEYBOARD INPUTS ===
-    def handle_control(self, sock, addr, payload):
-        #global last_timestamp, last_command_time, current_esc_pw, current_servo_pw
+    def handle_control(self, sock, addr, payload, binary=False):
+        """
+        Turns a control command into actuator setpoints and acks it.
+
+        Nothing here touches the PWM outputs or sleeps. The actuator loop slews
+        the ESC and servo toward the setpoints at its own fixed rate. The ack is
+        sent in the same format (binary or JSON) as the command.
+        """
         now = int(time.time() * 1000)
         incoming_time = payload.get("timestamp")
         command = payload.get("command")
         esc_intensity = payload.get("esc_intensity", 0.0)
         servo_intensity = payload.get("servo_intensity", 0.0)
-        #last_command_time = time.time()
+        actuator = self.core.actuator
 
         if self.last_timestamp is not None:
             gap = now - self.last_timestamp
             if gap > self.TIMEOUT_MS:
-                print(f"Delay > {self.TIMEOUT_MS}ms: {gap}ms since last packet")
-
-                if self.core.current_esc_pw != self.core.neutral_duty_esc:
-                    self.core.current_esc_pw = self.core.neutral_duty_esc
-                    self.core.pi.set_servo_pulsewidth(self.core.ESC_PIN, self.core.current_esc_pw)
-                    command = "NEUTRAL"
-
-                if self.core.current_servo_pw != self.core.neutral_servo:
-                    self.core.current_servo_pw = self.core.neutral_servo
-                    self.core.pi.set_servo_pulsewidth(self.core.SERVO_PIN, self.core.current_servo_pw)
-                    command = "CENTER"
-            time.sleep(0.01)
+                log.warn("control", "Delay > %dms: %dms since last packet", self.TIMEOUT_MS, gap)
+                # Stale link: go to neutral before acting on the new command
+                actuator.neutral()
         
         elif self.core.emergency_active:
             if time.time() - self.core.emergency_trigger_time > 3.0:
                 self.core.emergency_active = False
-                print("Emergency cleared, ready for control.")
+                log.warn("control", "Emergency cleared, ready for control.")
         
-        if self.core.emergency_active and command  == "EMERGENCY_STOP":
-            print("Ignored command during emergency:", command)
-            ack = keyboard_command_ack_packet("Ignored command during emergency", self.core.current_esc_pw, self.core.current_servo_pw)
+        if actuator.fault is not None:
+            # The outputs are parked at neutral until pigpio writes work again
+            log.warn("control", "Ignored command during actuator fault: %s", command)
+            ack_command, ack_status = "Ignored command during actuator fault", CONTROL_ACK_FAULT
+
+        elif self.core.emergency_active and command  == "EMERGENCY_STOP":
+            log.warn("control", "Ignored command during emergency: %s", command)
+            ack_command, ack_status = "Ignored command during emergency", CONTROL_ACK_IGNORED
         
         #TODO match case
         else:
             if command == "UP":
-                self.core.current_esc_pw = self.core.map_throttle(esc_intensity, forward=True)
-                self.core.pi.set_servo_pulsewidth(self.core.ESC_PIN, self.core.current_esc_pw)
-                self.smooth_servo_center_accel()
+                actuator.set_targets(esc=self.core.map_throttle(esc_intensity, forward=True))
+                actuator.center()
 
             elif command == "DOWN":
-                self.core.current_esc_pw = self.core.map_throttle(esc_intensity, forward=False)
-                self.core.pi.set_servo_pulsewidth(self.core.ESC_PIN, self.core.current_esc_pw)
-                self.smooth_servo_center_accel()
+                actuator.set_targets(esc=self.core.map_throttle(esc_intensity, forward=False))
+                actuator.center()
 
             elif command == "LEFT":
-                # TODO: Cancel any active smooth steering if new CENTER is issued
-                self.centering_cancel.set()
-                self.core.current_servo_pw = self.core.map_steering(servo_intensity, left=True)
-                #self.core.current_servo_pw = self.core.map_steering(self.core.current_esc_pw)
-                self.core.pi.set_servo_pulsewidth(self.core.SERVO_PIN, self.core.current_servo_pw)
-                self.core.pi.set_servo_pulsewidth(self.core.ESC_PIN, self.core.neutral_duty_esc)
+                actuator.set_targets(esc=self.core.neutral_duty_esc,
+                                     servo=self.core.map_steering(servo_intensity, left=True))
 
             elif command == "RIGHT":
-                # TODO: Cancel any active smooth steering if new CENTER is issued
-                self.centering_cancel.set()
-                self.core.current_servo_pw = self.core.map_steering(servo_intensity, left=False)
-                #self.core.current_servo_pw = self.core.map_steering(self.core.current_esc_pw)
-                self.core.pi.set_servo_pulsewidth(self.core.SERVO_PIN, self.core.current_servo_pw)
-                self.core.pi.set_servo_pulsewidth(self.core.ESC_PIN, self.core.neutral_duty_esc)
+                actuator.set_targets(esc=self.core.neutral_duty_esc,
+                                     servo=self.core.map_steering(servo_intensity, left=False))
 
             elif command == "LEFTUP":
-                # TODO: Cancel any active smooth steering if new CENTER is issued
-                self.centering_cancel.set()
-                self.core.current_esc_pw = self.core.map_throttle(esc_intensity, forward=True)
-                self.core.current_servo_pw = self.core.map_steering(servo_intensity, left=True)
-                #self.core.current_servo_pw = self.core.map_steering(self.core.current_esc_pw)
-                self.core.pi.set_servo_pulsewidth(self.core.ESC_PIN, self.core.current_esc_pw)
-                self.core.pi.set_servo_pulsewidth(self.core.SERVO_PIN, self.core.current_servo_pw)
+                actuator.set_targets(esc=self.core.map_throttle(esc_intensity, forward=True),
+                                     servo=self.core.map_steering(servo_intensity, left=True))
 
             elif command == "LEFTDOWN":
-                # TODO: Cancel any active smooth steering if new CENTER is issued
-                self.centering_cancel.set()
-                self.core.current_esc_pw = self.core.map_throttle(esc_intensity, forward=False)
-                self.core.current_servo_pw = self.core.map_steering(servo_intensity, left=True)
-                #self.core.current_servo_pw = self.core.map_steering(self.core.current_esc_pw)
-                self.core.pi.set_servo_pulsewidth(self.core.ESC_PIN, self.core.current_esc_pw)
-                self.core.pi.set_servo_pulsewidth(self.core.SERVO_PIN, self.core.current_servo_pw)
+                actuator.set_targets(esc=self.core.map_throttle(esc_intensity, forward=False),
+                                     servo=self.core.map_steering(servo_intensity, left=True))
 
             elif command == "RIGHTUP":
-                # TODO: Cancel any active smooth steering if new CENTER is issued
-                self.centering_cancel.set()
-                self.core.current_esc_pw = self.core.map_throttle(esc_intensity, forward=True)
-                self.core.current_servo_pw = self.core.map_steering(servo_intensity, left=False)
-                #self.core.current_servo_pw = self.core.map_steering(self.core.current_esc_pw)
-                self.core.pi.set_servo_pulsewidth(self.core.ESC_PIN, self.core.current_esc_pw)
-                self.core.pi.set_servo_pulsewidth(self.core.SERVO_PIN, self.core.current_servo_pw)
+                actuator.set_targets(esc=self.core.map_throttle(esc_intensity, forward=True),
+                                     servo=self.core.map_steering(servo_intensity, left=False))
 
             elif command == "RIGHTDOWN":
-                # TODO: Cancel any active smooth steering if new CENTER is issued
-                self.centering_cancel.set()
-                self.core.current_esc_pw = self.core.map_throttle(esc_intensity, forward=False)
-                self.core.current_servo_pw = self.core.map_steering(servo_intensity, left=False)
-                #self.core.current_servo_pw = self.core.map_steering(self.core.current_esc_pw)
-                self.core.pi.set_servo_pulsewidth(self.core.ESC_PIN, self.core.current_esc_pw)
-                self.core.pi.set_servo_pulsewidth(self.core.SERVO_PIN, self.core.current_servo_pw)
+                actuator.set_targets(esc=self.core.map_throttle(esc_intensity, forward=False),
+                                     servo=self.core.map_steering(servo_intensity, left=False))
 
             elif command == "BRAKE":
-                self.core.current_esc_pw = self.core.brake_esc
-                self.core.pi.set_servo_pulsewidth(self.core.ESC_PIN, self.core.current_esc_pw)
+                actuator.set_targets(esc=self.core.brake_esc)
 
             elif command == "NEUTRAL":
-                self.core.current_esc_pw = self.core.neutral_duty_esc
-                self.core.pi.set_servo_pulsewidth(self.core.ESC_PIN, self.core.current_esc_pw)
+                actuator.set_targets(esc=self.core.neutral_duty_esc)
 
             elif command == "CENTER":
-                # FIXME: REMOVE!
-                #self.core.current_servo_pw = self.core.neutral_servo
-                #self.core.pi.set_servo_pulsewidth(self.core.SERVO_PIN, self.core.current_servo_pw)
-                # TODO: Cancel any active smooth steering if new CENTER is issued
-                self.centering_cancel.set()
-                self.smooth_servo_center()
+                actuator.center()
 
             elif command == "EMERGENCY_STOP":
-                self.core.current_esc_pw = self.core.brake_esc
-                self.core.current_servo_pw = self.core.neutral_servo
-
-                self.core.pi.set_servo_pulsewidth(self.core.SERVO_PIN, self.core.current_servo_pw)
-                self.core.pi.set_servo_pulsewidth(self.core.ESC_PIN, self.core.current_esc_pw)
-                time.sleep(0.1)
-                self.core.pi.set_servo_pulsewidth(self.core.ESC_PIN, self.core.current_esc_pw)
-                time.sleep(0.1)
-                self.core.pi.set_servo_pulsewidth(self.core.ESC_PIN, self.core.current_esc_pw)
-                
-                
+                # The actuator loop holds the brake from its next tick
+                actuator.emergency_stop()
                 self.core.emergency_active = True
                 self.core.emergency_trigger_time = time.time()
             
             elif command == "CLEAR_EMERGENCY":
                 self.core.emergency_active = False
-                print("Emergency cleared manually.")
+                log.warn("control", "Emergency cleared manually.")
             
             elif command == "ENABLE_DRIVE_ASSIST":
                 self.core.pi.write(self.core.FLOOD_LIGHT_PIN, 1)
+                self.drive_assist_enabled = True
             
             elif command == "DISABLE_DRIVE_ASSIST":
                 self.core.pi.write(self.core.FLOOD_LIGHT_PIN, 0)
+                self.drive_assist_enabled = False
             
-            print(f"Command: {command} | ESC: {self.core.current_esc_pw} | SERVO: {self.core.current_servo_pw} | From: {addr} | Time diff: {now - incoming_time}ms")
-            ack = keyboard_command_ack_packet(command, self.core.current_esc_pw, self.core.current_servo_pw)
+            esc_pw, servo_pw = actuator.targets()
+            if log.enabled(INFO):
+                latency = self.client_latency_ms(incoming_time)
+                log.info("control", "Command: %s", command, esc=esc_pw, servo=servo_pw, src=addr[0],
+                         seq=payload.get("seq"), latency_ms=latency if latency is not None else "unsynced")
+            ack_command, ack_status = command, CONTROL_ACK_OK
 
         self.last_timestamp = now
-        sock.sendto(json.dumps(ack).encode(), addr)
+        self.send_control_ack(sock, addr, payload, binary, ack_command, ack_status)
+
+    def send_control_ack(self, sock, addr, payload, binary, ack_command, ack_status):
+        """
+        Acks a command with the current actuator setpoints, in the format it arrived in.
+        """
+        esc_pw, servo_pw = self.core.actuator.targets()
+        seq = payload.get("seq")
+        if binary:
+            sock.sendto(control_ack_packet(payload.get("command"), ack_status, seq, esc_pw, servo_pw), addr)
+        else:
+            ack = keyboard_command_ack_packet(ack_command, esc_pw, servo_pw, seq)
+            sock.sendto(json.dumps(ack).encode(), addr)
     
     def send_last_ack(self, sock, addr):
         ack = last_ack_packet("Shutdown initiated")
         sock.sendto(json.dumps(ack).encode(), addr)
-        sock.close()
     
-    def smooth_servo_center_accel(self, base_step=5, base_delay=0.005):
+    def on_heartbeat_readable(self):
         """
-        Gradually move the servo back to the neutral position.
-        - step_size: PWM microseconds per adjustment
-        - delay: seconds between each adjustment step
+        Answers every queued heartbeat and pushes the session's heartbeat deadline back.
         """
-        distance = abs(self.core.current_servo_pw - self.core.neutral_servo)
-        steps = max(1, distance // base_step)
-
-        for _ in range(int(steps)):
-            if self.core.current_servo_pw < self.core.neutral_servo:
-                self.core.current_servo_pw += base_step
-                self.core.current_servo_pw = min(self.core.current_servo_pw, self.core.neutral_servo)
-            else:
-                self.core.current_servo_pw -= base_step
-                self.core.current_servo_pw = max(self.core.current_servo_pw, self.core.neutral_servo)
-
-            self.core.pi.set_servo_pulsewidth(self.core.SERVO_PIN, self.core.current_servo_pw)
-            time.sleep(base_delay)
-    
-    def smooth_servo_center(self, step_size=10, delay=0.01):
-        self.centering_cancel.clear()
-
-        def run():
-            while not self.centering_cancel.is_set():
-                current = self.core.current_servo_pw
-                target = self.core.neutral_servo
-
-                if current == target:
-                    break  # Done
-
-                if current < target:
-                    current = min(current + step_size, target)
-                else:
-                    current = max(current - step_size, target)
-
-                self.core.current_servo_pw = current
-                self.core.pi.set_servo_pulsewidth(self.core.SERVO_PIN, current)
-                time.sleep(delay)
-
-        # Start only if no other centering is active
-        if self.centering_thread and self.centering_thread.is_alive():
-            return
-
-        self.centering_thread = threading.Thread(target=run, daemon=True)
-        self.centering_thread.start()
-    
-    def listen_for_heartbeats(self):
         while True:
             try:
                 data, addr = self.heartbeat_socket.recvfrom(1024)
-                payload = json.loads(data.decode())
-                if payload.get("type") == "heartbeat":
-                    self.core.last_seen_timestamp = time.time()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                log.error("heartbeat", "Error: %s", e)
+                return
 
-            except socket.timeout:
+            t1 = time.time() * 1000.0
+            try:
+                payload = json.loads(data.decode())
+            except (UnicodeDecodeError, ValueError):
+                continue
+            if payload.get("type") != "heartbeat":
                 continue
 
-            except Exception as e:
-                print(f"[Heartbeat] Error: {e}")
-
-    def heartbeat_watchdog(self):
-        while not self.core.restart_flag.is_set():
-            self.core.restart_flag.wait(8.0)
-            self.core.restart_flag.set()
-            print("done")
-            
-        while self.core.restart_flag.is_set():
-            now = time.time()
-
-            if now - self.core.last_seen_timestamp > self.HEARTBEAT_TIMEOUT:
-                if self.core.client_online:
-                    print("Client disconnected. Restarting broadcast or handshake...")
-                    self.core.client_online = False # Should break the run() loop
-
-            else:
-                if not self.core.client_online:
-                    print("Client connection re-established.")
-                    self.core.client_online = True
-
-            time.sleep(2)
-
-    def video_stream(self):
+            self.core.last_seen_timestamp = time.time()
+            if self.session_active:
+                if self.heartbeat_timer is not None:
+                    self.heartbeat_timer.cancel()
+                self.heartbeat_timer = self.loop.call_later(self.HEARTBEAT_TIMEOUT, self.on_heartbeat_timeout)
+                if self.video_deferred:
+                    self.video_deferred = False
+                    self.start_video()
+
+            # --- Time sync: answer the probe, take the client's offset estimate ---
+            if "t0" in payload:
+                self.heartbeat_socket.sendto(json.dumps(heartbeat_ack_packet(payload["t0"], t1)).encode(), addr)
+            if payload.get("clock_offset_ms") is not None:
+                self.clock_offset_ms = payload["clock_offset_ms"]
+                self.clock_drift_ppm = payload.get("clock_drift_ppm") or 0.0
+                # Older clients don't send their base time; this heartbeat's client time stands in
+                base = payload.get("clock_base_ms")
+                self.clock_offset_base = base if base is not None else t1 - self.clock_offset_ms
+
+    def video_stream(self, stop: Event):
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 65536) #65536
-
-        picam2 = Picamera2()
-        config = picam2.create_video_configuration(
-            main={"format": "XRGB8888", "size": (1280, 720)}, 
-            lores=None,    # no low-res stream
-            raw=None,      # no raw output request
-            controls={"FrameRate": 60.0}
-        )
-        picam2.configure(config)
-        picam2.start(show_preview=False)
-
-        print(f"Streaming video to {self.client_ip}:{self.VIDEO_PORT}")
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 262144)   # Room for a whole batched frame
+
+        # Connected, so batched sends need no per-datagram address and the kernel skips the route lookup
+        sock.connect((self.client_ip, self.VIDEO_PORT))
+        self.set_video_mtu(sock, self.settings["video_mtu"])
+        sender = DatagramBatchSender(sock)
+        self.video_sender = sender
+
+        # Optional low-res analysis stream for the client's drive-assist CV
+        analysis_fps = self.settings["analysis_fps"]
+        analysis_size = tuple(self.settings["analysis_size"]) if analysis_fps else None
+
+        camera = create_camera_source(self.settings["camera_source"], self.CAMERA_SIZE,
+                                      self.settings["camera_fps"], analysis_size, self.settings["camera_path"])
+        camera.start()
+
+        log.info("video", "Streaming video to %s:%d", self.client_ip, self.VIDEO_PORT)
+
+        # Quality, resolution and frame rate follow the client's receiver reports
+        controller = AdaptiveQualityController(self.settings["video_delay_budget_ms"],
+                                               self.settings["fec_group_size"])
+        self.video_controller = controller
+
+        next_frame_id = 0
+        next_analysis_id = 0
+        last_capture = 0.0
+        last_analysis = 0.0
+        analysis_queue = DropOldestQueue(1)
+
+        # --- Stage 1: Capture ---
+        def capture(_):
+            nonlocal next_frame_id, next_analysis_id, last_capture, last_analysis
+            camera_frame = camera.read()
+            now = camera_frame.timestamp
+
+            # The analysis stream has its own rate and is handed to its own pipeline, only
+            # while the client has drive assist on
+            if (camera_frame.lores is not None and self.drive_assist_enabled
+                    and now - last_analysis >= (1.0 / analysis_fps) * 0.9):
+                last_analysis = now
+                analysis_queue.put(PipelineFrame(next_analysis_id, current_time(), camera_frame.lores))
+                next_analysis_id = (next_analysis_id + 1) & 0xFFFFFFFF
+
+            # Skip frames to hold the controller's frame rate
+            if now - last_capture < (1.0 / controller.fps) * 0.9:
+                return None
+            last_capture = now
+
+            # Stamp the sensor capture time (camera monotonic clock) on the wall clock the client syncs to
+            capture_ms = time.time() * 1000.0 - (time.monotonic() - now) * 1000.0
+            frame = PipelineFrame(next_frame_id, int(capture_ms), camera_frame.image)
+            next_frame_id = (next_frame_id + 1) & 0xFFFFFFFF
+            return frame
+
+        # --- Stage 2: Encode ---
+        def encode(frame):
+            frame.encode_start = time.time() * 1000.0
+            image = frame.image
+            if controller.resolution != self.CAMERA_SIZE:
+                image = cv2.resize(image, controller.resolution, interpolation=cv2.INTER_AREA)
+            _, buffer = cv2.imencode(".jpg", image, [int(cv2.IMWRITE_JPEG_QUALITY), controller.quality])
+            frame.jpeg = memoryview(buffer).cast("B")    # No copy, chunks are sliced from this view
+            frame.image = None
+            frame.chunk_size = self.video_chunk_size
+
+            # Parity is computed here so it runs on the encoder threads, not the sender
+            fec_group = controller.fec_group
+            if fec_group:
+                frame.fec_group = fec_group
+                frame.parity = build_parity_chunks(frame.jpeg, frame.chunk_size, fec_group)
+            frame.encode_end = time.time() * 1000.0
+            return frame
+
+        # --- Stage 3: Transmit ---
+        frame_trace = self.settings["frame_trace"]
+
+        def transmit(frame):
+            send_video_frame(sender, frame)
+            if frame_trace:
+                sender.send(json.dumps(frame_trace_packet(frame)).encode())
+
+        pipeline = VideoPipeline(capture, encode, transmit, self.VIDEO_QUEUE_SIZE,
+                                 encoder_workers=self.settings["encoder_workers"])
+        self.video_pipeline = pipeline
+
+        # --- Analysis stream: small frames at a fixed quality, no FEC ---
+        analysis_sender = DatagramBatchSender(sock)
+
+        def encode_analysis(frame):
+            _, buffer = cv2.imencode(".jpg", frame.image, [int(cv2.IMWRITE_JPEG_QUALITY), self.settings["analysis_quality"]])
+            frame.jpeg = memoryview(buffer).cast("B")
+            frame.image = None
+            frame.chunk_size = self.video_chunk_size
+            return frame
+
+        def transmit_analysis(frame):
+            send_video_frame(analysis_sender, frame, VIDEO_FLAG_ANALYSIS)
+
+        analysis_pipeline = None
+        if analysis_size:
+            analysis_pipeline = VideoPipeline(lambda _: analysis_queue.get(timeout=0.1), encode_analysis,
+                                              transmit_analysis, queue_size=1)
+            analysis_pipeline.start()
+            log.info("video", "Analysis stream %dx%d @%sfps", analysis_size[0], analysis_size[1], analysis_fps)
+
+        pipeline.start()
 
         try:
-            while True and self.core.client_online:
-                frame = picam2.capture_array()
-                _, buffer = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), 40])
-                data = buffer.tobytes()
-
-                timestamp = int(time.time() * 1000)
-
-                header = json.dumps({
-                    "chunks": (len(data) + self.CHUNK_SIZE - 1) // self.CHUNK_SIZE,
-                    "timestamp": timestamp
-                }).encode()
-
-                sock.sendto(header, (self.client_ip, self.VIDEO_PORT))
-
-                for i in range(0, len(data), self.CHUNK_SIZE):
-                    sock.sendto(data[i:i + self.CHUNK_SIZE], (self.client_ip, self.VIDEO_PORT))
-
+            last_stats = time.monotonic()
+            while not stop.is_set() and pipeline.is_running():
+                # --- Receiver reports come back on the video socket ---
+                readable, _, _ = select.select([sock], [], [], 0.5)
+                if readable:
+                    self.handle_receiver_report(sock, controller)
+
+                if time.monotonic() - last_stats >= self.VIDEO_STATS_INTERVAL:
+                    send_stats = sender.stats()
+                    log.info("video", "%s | chunk=%dB %s dgram/syscall dropped=%d", pipeline.format_stats(),
+                             self.video_chunk_size, send_stats['datagrams_per_syscall'], send_stats['dropped'])
+                    if analysis_pipeline is not None:
+                        log.info("video", "analysis %s", analysis_pipeline.format_stats())
+                    last_stats = time.monotonic()
 
         except Exception as e:
-            print(f"Video stream error: {e}")
+            log.error("video", "Video stream error: %s", e)
         
         finally:
-            picam2.stop()
-            picam2.close()
+            pipeline.stop()
+            if analysis_pipeline is not None:
+                analysis_pipeline.stop()
+            camera.stop()
             sock.close()
-            print("Video stream stopped cleanly.")
\ No newline at end of file
+            log.info("video", "Video stream stopped cleanly.")
+
+    def handle_receiver_report(self, sock, controller):
+        try:
+            data, addr = sock.recvfrom(1024)
+            payload = json.loads(data.decode())
+        except (OSError, ValueError) as e:
+            log.warn("video", "Bad receiver report: %s", e)
+            return
+
+        if payload.get("type") == "video_tune":
+            if "mtu" in payload:
+                self.set_video_mtu(sock, int(payload["mtu"]))
+            if "fec_group" in payload:
+                group_size = int(payload["fec_group"])
+                if group_size != 0 and not 2 <= group_size <= MAX_GROUP_SIZE:
+                    log.warn("video", "Ignoring FEC group size %d", group_size)
+                    return
+                controller.set_fec_group(group_size)
+        elif payload.get("type") != "receiver_report" or not controller.on_report(payload):
+            return
+
+        state = controller.state()
+        sock.sendto(json.dumps(video_state_packet(state["quality"], state["width"], state["height"],
+                                                  state["fps"], state["fec_group"],
+                                                  state["last_change"])).encode(), addr)
+
+    def set_video_mtu(self, sock, mtu: int):
+        # Never exceed the kernel's path MTU, larger datagrams would be fragmented
+        kernel_mtu = path_mtu(sock)
+        if kernel_mtu:
+            mtu = min(mtu, kernel_mtu)
+        mtu = max(mtu, 576)     # IPv4 minimum
+        self.video_chunk_size = chunk_size_for_mtu(mtu, DATAGRAM_HEADER_SIZE)
+        log.info("video", "MTU %d -> %d byte chunks", mtu, self.video_chunk_size)
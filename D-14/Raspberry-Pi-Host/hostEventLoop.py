@@ -0,0 +1,224 @@
+"""
+hostEventLoop.py
+
+Single-threaded selectors event loop for the host's network sockets.
+
+The broadcast, handshake/control and heartbeat sockets are registered here and
+handled as they become readable; periodic work (broadcast beacons, the
+heartbeat deadline, stats) runs on timers instead of sleeping threads. Other
+threads (video, actuator) hand work to the loop with call_soon_threadsafe,
+which wakes the selector through a socket pair.
+
+The loop counts its wakeups, so an idle host can be seen to be idle.
+
+Author: HalfasleepDev
+Created: 18-10-2026
+"""
+
+# === Imports ===
+import heapq
+import itertools
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+
+from hostLogger import log
+
+# === Class Definitions ===
+class Timer:
+    """
+    Handle of a scheduled callback.
+
+    Attributes:
+        when (float): Monotonic due time.
+        cancelled (bool): Set by cancel(); the loop skips cancelled timers.
+    """
+
+    __slots__ = ("when", "callback", "args", "cancelled")
+
+    def __init__(self, when: float, callback, args: tuple):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+class EventLoop:
+    """
+    Dispatches socket readiness, timers and cross-thread calls on one thread.
+
+    Attributes:
+        selector (selectors.BaseSelector): Readiness notification for the registered sockets.
+        running (bool): Cleared by stop().
+        wakeups (int): Times the selector returned (events, a due timer or a posted call).
+        events (int): Socket callbacks run.
+        timers_fired (int): Timer callbacks run.
+        calls (int): Cross-thread calls run.
+    """
+
+    def __init__(self):
+        """
+        Creates the selector and the wakeup socket pair.
+        """
+        self.selector = selectors.DefaultSelector()
+        self.timers = []
+        self.timer_ids = itertools.count()     # Tie breaker, so equal due times never compare Timers
+        self.posted = deque()
+        self.thread_id = None
+        self.running = False
+
+        # --- Wakeup channel for call_soon_threadsafe ---
+        self.wake_recv, self.wake_send = socket.socketpair()
+        self.wake_recv.setblocking(False)
+        self.wake_send.setblocking(False)
+        self.selector.register(self.wake_recv, selectors.EVENT_READ, self._drain_wakeups)
+
+        self.wakeups = 0
+        self.events = 0
+        self.timers_fired = 0
+        self.calls = 0
+        self.callback_errors = 0
+        self.stats_time = time.monotonic()
+        self.stats_wakeups = 0
+
+    # === Registration ===
+    def add_reader(self, sock, callback):
+        """
+        Calls callback() on the loop thread whenever sock is readable.
+
+        Args:
+            sock (socket.socket): A non-blocking socket.
+            callback (Callable): Called with no arguments.
+        """
+        self.selector.register(sock, selectors.EVENT_READ, callback)
+
+    def remove_reader(self, sock):
+        """
+        Stops watching sock (ignored if it is not registered).
+        """
+        try:
+            self.selector.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+
+    def call_later(self, delay: float, callback, *args) -> Timer:
+        """
+        Schedules callback(*args) after delay seconds (loop thread only).
+
+        Returns:
+            Timer: Handle to cancel the call.
+        """
+        timer = Timer(time.monotonic() + delay, callback, args)
+        heapq.heappush(self.timers, (timer.when, next(self.timer_ids), timer))
+        return timer
+
+    def call_soon_threadsafe(self, callback, *args):
+        """
+        Runs callback(*args) on the loop thread as soon as possible; callable from any thread.
+        """
+        self.posted.append((callback, args))
+        try:
+            self.wake_send.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass    # A wakeup is already pending
+
+    def _drain_wakeups(self):
+        try:
+            while self.wake_recv.recv(512):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    # === Running ===
+    def run_forever(self):
+        """
+        Runs until stop() is called.
+        """
+        self.thread_id = threading.get_ident()
+        self.running = True
+        while self.running:
+            timeout = None
+            if self.posted:
+                timeout = 0
+            elif self.timers:
+                timeout = max(0.0, self.timers[0][0] - time.monotonic())
+
+            ready = self.selector.select(timeout)
+            self.wakeups += 1
+
+            for key, _ in ready:
+                self.events += 1
+                self._run(key.data)
+
+            while self.posted:
+                callback, args = self.posted.popleft()
+                self.calls += 1
+                self._run(callback, *args)
+
+            now = time.monotonic()
+            while self.timers and self.timers[0][0] <= now:
+                _, _, timer = heapq.heappop(self.timers)
+                if not timer.cancelled:
+                    self.timers_fired += 1
+                    self._run(timer.callback, *timer.args)
+
+    def _run(self, callback, *args):
+        # One failing handler must not take the whole host down
+        try:
+            callback(*args)
+        except Exception as e:
+            self.callback_errors += 1
+            log.error("loop", "Callback %s failed: %r", getattr(callback, "__name__", callback), e)
+
+    def stop(self):
+        """
+        Makes run_forever() return after the current iteration; callable from any thread.
+        """
+        self.running = False
+        self.call_soon_threadsafe(lambda: None)
+
+    def close(self):
+        self.selector.close()
+        self.wake_recv.close()
+        self.wake_send.close()
+
+    # === Stats ===
+    def stats(self) -> dict:
+        """
+        Returns the loop counters, resetting the wakeup rate window.
+
+        Returns:
+            dict: Wakeups per second since the last call, totals, pending timers,
+            registered sockets and the process thread count.
+        """
+        now = time.monotonic()
+        elapsed = now - self.stats_time
+        rate = (self.wakeups - self.stats_wakeups) / elapsed if elapsed > 0 else 0.0
+        self.stats_time = now
+        self.stats_wakeups = self.wakeups
+        return {
+            "wakeups_per_s": round(rate, 1),
+            "wakeups": self.wakeups,
+            "events": self.events,
+            "timers_fired": self.timers_fired,
+            "calls": self.calls,
+            "callback_errors": self.callback_errors,
+            "timers_pending": sum(1 for _, _, timer in self.timers if not timer.cancelled),
+            "sockets": len(self.selector.get_map()) - 1,
+            "threads": threading.active_count(),
+        }
+
+    def format_stats(self) -> str:
+        """
+        Returns:
+            str: One-line summary, including the names of the running threads.
+        """
+        s = self.stats()
+        names = sorted(thread.name for thread in threading.enumerate())
+        return (f"threads={s['threads']} wakeups/s={s['wakeups_per_s']} events={s['events']} "
+                f"timers={s['timers_fired']} sockets={s['sockets']} errors={s['callback_errors']} "
+                f"[{', '.join(names)}]")
@@ -0,0 +1,409 @@
+"""
+hostLogger.py
+
+Asynchronous, rate-limited structured logging for the host.
+
+A log call costs a level check, a per-category rate limit/sampling check and a
+deque append. The record (a tuple with the message template, its arguments and
+any key=value fields) goes into a bounded in-memory ring buffer. A background
+thread drains the buffer, formats the records and writes them to stdout in
+batches, so console or journald I/O never happens in the control path. If the
+writer falls behind, the oldest records are overwritten and counted.
+
+High-frequency categories (e.g. "control", one record per command) get a token
+bucket rate limit and optional 1-in-N sampling. Suppressed records are counted
+and reported in a periodic summary line.
+
+The level can be changed at runtime with set_level(), and by signal:
+SIGUSR1 toggles DEBUG, SIGHUP reloads the log settings.
+
+Author: HalfasleepDev
+Created: 18-10-2026
+"""
+
+# === Imports ===
+import atexit
+import json
+import signal
+import sys
+import threading
+import time
+from collections import deque
+
+# === Constants ===
+DEBUG = 10
+INFO = 20
+WARN = 30
+ERROR = 40
+
+LEVELS = {"DEBUG": DEBUG, "INFO": INFO, "WARN": WARN, "ERROR": ERROR}
+LEVEL_NAMES = {value: name for name, value in LEVELS.items()}
+
+RING_CAPACITY = 4096        # Records buffered before the oldest are overwritten
+FLUSH_INTERVAL = 0.1        # Seconds between writer drains (WARN and above wake it at once)
+SUMMARY_INTERVAL = 10.0     # Seconds between suppressed-record summaries
+
+# Category -> {"rate": records/s, "burst": bucket size, "sample": keep 1 in N below WARN}
+DEFAULT_CATEGORY_POLICIES = {
+    "control": {"rate": 10, "burst": 20, "sample": 1},
+    "heartbeat": {"rate": 1, "burst": 5, "sample": 1},
+}
+
+# === Class Definitions ===
+class CategoryPolicy:
+    """
+    Token bucket rate limit and 1-in-N sampling for one log category.
+
+    Records come from many threads, so the bucket and counters are guarded by
+    the policy's own lock.
+
+    Attributes:
+        rate (float): Records per second allowed on average (0 = unlimited).
+        burst (float): Records allowed in a burst.
+        sample (int): Keep one in this many records below WARN.
+        suppressed (int): Records dropped by the rate limit since the last summary.
+        sampled_out (int): Records dropped by sampling since the last summary.
+    """
+
+    __slots__ = ("rate", "burst", "sample", "tokens", "last_refill", "counter", "suppressed", "sampled_out",
+                 "lock")
+
+    def __init__(self, rate: float = 0, burst: float = 0, sample: int = 1):
+        """
+        Initializes the policy with a full bucket.
+
+        Args:
+            rate (float): Records per second (0 = unlimited).
+            burst (float): Bucket size, at least one record.
+            sample (int): Keep 1 in N records below WARN.
+        """
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst or rate))
+        self.sample = max(1, int(sample))
+        self.tokens = self.burst
+        self.last_refill = time.monotonic()
+        self.counter = 0
+        self.suppressed = 0
+        self.sampled_out = 0
+        self.lock = threading.Lock()
+
+    def allow(self, level: int) -> bool:
+        """
+        Returns:
+            bool: True if a record at this level may be logged now.
+        """
+        with self.lock:
+            if level < WARN and self.sample > 1:
+                self.counter += 1
+                if self.counter % self.sample:
+                    self.sampled_out += 1
+                    return False
+
+            if self.rate <= 0:
+                return True
+
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+            if self.tokens < 1.0:
+                self.suppressed += 1
+                return False
+            self.tokens -= 1.0
+            return True
+
+    def take_dropped(self) -> tuple:
+        """
+        Returns (and resets) the drop counters.
+
+        Returns:
+            tuple[int, int]: (suppressed, sampled_out) since the last call.
+        """
+        with self.lock:
+            dropped = (self.suppressed, self.sampled_out)
+            self.suppressed = 0
+            self.sampled_out = 0
+            return dropped
+
+class HostLogger:
+    """
+    Ring-buffered logger drained by a background writer thread.
+
+    Attributes:
+        level (int): Records below this level are discarded at the call site.
+        base_level (int): Level from the settings, restored when DEBUG is toggled off.
+        output (str): "text" or "json" (one JSON object per line).
+        stream (file): Where the writer thread writes.
+        policies (dict[str, CategoryPolicy]): Rate limit and sampling per category.
+        records (int): Records accepted into the ring buffer.
+        written (int): Records written by the writer thread.
+        overwritten (int): Records lost because the ring buffer was full.
+    """
+
+    def __init__(self, capacity: int = RING_CAPACITY, stream=None):
+        """
+        Initializes the logger; the writer thread starts on the first record.
+
+        Args:
+            capacity (int): Ring buffer size in records.
+            stream (file, optional): Output stream, stdout by default.
+        """
+        self.capacity = capacity
+        self.ring = deque(maxlen=capacity)
+        self.stream = stream if stream is not None else sys.stdout
+
+        self.level = INFO
+        self.base_level = INFO
+        self.output = "text"
+        self.policies = {}
+        self.policy_lock = threading.Lock()
+        self.configure_policies(DEFAULT_CATEGORY_POLICIES)
+
+        self.records = 0
+        self.written = 0
+        self.overwritten = 0
+
+        self.wakeup = threading.Event()
+        self.running = False
+        self.thread = None
+        self.start_lock = threading.Lock()
+        self.exit_hook = False          # stop() registered with atexit (once, not per start)
+        self.last_summary = time.monotonic()
+        self.reload = None
+
+    # === Configuration ===
+    def configure(self, settings: dict):
+        """
+        Applies the log settings: "log_level", "log_format" and "log_categories".
+
+        Args:
+            settings (dict): Host settings.
+        """
+        self.set_level(settings.get("log_level", "INFO"), base=True)
+        self.output = "json" if settings.get("log_format") == "json" else "text"
+        self.configure_policies({**DEFAULT_CATEGORY_POLICIES, **(settings.get("log_categories") or {})})
+
+    def configure_policies(self, policies: dict):
+        """
+        Replaces the per-category rate limits and sampling.
+
+        Args:
+            policies (dict): Category -> {"rate", "burst", "sample"}.
+        """
+        with self.policy_lock:
+            self.policies = {category: CategoryPolicy(p.get("rate", 0), p.get("burst", 0), p.get("sample", 1))
+                             for category, p in policies.items()}
+
+    def set_level(self, level, base: bool = False):
+        """
+        Changes the level at runtime.
+
+        Args:
+            level (int | str): A level value or name ("DEBUG", "INFO", "WARN", "ERROR").
+            base (bool): Also make it the level restored after a DEBUG toggle.
+        """
+        if isinstance(level, str):
+            level = LEVELS.get(level.upper(), INFO)
+        self.level = level
+        if base:
+            self.base_level = level
+
+    def toggle_debug(self):
+        """
+        Switches between DEBUG and the configured level.
+        """
+        self.set_level(self.base_level if self.level == DEBUG else DEBUG)
+        self.log(WARN, "log", "Log level %s", LEVEL_NAMES[self.level])
+
+    def install_signal_handlers(self, reload=None):
+        """
+        SIGUSR1 toggles DEBUG; SIGHUP calls reload() (which should call configure()).
+
+        Must be called from the main thread; does nothing elsewhere.
+
+        Args:
+            reload (Callable, optional): Re-reads the settings and applies them.
+        """
+        self.reload = reload
+        try:
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.toggle_debug())
+            if reload is not None:
+                signal.signal(signal.SIGHUP, lambda signum, frame: self._reload())
+        except (ValueError, AttributeError):
+            pass
+
+    def _reload(self):
+        self.reload()
+        self.log(WARN, "log", "Log settings reloaded, level %s", LEVEL_NAMES.get(self.level, self.level))
+
+    # === Logging ===
+    def enabled(self, level: int) -> bool:
+        return level >= self.level
+
+    def log(self, level: int, category: str, msg: str, *args, **fields):
+        """
+        Queues a record; formatting happens on the writer thread.
+
+        Args:
+            level (int): DEBUG, INFO, WARN or ERROR.
+            category (str): Subsystem, e.g. "control", "handshake", "video".
+            msg (str): Message, %-formatted with args.
+            *args: Arguments for msg.
+            **fields: Structured key=value fields.
+        """
+        if level < self.level:
+            return
+        policy = self.policies.get(category)
+        if policy is not None and not policy.allow(level):
+            return
+
+        if len(self.ring) == self.capacity:
+            self.overwritten += 1
+        self.ring.append((time.time(), level, category, msg, args, fields))
+        self.records += 1
+
+        if not self.running:
+            self.start()
+        if level >= WARN:
+            self.wakeup.set()
+
+    def debug(self, category: str, msg: str, *args, **fields):
+        self.log(DEBUG, category, msg, *args, **fields)
+
+    def info(self, category: str, msg: str, *args, **fields):
+        self.log(INFO, category, msg, *args, **fields)
+
+    def warn(self, category: str, msg: str, *args, **fields):
+        self.log(WARN, category, msg, *args, **fields)
+
+    def error(self, category: str, msg: str, *args, **fields):
+        self.log(ERROR, category, msg, *args, **fields)
+
+    # === Writer Thread ===
+    def start(self):
+        """
+        Starts the writer thread (once).
+        """
+        with self.start_lock:
+            if self.running:
+                return
+            self.running = True
+            self.thread = threading.Thread(target=self.run, name="host-log", daemon=True)
+            self.thread.start()
+            if not self.exit_hook:
+                atexit.register(self.stop)
+                self.exit_hook = True
+
+    def stop(self):
+        """
+        Stops the writer thread after writing everything still buffered.
+        """
+        if not self.running:
+            return
+        self.running = False
+        self.wakeup.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(1.0)
+        self.flush()
+
+    def run(self):
+        """
+        Writer loop: drain the ring buffer in batches.
+        """
+        while self.running:
+            self.wakeup.wait(FLUSH_INTERVAL)
+            self.wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """
+        Writes every buffered record, plus the suppressed-record summary when due.
+        """
+        lines = []
+        ring = self.ring
+        while ring:
+            try:
+                record = ring.popleft()
+            except IndexError:
+                break
+            lines.append(self.format(record))
+
+        if time.monotonic() - self.last_summary >= SUMMARY_INTERVAL:
+            self.last_summary = time.monotonic()
+            summary = self.summary()
+            if summary:
+                lines.append(self.format((time.time(), INFO, "log", "%s", (summary,), {})))
+
+        if not lines:
+            return
+        try:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+        except (OSError, ValueError):
+            # Console gone (closed terminal, stopped journald); keep running
+            return
+        self.written += len(lines)
+
+    def format(self, record: tuple) -> str:
+        """
+        Formats one record as a text or JSON line.
+        """
+        timestamp, level, category, msg, args, fields = record
+        try:
+            message = msg % args if args else msg
+        except (TypeError, ValueError):
+            message = f"{msg} {args}"
+
+        if self.output == "json":
+            entry = {"time": round(timestamp, 3), "level": LEVEL_NAMES.get(level, level),
+                     "category": category, "message": message}
+            entry.update(fields)
+            return json.dumps(entry, default=str)
+
+        clock = time.strftime("%H:%M:%S", time.localtime(timestamp))
+        line = f"{clock}.{int(timestamp * 1000) % 1000:03d} {LEVEL_NAMES.get(level, level):5} [{category}] {message}"
+        if fields:
+            line += " " + " ".join(f"{key}={format_field(value)}" for key, value in fields.items())
+        return line
+
+    # === Stats ===
+    def summary(self) -> str:
+        """
+        Returns (and resets) the suppressed and overwritten counts since the last summary.
+
+        Returns:
+            str: Summary line, empty if nothing was dropped.
+        """
+        parts = []
+        with self.policy_lock:
+            for category, policy in self.policies.items():
+                suppressed, sampled_out = policy.take_dropped()
+                if suppressed or sampled_out:
+                    parts.append(f"{category}: {suppressed} rate limited, {sampled_out} sampled out")
+        if self.overwritten:
+            parts.append(f"{self.overwritten} overwritten (ring buffer full)")
+            self.overwritten = 0
+        return " | ".join(parts)
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Level, records accepted and written, and the records buffered now.
+        """
+        return {
+            "level": LEVEL_NAMES.get(self.level, self.level),
+            "records": self.records,
+            "written": self.written,
+            "buffered": len(self.ring),
+        }
+
+# === Helper Functions ===
+def format_field(value) -> str:
+    """
+    Formats a field value for a text line (floats to two decimals).
+    """
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+# Shared host logger
+log = HostLogger()
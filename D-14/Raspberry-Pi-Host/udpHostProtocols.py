@@ -1,4 +1,5 @@
 import time
+import struct
 
 def current_time():
     return int(time.time() * 1000)
@@ -21,11 +22,12 @@ def auth_status_packet(STATUS: bool):
         "status": STATUS
     }
 
-def version_info_packet(VERSION: str, COMPATABLE: bool):
+def version_info_packet(VERSION: str, COMPATABLE: bool, CONTROL_FORMAT: str = "json"):
     return {
         "type": "version_info",
         "host-version": VERSION,
-        "client_compatablity": COMPATABLE
+        "client_compatablity": COMPATABLE,
+        "control_format": CONTROL_FORMAT
     }
 
 def setup_info_packet(VEHICLE_MODEL: str, CONTROL_SCHEME: str):
@@ -35,25 +37,175 @@ def setup_info_packet(VEHICLE_MODEL: str, CONTROL_SCHEME: str):
         "control_scheme": CONTROL_SCHEME 
     }
 
-def handshake_complete_packet(COMPLETE: bool):
+def handshake_complete_packet(COMPLETE: bool, SESSION_TOKEN: str = None, RESUME_WINDOW: float = 0):
     return {
         "type": "handshake_complete",
-        "status": COMPLETE
+        "status": COMPLETE,
+        "session_token": SESSION_TOKEN,
+        "resume_window_s": RESUME_WINDOW
     }
 
-# ------ Keyboard Command ACK ------
+def handshake_result_packet(AUTH_STATUS: dict, VERSION_INFO: dict = None, SETUP_INFO: dict = None,
+                            HANDSHAKE_COMPLETE: dict = None):
+    """
+    Answers a combined handshake with the step replies it covers; the steps after a failed one are None.
+    """
+    return {
+        "type": "handshake_result",
+        "auth_status": AUTH_STATUS,
+        "version_info": VERSION_INFO,
+        "setup_info": SETUP_INFO,
+        "handshake_complete": HANDSHAKE_COMPLETE
+    }
+
+# ------ Session Resume ------
+def session_resumed_packet(STATUS: bool, SESSION_TOKEN: str = None, VERSION: str = None, CONTROL_FORMAT: str = "json"):
+    """
+    Answers a session_resume; on success it carries the next token and the session's negotiated format.
+    """
+    return {
+        "type": "session_resumed",
+        "status": STATUS,
+        "session_token": SESSION_TOKEN,
+        "host-version": VERSION,
+        "control_format": CONTROL_FORMAT
+    }
 
-def keyboard_command_ack_packet(cmd: str, current_esc_pw, current_servo_pw):
+# ------ Heartbeat / Time Sync ------
+def heartbeat_ack_packet(t0: float, t1: float):
+    """
+    Answers a heartbeat with the host receive (t1) and send (t2) times for the client's offset estimate.
+    """
     return {
+        "type": "heartbeat_ack",
+        "t0": t0,
+        "t1": t1,
+        "t2": time.time() * 1000.0
+    }
+
+# ------ Keyboard Command ACK ------
+
+def keyboard_command_ack_packet(cmd: str, current_esc_pw, current_servo_pw, seq: int = None):
+    packet = {
         "type": "command_ack",
         "command": cmd,
         "esc_pw": current_esc_pw,
         "servo_pw": current_servo_pw,
         "timestamp": current_time()
     }
+    if seq is not None:
+        packet["seq"] = seq
+    return packet
+
+# ------ Binary Control (negotiated in version_request) ------
+# Command:  magic (2s) | version (B) | command (B) | seq (I) | esc_intensity (h) | servo_intensity (h) |
+#           timestamp_ms (Q)
+# Ack:      magic (2s) | version (B) | command (B) | status (B) | seq (I) | esc_pw (H) | servo_pw (H) |
+#           timestamp_ms (Q)
+# Intensities are quantized to 1/CONTROL_INTENSITY_SCALE. The magic never starts
+# with "{", so a binary packet can't be mistaken for JSON on the same port.
+CONTROL_MAGIC = b"DK"
+CONTROL_ACK_MAGIC = b"DA"
+CONTROL_PROTOCOL_VER = 1
+CONTROL_PACKET = struct.Struct("!2sBBIhhQ")
+CONTROL_ACK = struct.Struct("!2sBBBIHHQ")
+CONTROL_INTENSITY_SCALE = 10000
+CONTROL_FORMATS = ("binary", "json")    # Host preference order
+
+CONTROL_ACK_OK = 0
+CONTROL_ACK_IGNORED = 1                 # Ignored command during emergency
+CONTROL_ACK_SUPERSEDED = 2              # Not applied: out of order, stale or replaced by a newer command
+CONTROL_ACK_FAULT = 3                   # Not applied: the actuator outputs are failing (held at neutral)
+
+CONTROL_COMMANDS = ("NONE", "UP", "DOWN", "LEFT", "RIGHT", "LEFTUP", "LEFTDOWN", "RIGHTUP", "RIGHTDOWN",
+                    "BRAKE", "NEUTRAL", "CENTER", "EMERGENCY_STOP", "CLEAR_EMERGENCY",
+                    "ENABLE_DRIVE_ASSIST", "DISABLE_DRIVE_ASSIST")
+CONTROL_COMMAND_IDS = {name: index for index, name in enumerate(CONTROL_COMMANDS)}
+
+def parse_control_packet(data):
+    """
+    Decodes a binary control packet into the same dict a JSON keyboard_command carries.
+
+    Args:
+        data (bytes): The raw datagram.
+
+    Returns:
+        dict | None: The command payload, or None if the datagram is not a valid control packet.
+    """
+    if len(data) != CONTROL_PACKET.size:
+        return None
+    magic, version, command, seq, esc, servo, timestamp = CONTROL_PACKET.unpack(data)
+    if magic != CONTROL_MAGIC or version != CONTROL_PROTOCOL_VER or command >= len(CONTROL_COMMANDS):
+        return None
+    return {
+        "type": "keyboard_command",
+        "command": CONTROL_COMMANDS[command],
+        "seq": seq,
+        "esc_intensity": esc / CONTROL_INTENSITY_SCALE,
+        "servo_intensity": servo / CONTROL_INTENSITY_SCALE,
+        "timestamp": timestamp
+    }
+
+def control_ack_packet(cmd: str, status: int, seq: int, current_esc_pw, current_servo_pw):
+    return CONTROL_ACK.pack(CONTROL_ACK_MAGIC, CONTROL_PROTOCOL_VER, CONTROL_COMMAND_IDS.get(cmd, 0), status,
+                            seq & 0xFFFFFFFF, int(current_esc_pw), int(current_servo_pw), current_time())
 
 # ------ Frame ------
 
+# Binary video datagram header (ver 2):
+#   magic (2s) | version (B) | flags (B) | frame_id (I) | chunk_index (H) | chunk_count (H) |
+#   chunk_size (H) | timestamp_ms (Q)
+# chunk_size is the payload stride, so chunk i always starts at byte i * chunk_size of the frame.
+# flags: bit 0 = parity chunk, bit 1 = analysis stream, bits 4-7 = FEC group size (0 = no FEC).
+# The analysis stream (low-res frames for the client CV) has its own frame ids.
+# A parity chunk uses chunk_index as its group index and its payload starts with
+# the frame length (I) followed by chunk_size bytes of XOR parity.
+VIDEO_MAGIC = b"DC"
+VIDEO_PROTOCOL_VER = 2
+VIDEO_HEADER = struct.Struct("!2sBBIHHHQ")
+VIDEO_FEC_HEADER = struct.Struct("!I")
+VIDEO_FLAG_PARITY = 0x01
+VIDEO_FLAG_ANALYSIS = 0x02
+
+def video_fec_flags(group_size: int, parity: bool = False):
+    return ((group_size & 0x0F) << 4) | (VIDEO_FLAG_PARITY if parity else 0)
+
+def video_chunk_header(frame_id: int, chunk_index: int, chunk_count: int, chunk_size: int, timestamp: int, flags: int = 0):
+    return VIDEO_HEADER.pack(VIDEO_MAGIC, VIDEO_PROTOCOL_VER, flags,
+                             frame_id & 0xFFFFFFFF, chunk_index, chunk_count, chunk_size, timestamp)
+
+def pack_video_chunk_header(buffer, offset: int, frame_id: int, chunk_index: int, chunk_count: int,
+                            chunk_size: int, timestamp: int, flags: int = 0):
+    VIDEO_HEADER.pack_into(buffer, offset, VIDEO_MAGIC, VIDEO_PROTOCOL_VER, flags,
+                           frame_id & 0xFFFFFFFF, chunk_index, chunk_count, chunk_size, timestamp)
+
+# ------ Frame Trace ------
+def frame_trace_packet(frame):
+    """
+    Host-side timings of one frame, sent after its last chunk. Marks are ms offsets from the capture time.
+    """
+    capture = frame.timestamp
+    return {
+        "type": "frame_trace",
+        "frame_id": frame.frame_id,
+        "capture": capture,
+        "encode": [round(frame.encode_start - capture, 2), round(frame.encode_end - capture, 2)],
+        "send": [round(frame.send_first - capture, 2), round(frame.send_last - capture, 2)]
+    }
+
+# ------ Video Controller State ------
+def video_state_packet(quality: int, width: int, height: int, fps: int, fec_group: int, reason: str):
+    return {
+        "type": "video_state",
+        "quality": quality,
+        "width": width,
+        "height": height,
+        "fps": fps,
+        "fec_group": fec_group,
+        "reason": reason,
+        "timestamp": current_time()
+    }
+
 def frame_ack_packet(n_chunks):
     return {
         "chunks": n_chunks,
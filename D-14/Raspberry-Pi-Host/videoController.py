@@ -0,0 +1,248 @@
+"""
+videoController.py
+
+Closed-loop video quality controller driven by client receiver reports.
+
+The client reports frames completed/dropped, chunk loss and one-way latency
+about twice a second. The controller steps JPEG quality, then resolution,
+then frame rate down when the link is congested, and back up (in reverse
+order) once it has been healthy for a few reports. When FEC is enabled it also
+adds parity under random loss and removes it again once the link is clean.
+
+Author: HalfasleepDev
+Created: 18-10-2026
+"""
+
+# === Imports ===
+import threading
+import time
+from collections import deque
+
+from hostLogger import log
+
+# === Constants ===
+RESOLUTION_LADDER = [(1280, 720), (960, 540), (640, 360)]
+FPS_LADDER = [60, 30, 20, 10]
+FEC_LADDER = [12, 8, 6, 4, 3]       # Data chunks per parity chunk, most to least efficient
+
+# === Class Definitions ===
+class AdaptiveQualityController:
+    """
+    Adjusts JPEG quality, resolution and frame rate to stay inside a delay budget.
+
+    Latency is judged as the excess over the lowest latency seen in the recent
+    reports. That excess is the queueing delay the stream is adding, and it does
+    not depend on the offset between the host and client clocks.
+
+    Attributes:
+        quality (int): Current JPEG quality.
+        resolution_level (int): Index into RESOLUTION_LADDER.
+        fps_level (int): Index into FPS_LADDER.
+        fec_group (int): Data chunks per parity chunk, 0 when FEC is off.
+        fec_min_group (int): Least protective group size the controller relaxes to.
+        delay_budget_ms (float): Allowed latency above the recent best.
+        reports (int): Receiver reports processed.
+        last_report (dict | None): Most recent receiver report.
+        last_change (str): Description of the last adjustment.
+    """
+
+    # ====== Tuning ======
+    MAX_QUALITY = 70
+    MIN_QUALITY = 20
+    START_QUALITY = 40
+    QUALITY_STEP_DOWN = 10
+    QUALITY_STEP_UP = 5
+
+    LOSS_HIGH_PCT = 5.0         # Back off above this chunk loss
+    LOSS_LOW_PCT = 1.0          # Healthy below this chunk loss
+    HEALTHY_REPORTS = 4         # Consecutive healthy reports before stepping up
+    HOLD_REPORTS = 2            # Reports to wait after stepping down before judging again
+    BASELINE_WINDOW = 30        # Reports kept to find the best latency
+
+    def __init__(self, delay_budget_ms: float = 60.0, fec_group: int = 0):
+        """
+        Initializes the controller at the default quality and full resolution/frame rate.
+
+        Args:
+            delay_budget_ms (float): Allowed latency above the recent best, in ms.
+            fec_group (int): Starting FEC group size, 0 disables FEC.
+        """
+        self.delay_budget_ms = delay_budget_ms
+        self.fec_group = fec_group
+        self.fec_min_group = fec_group
+        self.fec_clean_streak = 0
+
+        self.lock = threading.Lock()
+        self.quality = self.START_QUALITY
+        self.resolution_level = 0
+        self.fps_level = 0
+
+        self.latency_history = deque(maxlen=self.BASELINE_WINDOW)
+        self.healthy_streak = 0
+        self.hold = 0
+        self.reports = 0
+        self.last_report = None
+        self.last_change = "start"
+        self.last_change_time = time.time()
+
+    # === Current Targets ===
+    @property
+    def resolution(self):
+        return RESOLUTION_LADDER[self.resolution_level]
+
+    @property
+    def fps(self):
+        return FPS_LADDER[self.fps_level]
+
+    # === Feedback ===
+    def on_report(self, report: dict) -> bool:
+        """
+        Updates the targets from one receiver report.
+
+        Args:
+            report (dict): A "receiver_report" packet from the client.
+
+        Returns:
+            bool: True if quality, resolution or frame rate changed.
+        """
+        with self.lock:
+            self.reports += 1
+            self.last_report = report
+
+            latency = report.get("latency_ms")
+            loss = report.get("chunk_loss_pct", 0.0)
+            completed = report.get("frames_completed", 0)
+            dropped = report.get("frames_dropped", 0)
+
+            if latency is not None:
+                self.latency_history.append(latency)
+            baseline = min(self.latency_history) if self.latency_history else 0
+            excess = (latency - baseline) if latency is not None else 0
+
+            drop_ratio = dropped / (completed + dropped) if (completed + dropped) else 0.0
+
+            fec_changed = self._adapt_fec(loss, excess)
+
+            congested = excess > self.delay_budget_ms or loss > self.LOSS_HIGH_PCT or drop_ratio > 0.2
+            healthy = excess < self.delay_budget_ms * 0.5 and loss < self.LOSS_LOW_PCT and drop_ratio < 0.05
+
+            if self.hold > 0:
+                # Give the previous step down time to take effect
+                self.hold -= 1
+                return fec_changed
+
+            if congested:
+                self.healthy_streak = 0
+                self.hold = self.HOLD_REPORTS
+                return self._step_down(f"delay +{excess:.0f}ms, loss {loss:.1f}%, dropped {dropped}") or fec_changed
+
+            if healthy:
+                self.healthy_streak += 1
+                if self.healthy_streak >= self.HEALTHY_REPORTS:
+                    self.healthy_streak = 0
+                    return self._step_up(f"delay +{excess:.0f}ms, loss {loss:.1f}%") or fec_changed
+            else:
+                self.healthy_streak = 0
+
+            return fec_changed
+
+    def _adapt_fec(self, loss: float, excess: float) -> bool:
+        """
+        Adds parity under loss that isn't caused by queueing, and removes it once the link is clean.
+
+        Loss with a growing delay is congestion, where extra parity would only add
+        to the queue, so it is left to the quality steps.
+        """
+        if not self.fec_group:
+            return False
+
+        level = FEC_LADDER.index(self.fec_group) if self.fec_group in FEC_LADDER else 0
+        if loss > self.LOSS_LOW_PCT and excess < self.delay_budget_ms:
+            self.fec_clean_streak = 0
+            if level < len(FEC_LADDER) - 1:
+                self.fec_group = FEC_LADDER[level + 1]
+                self._changed("fec", f"loss {loss:.1f}%")
+                return True
+        elif loss == 0:
+            self.fec_clean_streak += 1
+            if self.fec_clean_streak >= self.HEALTHY_REPORTS and self.fec_group < self.fec_min_group:
+                self.fec_clean_streak = 0
+                larger = [k for k in FEC_LADDER if self.fec_group < k <= self.fec_min_group]
+                self.fec_group = min(larger) if larger else self.fec_min_group
+                self._changed("fec", "no loss")
+                return True
+        return False
+
+    def set_fec_group(self, group_size: int):
+        """
+        Sets the FEC group size at runtime (0 turns FEC off).
+
+        Args:
+            group_size (int): Data chunks per parity chunk.
+        """
+        with self.lock:
+            self.fec_group = group_size
+            self.fec_min_group = group_size
+            self.fec_clean_streak = 0
+            self._changed("fec", "set by client")
+
+    def _step_down(self, reason: str) -> bool:
+        """
+        Reduces quality first, then resolution, then frame rate.
+        """
+        if self.quality > self.MIN_QUALITY:
+            self.quality = max(self.MIN_QUALITY, self.quality - self.QUALITY_STEP_DOWN)
+        elif self.resolution_level < len(RESOLUTION_LADDER) - 1:
+            self.resolution_level += 1
+        elif self.fps_level < len(FPS_LADDER) - 1:
+            self.fps_level += 1
+        else:
+            return False
+        self._changed("down", reason)
+        return True
+
+    def _step_up(self, reason: str) -> bool:
+        """
+        Restores frame rate first, then resolution, then quality.
+        """
+        if self.fps_level > 0:
+            self.fps_level -= 1
+        elif self.resolution_level > 0:
+            self.resolution_level -= 1
+        elif self.quality < self.MAX_QUALITY:
+            self.quality = min(self.MAX_QUALITY, self.quality + self.QUALITY_STEP_UP)
+        else:
+            return False
+        self._changed("up", reason)
+        return True
+
+    def _changed(self, direction: str, reason: str):
+        """
+        Records and logs an adjustment.
+        """
+        width, height = self.resolution
+        self.last_change = f"{direction}: {reason}"
+        self.last_change_time = time.time()
+        log.info("video", "%s -> Q%d %dx%d @%sfps FEC 1/%s (%s)", direction.upper(), self.quality, width, height,
+                 self.fps, self.fec_group or '-', reason)
+
+    def state(self) -> dict:
+        """
+        Returns the controller state.
+
+        Returns:
+            dict: Current targets, budget, last adjustment and last report.
+        """
+        with self.lock:
+            width, height = self.resolution
+            return {
+                "quality": self.quality,
+                "width": width,
+                "height": height,
+                "fps": self.fps,
+                "fec_group": self.fec_group,
+                "delay_budget_ms": self.delay_budget_ms,
+                "reports": self.reports,
+                "last_change": self.last_change,
+                "last_report": self.last_report,
+            }
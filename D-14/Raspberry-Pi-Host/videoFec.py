@@ -0,0 +1,43 @@
+"""
+videoFec.py
+
+XOR parity forward error correction for video chunks.
+
+Chunks of a frame are split into groups of k. For each group one parity chunk
+is sent: the XOR of the group's chunks (the short last chunk is zero padded).
+The client can rebuild any single missing chunk of a group from the parity
+and the other chunks, so a smaller k recovers more loss at a higher overhead
+(1/k extra datagrams).
+
+Author: HalfasleepDev
+Created: 18-10-2026
+"""
+
+# === Imports ===
+import numpy as np
+
+# === Constants ===
+MAX_GROUP_SIZE = 15     # Group size is carried in the upper 4 bits of the header flags
+
+# === Helper Functions ===
+def build_parity_chunks(data: bytes, chunk_size: int, group_size: int):
+    """
+    Computes one XOR parity chunk per group of `group_size` data chunks.
+
+    Args:
+        data (bytes | memoryview): Encoded frame.
+        chunk_size (int): Payload size of each data chunk.
+        group_size (int): Data chunks per parity chunk (2..MAX_GROUP_SIZE).
+
+    Returns:
+        numpy.ndarray: One row of `chunk_size` parity bytes per group, in group order.
+    """
+    chunk_count = (len(data) + chunk_size - 1) // chunk_size
+    groups = (chunk_count + group_size - 1) // group_size
+
+    # Zero-pad to whole groups so every group reduces over the same shape
+    padded = np.zeros(groups * group_size * chunk_size, np.uint8)
+    padded[:len(data)] = np.frombuffer(data, np.uint8)
+    grouped = padded.reshape(groups, group_size, chunk_size)
+
+    return np.bitwise_xor.reduce(grouped, axis=1)
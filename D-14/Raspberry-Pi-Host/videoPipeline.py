@@ -0,0 +1,421 @@
+"""
+videoPipeline.py
+
+Pipelined video capture -> encode -> transmit stages for the host.
+
+Each stage runs on its own thread and the stages are connected by bounded
+drop-oldest queues, so a slow sendto never stalls the camera and the freshest
+frame always wins.
+
+Author: HalfasleepDev
+Created: 18-10-2026
+"""
+
+# === Imports ===
+import threading
+import time
+from collections import deque
+
+from hostLogger import log
+
+# === Class Definitions ===
+class PipelineFrame:
+    """
+    A frame travelling through the pipeline.
+
+    Attributes:
+        frame_id (int): Sequential id assigned at capture.
+        timestamp (int): Capture time in ms.
+        image (numpy.ndarray | None): Raw camera frame, released after encoding.
+        jpeg (memoryview | None): Encoded JPEG data (a view of the encoder's output array).
+        chunk_size (int): Datagram payload size chosen for this frame.
+        fec_group (int): FEC group size used for this frame (0 = no FEC).
+        parity (numpy.ndarray | list): FEC parity chunks, one row per group.
+        encode_start (float): Wall time (ms) encoding started.
+        encode_end (float): Wall time (ms) encoding finished.
+        send_first (float): Wall time (ms) the first datagram was handed to the sender.
+        send_last (float): Wall time (ms) the last datagram was sent.
+    """
+    __slots__ = ("frame_id", "timestamp", "image", "jpeg", "chunk_size", "fec_group", "parity",
+                 "encode_start", "encode_end", "send_first", "send_last")
+
+    def __init__(self, frame_id: int, timestamp: int, image):
+        self.frame_id = frame_id
+        self.timestamp = timestamp
+        self.image = image
+        self.jpeg = None
+        self.chunk_size = 0
+        self.fec_group = 0
+        self.parity = []
+        self.encode_start = 0.0
+        self.encode_end = 0.0
+        self.send_first = 0.0
+        self.send_last = 0.0
+
+class DropOldestQueue:
+    """
+    A bounded queue that discards its oldest item instead of blocking the producer.
+
+    Attributes:
+        maxsize (int): Maximum number of queued items.
+        dropped (int): Items discarded because the queue was full.
+        max_depth (int): Highest depth seen since start.
+    """
+
+    def __init__(self, maxsize: int = 2):
+        """
+        Initializes the queue.
+
+        Args:
+            maxsize (int): Maximum number of queued items.
+        """
+        self.maxsize = maxsize
+        self.items = deque()
+        self.cond = threading.Condition()
+        self.dropped = 0
+        self.max_depth = 0
+
+    def put(self, item):
+        """
+        Adds an item, dropping the oldest one if the queue is full.
+
+        Args:
+            item: The item to queue.
+        """
+        with self.cond:
+            if len(self.items) >= self.maxsize:
+                self.items.popleft()
+                self.dropped += 1
+            self.items.append(item)
+            self.max_depth = max(self.max_depth, len(self.items))
+            self.cond.notify()
+
+    def get(self, timeout: float = None):
+        """
+        Removes and returns the oldest item.
+
+        Args:
+            timeout (float, optional): Seconds to wait for an item.
+
+        Returns:
+            The item, or None if the timeout expired.
+        """
+        with self.cond:
+            if not self.items:
+                self.cond.wait(timeout)
+                if not self.items:
+                    return None
+            return self.items.popleft()
+
+    def clear(self):
+        """
+        Discards all queued items.
+        """
+        with self.cond:
+            self.items.clear()
+
+    def __len__(self):
+        return len(self.items)
+
+class PipelineStage:
+    """
+    One worker thread of the pipeline.
+
+    The stage takes an item from its inbox (or runs freely if it has none, like
+    the capture stage), calls `work(item)` and forwards a non-None result to its
+    outbox.
+
+    Attributes:
+        name (str): Stage name used in stats and logs.
+        work (Callable): Function that processes one item.
+        inbox (DropOldestQueue | None): Input queue.
+        outbox (DropOldestQueue | None): Output queue.
+        processed (int): Items produced since start (items handled, for a stage without an outbox).
+        fps (float): Items produced per second over the last measurement window.
+        error (Exception | None): Exception that stopped the stage, if any.
+    """
+
+    def __init__(self, name: str, work, inbox: DropOldestQueue = None, outbox: DropOldestQueue = None):
+        """
+        Initializes the stage.
+
+        Args:
+            name (str): Stage name.
+            work (Callable): Function that processes one item.
+            inbox (DropOldestQueue, optional): Input queue.
+            outbox (DropOldestQueue, optional): Output queue.
+        """
+        self.name = name
+        self.work = work
+        self.inbox = inbox
+        self.outbox = outbox
+
+        self.thread = None
+        self.stop_event = None
+
+        self.processed = 0
+        self.fps = 0.0
+        self.error = None
+        self._window_count = 0
+        self._window_start = time.monotonic()
+
+    def start(self, stop_event: threading.Event):
+        """
+        Starts the stage thread.
+
+        Args:
+            stop_event (threading.Event): Shared event that stops the whole pipeline.
+        """
+        self.stop_event = stop_event
+        self.thread = threading.Thread(target=self.run, name=f"video-{self.name}", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """
+        Stage loop: pull, work, push, count.
+        """
+        while not self.stop_event.is_set():
+            if self.inbox is not None:
+                item = self.inbox.get(timeout=0.1)
+                if item is None:
+                    continue
+            else:
+                item = None
+
+            try:
+                result = self.work(item)
+            except Exception as e:
+                self.error = e
+                log.error("video", "%s stage error: %s", self.name, e)
+                self.stop_event.set()
+                break
+
+            # Polls and skipped frames (capture returning None) are not output, don't count them
+            if self.outbox is None:
+                self._tick()
+            elif result is not None:
+                self.outbox.put(result)
+                self._tick()
+
+    def _tick(self):
+        """
+        Updates the processed counter and the fps estimate.
+        """
+        self.processed += 1
+        self._window_count += 1
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.fps = self._window_count / elapsed
+            self._window_count = 0
+            self._window_start = now
+
+    def join(self, timeout: float = None):
+        """
+        Waits for the stage thread to finish.
+
+        Args:
+            timeout (float, optional): Seconds to wait.
+        """
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def stats(self) -> dict:
+        """
+        Returns this stage's counters.
+
+        Returns:
+            dict: fps, processed count and inbox depth/drops.
+        """
+        return {
+            "fps": round(self.fps, 1),
+            "processed": self.processed,
+            "queue_depth": len(self.inbox) if self.inbox is not None else 0,
+            "queue_max_depth": self.inbox.max_depth if self.inbox is not None else 0,
+            "queue_dropped": self.inbox.dropped if self.inbox is not None else 0,
+        }
+
+class EncoderPool(PipelineStage):
+    """
+    A pipeline stage that runs `work` on several threads at once.
+
+    Consecutive frames are spread across the workers (cv2.imencode releases the
+    GIL, so threads run in parallel). Each frame gets a dispatch number when it
+    is taken from the inbox, and results are released to the outbox strictly in
+    that order, so the sender still sees frames in capture order.
+
+    Attributes:
+        workers (int): Number of worker threads.
+        reorder_max_depth (int): Most finished frames held back waiting for an earlier one.
+    """
+
+    def __init__(self, name: str, work, inbox: DropOldestQueue, outbox: DropOldestQueue, workers: int = 2):
+        """
+        Initializes the pool.
+
+        Args:
+            name (str): Stage name.
+            work (Callable): Function that encodes one frame.
+            inbox (DropOldestQueue): Input queue.
+            outbox (DropOldestQueue): Output queue.
+            workers (int): Number of worker threads.
+        """
+        super().__init__(name, work, inbox, outbox)
+        self.workers = max(1, workers)
+        self.threads = []
+
+        self.dispatch_lock = threading.Lock()
+        self.emit_lock = threading.Lock()
+        self.next_dispatch = 0
+        self.next_emit = 0
+        self.finished = {}
+        self.reorder_max_depth = 0
+
+    def start(self, stop_event: threading.Event):
+        """
+        Starts every worker thread.
+
+        Args:
+            stop_event (threading.Event): Shared event that stops the whole pipeline.
+        """
+        self.stop_event = stop_event
+        self.threads = [
+            threading.Thread(target=self.run, name=f"video-{self.name}-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def run(self):
+        """
+        Worker loop: take the next frame in order, encode it, release results in order.
+        """
+        while not self.stop_event.is_set():
+            with self.dispatch_lock:
+                item = self.inbox.get(timeout=0.1)
+                if item is None:
+                    continue
+                seq = self.next_dispatch
+                self.next_dispatch += 1
+
+            try:
+                result = self.work(item)
+            except Exception as e:
+                self.error = e
+                log.error("video", "%s worker error: %s", self.name, e)
+                result = None   # Keep the sequence moving, the frame is skipped
+
+            with self.emit_lock:
+                self.finished[seq] = result
+                self.reorder_max_depth = max(self.reorder_max_depth, len(self.finished))
+                while self.next_emit in self.finished:
+                    ready = self.finished.pop(self.next_emit)
+                    self.next_emit += 1
+                    if ready is not None:
+                        self.outbox.put(ready)
+                        self._tick()
+
+    def join(self, timeout: float = None):
+        """
+        Waits for every worker thread to finish.
+
+        Args:
+            timeout (float, optional): Seconds to wait per thread.
+        """
+        for thread in self.threads:
+            thread.join(timeout)
+
+    def stats(self) -> dict:
+        """
+        Returns the pool counters.
+
+        Returns:
+            dict: Stage stats plus worker count and reorder depth.
+        """
+        stats = super().stats()
+        stats["workers"] = self.workers
+        stats["reorder_max_depth"] = self.reorder_max_depth
+        return stats
+
+class VideoPipeline:
+    """
+    Capture, encode and transmit stages connected by drop-oldest queues.
+
+    Attributes:
+        stages (list[PipelineStage]): The stages in order.
+        stop_event (threading.Event): Set to stop every stage.
+    """
+
+    def __init__(self, capture, encode, transmit, queue_size: int = 2, encoder_workers: int = 1):
+        """
+        Builds the stage graph.
+
+        Args:
+            capture (Callable): Returns a new PipelineFrame (called with None).
+            encode (Callable): Fills frame.jpeg and returns the frame.
+            transmit (Callable): Sends an encoded frame.
+            queue_size (int): Depth of each inter-stage queue.
+            encoder_workers (int): Encoder threads; more than 1 uses an EncoderPool.
+        """
+        # The encode queue must hold at least one frame per worker to keep them all busy
+        self.encode_queue = DropOldestQueue(max(queue_size, encoder_workers))
+        self.send_queue = DropOldestQueue(queue_size)
+
+        if encoder_workers > 1:
+            encoder = EncoderPool("encode", encode, self.encode_queue, self.send_queue, encoder_workers)
+        else:
+            encoder = PipelineStage("encode", encode, self.encode_queue, self.send_queue)
+
+        self.stages = [
+            PipelineStage("capture", capture, None, self.encode_queue),
+            encoder,
+            PipelineStage("transmit", transmit, self.send_queue, None),
+        ]
+        self.stop_event = threading.Event()
+
+    def start(self):
+        """
+        Starts all stages.
+        """
+        self.stop_event.clear()
+        for stage in self.stages:
+            stage.start(self.stop_event)
+
+    def stop(self, timeout: float = 2.0):
+        """
+        Stops all stages and waits for their threads.
+
+        Args:
+            timeout (float): Seconds to wait for each stage.
+        """
+        self.stop_event.set()
+        for stage in self.stages:
+            stage.join(timeout)
+        self.encode_queue.clear()
+        self.send_queue.clear()
+
+    def is_running(self) -> bool:
+        """
+        Returns:
+            bool: True until the pipeline is stopped or a stage fails.
+        """
+        return not self.stop_event.is_set()
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of every stage.
+
+        Returns:
+            dict: Stage name -> stage stats.
+        """
+        return {stage.name: stage.stats() for stage in self.stages}
+
+    def format_stats(self) -> str:
+        """
+        Returns:
+            str: One-line summary of stage fps and queue depths.
+        """
+        return " | ".join(
+            f"{name}: {s['fps']:.1f} fps q={s['queue_depth']} drop={s['queue_dropped']}"
+            for name, s in self.stats().items()
+        )
@@ -0,0 +1,304 @@
+"""
+videoSender.py
+
+Batched UDP sending for video datagrams.
+
+A frame's datagrams are queued as (header, payload) buffer pairs and handed to
+the kernel in as few syscalls as possible with sendmmsg (through ctypes), each
+datagram gathered from its two buffers so no header + payload bytes are ever
+joined. Where sendmmsg is not available it falls back to one sendmsg per
+datagram, which still avoids the join.
+
+The socket must be connected to the client, so the messages need no address.
+A connected UDP socket reports ICMP errors (e.g. port unreachable while the
+client's receiver isn't bound yet) on the next send, which clears the error.
+Such a send is retried once; if it fails again the rest of the frame is
+counted as dropped instead of raised, like an unconnected sendto would lose it.
+
+Author: HalfasleepDev
+Created: 18-10-2026
+"""
+
+# === Imports ===
+import ctypes
+import ctypes.util
+import errno
+import socket
+import time
+
+from udpHostProtocols import (pack_video_chunk_header, video_fec_flags,
+                             VIDEO_HEADER, VIDEO_FEC_HEADER)
+
+# === Constants ===
+IP_UDP_OVERHEAD = 28        # IPv4 header (20) + UDP header (8)
+IP_MTU = getattr(socket, "IP_MTU", 14)      # Linux getsockopt option for the path MTU of a connected socket
+DATAGRAM_HEADER_SIZE = VIDEO_HEADER.size + VIDEO_FEC_HEADER.size   # Worst case, parity chunks carry the frame length
+# Send errors that lose the datagrams but not the stream (client not listening yet, queue full, route gone)
+DROPPED_SEND_ERRORS = (errno.ECONNREFUSED, errno.ENOBUFS, errno.EHOSTUNREACH, errno.ENETUNREACH)
+
+# === sendmmsg Structures (Linux) ===
+class _IoVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [("msg_name", ctypes.c_void_p), ("msg_namelen", ctypes.c_uint32),
+                ("msg_iov", ctypes.POINTER(_IoVec)), ("msg_iovlen", ctypes.c_size_t),
+                ("msg_control", ctypes.c_void_p), ("msg_controllen", ctypes.c_size_t),
+                ("msg_flags", ctypes.c_int)]
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _MsgHdr), ("msg_len", ctypes.c_uint)]
+
+def _load_sendmmsg():
+    """
+    Returns:
+        Callable | None: libc sendmmsg, or None if the platform doesn't have it.
+    """
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        sendmmsg = libc.sendmmsg
+    except (OSError, AttributeError, TypeError):
+        return None
+    sendmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int]
+    sendmmsg.restype = ctypes.c_int
+    return sendmmsg
+
+# === Helper Functions ===
+def path_mtu(sock) -> int | None:
+    """
+    Reads the kernel's path MTU for a connected socket.
+
+    Args:
+        sock (socket.socket): A connected UDP socket.
+
+    Returns:
+        int | None: The path MTU, or None if the platform doesn't report it.
+    """
+    try:
+        return sock.getsockopt(socket.IPPROTO_IP, IP_MTU)
+    except OSError:
+        return None
+
+def chunk_size_for_mtu(mtu: int, header_size: int) -> int:
+    """
+    Returns the largest chunk payload that fits in one unfragmented datagram.
+
+    Args:
+        mtu (int): Link or path MTU in bytes.
+        header_size (int): Bytes of protocol header in front of each payload.
+
+    Returns:
+        int: Chunk payload size in bytes.
+    """
+    return mtu - IP_UDP_OVERHEAD - header_size
+
+def send_video_frame(sender, frame, stream_flags: int = 0):
+    """
+    Splits an encoded frame into video datagrams (plus FEC parity) and sends them as one batch.
+
+    Args:
+        sender (DatagramBatchSender): Sender for the connected video socket.
+        frame (PipelineFrame): Frame with jpeg, chunk_size, fec_group and parity set.
+        stream_flags (int): Extra header flags (e.g. VIDEO_FLAG_ANALYSIS).
+    """
+    frame.send_first = time.time() * 1000.0
+    data = frame.jpeg
+    chunk_size = frame.chunk_size
+
+    # Every chunk carries its own header so the client can reassemble in any order
+    chunk_count = (len(data) + chunk_size - 1) // chunk_size
+    fec_group = frame.fec_group
+    flags = video_fec_flags(fec_group) | stream_flags
+    parity_flags = video_fec_flags(fec_group, parity=True) | stream_flags
+
+    # All headers of the frame live in one buffer; payloads are views of the JPEG, never copied
+    stride = DATAGRAM_HEADER_SIZE
+    headers = bytearray((chunk_count + len(frame.parity)) * stride)
+    header_view = memoryview(headers)
+    offset = 0
+
+    for index in range(chunk_count):
+        pack_video_chunk_header(headers, offset, frame.frame_id, index, chunk_count, chunk_size,
+                                frame.timestamp, flags)
+        sender.add(header_view[offset:offset + VIDEO_HEADER.size],
+                   data[index * chunk_size:(index + 1) * chunk_size])
+        offset += stride
+
+        # Parity follows the last chunk of its group
+        if fec_group and ((index + 1) % fec_group == 0 or index == chunk_count - 1):
+            group = index // fec_group
+            pack_video_chunk_header(headers, offset, frame.frame_id, group, chunk_count, chunk_size,
+                                    frame.timestamp, parity_flags)
+            VIDEO_FEC_HEADER.pack_into(headers, offset + VIDEO_HEADER.size, len(data))
+            sender.add(header_view[offset:offset + stride], frame.parity[group])
+            offset += stride
+
+    sender.flush()
+    frame.send_last = time.time() * 1000.0
+
+# === Class Definitions ===
+class DatagramBatchSender:
+    """
+    Queues datagrams as (header, payload) pairs and sends them in batches.
+
+    Buffers passed to add() must stay alive and unchanged until flush() returns.
+    ctypes can only take the address of a writable buffer, so headers and
+    payloads must be bytearrays, numpy arrays or memoryviews of either.
+
+    Attributes:
+        batch_size (int): Datagrams per sendmmsg call.
+        batched (bool): True if sendmmsg is in use.
+        datagrams (int): Datagrams sent since start.
+        syscalls (int): Send syscalls made since start.
+        dropped (int): Datagrams lost to a DROPPED_SEND_ERRORS error.
+        send_errors (int): Sends that failed with one of those errors.
+    """
+
+    def __init__(self, sock, batch_size: int = 64):
+        """
+        Initializes the sender and its preallocated message arrays.
+
+        Args:
+            sock (socket.socket): UDP socket connected to the client.
+            batch_size (int): Datagrams per sendmmsg call (the kernel caps this at 1024).
+        """
+        self.sock = sock
+        self.batch_size = batch_size
+        self.sendmmsg = _load_sendmmsg()
+        self.batched = self.sendmmsg is not None
+
+        self.pending = []
+        self.datagrams = 0
+        self.syscalls = 0
+        self.dropped = 0
+        self.send_errors = 0
+
+        if self.batched:
+            # Each message gathers two iovecs: header then payload
+            self.msgs = (_MMsgHdr * batch_size)()
+            self.iov = (_IoVec * (batch_size * 2))()
+            iov_size = ctypes.sizeof(_IoVec)
+            for i in range(batch_size):
+                hdr = self.msgs[i].msg_hdr
+                hdr.msg_iov = ctypes.cast(ctypes.addressof(self.iov) + 2 * i * iov_size, ctypes.POINTER(_IoVec))
+                hdr.msg_iovlen = 2
+
+    def add(self, header, payload):
+        """
+        Queues one datagram.
+
+        Args:
+            header (bytearray | memoryview): Protocol header.
+            payload (memoryview | numpy.ndarray): Payload bytes.
+        """
+        self.pending.append((header, payload))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Sends every queued datagram.
+        """
+        if not self.pending:
+            return
+        try:
+            if self.batched:
+                sent = self._send_batch()
+            else:
+                sent = 0
+                for header, payload in self.pending:
+                    if not self._send_retrying(self.sock.sendmsg, [header, payload]):
+                        break
+                    sent += 1
+            self.datagrams += sent
+            self.dropped += len(self.pending) - sent
+        finally:
+            self.pending.clear()
+
+    def send(self, data: bytes) -> bool:
+        """
+        Sends one datagram right away (e.g. a frame trace), with the same error handling.
+
+        Returns:
+            bool: False if the datagram was dropped.
+        """
+        if not self._send_retrying(self.sock.send, data):
+            self.dropped += 1
+            return False
+        self.datagrams += 1
+        return True
+
+    def _send_retrying(self, send, data) -> bool:
+        """
+        Calls send(data), retrying once after a DROPPED_SEND_ERRORS error.
+
+        Returns:
+            bool: False if both attempts failed.
+        """
+        for _ in range(2):
+            self.syscalls += 1
+            try:
+                send(data)
+                return True
+            except OSError as e:
+                if e.errno not in DROPPED_SEND_ERRORS:
+                    raise
+                self.send_errors += 1
+        return False
+
+    def _send_batch(self):
+        """
+        Fills the message arrays and calls sendmmsg until the whole batch is out.
+
+        Returns:
+            int: Datagrams sent; the rest of the batch is dropped after a DROPPED_SEND_ERRORS error.
+        """
+        count = len(self.pending)
+        refs = []   # ctypes views keep the buffers exported until the send is done
+        for i, (header, payload) in enumerate(self.pending):
+            for j, buffer in enumerate((header, payload)):
+                view = memoryview(buffer).cast("B")
+                length = len(view)
+                if length:
+                    c_buffer = (ctypes.c_char * length).from_buffer(view)
+                    refs.append(c_buffer)
+                    self.iov[2 * i + j].iov_base = ctypes.addressof(c_buffer)
+                else:
+                    self.iov[2 * i + j].iov_base = None
+                self.iov[2 * i + j].iov_len = length
+
+        fd = self.sock.fileno()
+        sent = 0
+        failures = 0
+        while sent < count:
+            result = self.sendmmsg(fd, ctypes.byref(self.msgs[sent]), count - sent, 0)
+            self.syscalls += 1
+            if result < 0:
+                err = ctypes.get_errno()
+                if err in (errno.EINTR, errno.EAGAIN):
+                    continue
+                if err in DROPPED_SEND_ERRORS:
+                    # Usually an earlier datagram's ICMP error, cleared by reporting it: retry once
+                    self.send_errors += 1
+                    failures += 1
+                    if failures > 1:
+                        break
+                    continue
+                raise OSError(err, f"sendmmsg failed: {errno.errorcode.get(err, err)}")
+            sent += result
+        del refs
+        return sent
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Datagrams sent and dropped, syscalls and datagrams per syscall.
+        """
+        return {
+            "batched": self.batched,
+            "datagrams": self.datagrams,
+            "dropped": self.dropped,
+            "send_errors": self.send_errors,
+            "syscalls": self.syscalls,
+            "datagrams_per_syscall": round(self.datagrams / self.syscalls, 1) if self.syscalls else 0.0,
+        }
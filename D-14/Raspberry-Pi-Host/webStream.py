@@ -1,44 +1,380 @@
+"""
+webStream.py
+
+Shared-encoder MJPEG stream over HTTP for any number of viewers.
+
+One thread captures and JPEG-encodes each frame once, and only while someone
+is watching. The encoded bytes go into a latest-frame slot on an asyncio
+server, which fans them out to every connected viewer. A viewer always gets
+the newest frame: if its socket can't keep up, the frames published while it
+was still sending are skipped (and counted) instead of queued, so a slow
+viewer never builds a backlog or slows the others down.
+
+Endpoints:
+    /video-feed     multipart/x-mixed-replace MJPEG stream (boundary "frame")
+    /stats          JSON with the encoder stats and each viewer's throughput
+
+Usage:
+    python webStream.py [--source picamera2|opencv|synthetic|replay] [--path FILE]
+                        [--host IP] [--port 5000] [--fps 30] [--quality 95]
+
+Author: HalfasleepDev
+Created: 18-10-2026
+"""
+
+# === Imports ===
+import argparse
+import asyncio
+import json
+import socket
 import threading
-from flask import Flask, Response
-from picamera2 import Picamera2
+import time
+
 import cv2
 
+from cameraSource import create_camera_source, CAMERA_SOURCES
 from getIpAddr import get_local_ip
+from hostLogger import log
 
-app = Flask(__name__)
+# === Constants ===
+HTTP_PORT = 5000
+STREAM_SIZE = (1280, 720)
+STREAM_FPS = 30
+JPEG_QUALITY = 95               # cv2.imencode's default
+CLIENT_BUFFER_BYTES = 128 * 1024  # Unsent bytes per viewer, in asyncio and again in the kernel, before
+                                  # its writes wait (and frames are skipped)
+REQUEST_TIMEOUT = 5.0           # Seconds to receive the request headers
+STATS_INTERVAL = 10.0           # Seconds between stats log lines
+ENCODER_RETRY_MIN = 0.1         # Seconds before the first retry after a capture or encode error
+ENCODER_RETRY_MAX = 5.0         # Retry back-off cap, doubled per consecutive error
+BOUNDARY = b"frame"
 
-# Initialize camera
-camera = Picamera2()
-camera.configure(camera.create_preview_configuration(main={"format": 'XRGB8888', "size": (1280, 720)}))
-camera.start()
+# === Class Definitions ===
+class EncodedFrame:
+    """
+    One JPEG frame, shared by every viewer.
 
-HOST = get_local_ip()
+    Attributes:
+        seq (int): Frame number, increasing by one per encoded frame.
+        part (bytes): The whole multipart part (headers and JPEG).
+        timestamp (float): Monotonic capture time.
+    """
+    __slots__ = ("seq", "part", "timestamp")
 
-def generate_frames():
-    """ Continuously capture frames and send them as an MJPEG stream. """
-    while True:
-        frame = camera.capture_array()
-        ret, buffer = cv2.imencode('.jpg', frame)
-        frame = buffer.tobytes()
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+    def __init__(self, seq: int, jpeg: bytes, timestamp: float):
+        self.seq = seq
+        self.part = (b"--" + BOUNDARY + b"\r\nContent-Type: image/jpeg\r\nContent-Length: "
+                     + str(len(jpeg)).encode() + b"\r\n\r\n" + jpeg + b"\r\n")
+        self.timestamp = timestamp
 
-@app.route('/video-feed')
-def video_feed():
-    """ Flask route for live video streaming """
-    return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+class SharedEncoder:
+    """
+    Capture and encode thread; each frame is encoded once, however many viewers there are.
 
-def run_flask():
-    """ Run Flask server in a separate thread. """
-    app.run(host=HOST, port=5000, debug=False, use_reloader=False)
+    Attributes:
+        source (CameraSource): Frame source.
+        quality (int): JPEG quality.
+        frames (int): Frames encoded.
+        errors (int): Capture or encode errors (each one retried after a back-off).
+        encode_ms_total (float): Time spent in cv2.imencode.
+    """
 
-if __name__ == '__main__':
-    # Start Flask in a separate thread
-    flask_thread = threading.Thread(target=run_flask, daemon=True)
-    flask_thread.start()
-    # Keep the main program running
-    try:
+    def __init__(self, source, quality: int, publish):
+        """
+        Args:
+            source (CameraSource): Started camera source.
+            quality (int): JPEG quality.
+            publish (Callable): Called from this thread with each EncodedFrame.
+        """
+        self.source = source
+        self.quality = quality
+        self.publish = publish
+        self.wanted = threading.Event()     # Set while there is at least one viewer
+        self.running = True
+        self.stopped = threading.Event()    # Cuts a retry back-off short
+        self.frames = 0
+        self.errors = 0
+        self.encode_ms_total = 0.0
+        self.thread = threading.Thread(target=self.run, name="web-encoder", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.stopped.set()
+        self.wanted.set()
+        self.thread.join(2.0)
+
+    def run(self):
+        """
+        Encoder loop: idle without viewers, otherwise capture, encode once and publish.
+
+        A failed read or encode is logged and retried after a back-off that
+        doubles up to ENCODER_RETRY_MAX, so a lost camera doesn't kill the
+        thread (and freeze every viewer) or flood the log.
+        """
+        params = [int(cv2.IMWRITE_JPEG_QUALITY), self.quality]
+        retry = ENCODER_RETRY_MIN
+        while self.running:
+            if not self.wanted.wait(0.5) or not self.running:
+                continue
+            try:
+                frame = self.source.read()
+                start = time.perf_counter()
+                ok, buffer = cv2.imencode(".jpg", frame.image, params)
+            except Exception as e:
+                self.errors += 1
+                log.error("web", "Encoder error: %s (retrying in %.1fs)", e, retry)
+                self.stopped.wait(retry)
+                retry = min(retry * 2, ENCODER_RETRY_MAX)
+                continue
+            retry = ENCODER_RETRY_MIN
+            if not ok:
+                continue
+            self.encode_ms_total += (time.perf_counter() - start) * 1000.0
+            self.frames += 1
+            if self.running:
+                self.publish(EncodedFrame(self.frames, buffer.tobytes(), frame.timestamp))
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Frames encoded, errors and the mean encode time.
+        """
+        return {
+            "frames": self.frames,
+            "errors": self.errors,
+            "encode_ms_avg": round(self.encode_ms_total / self.frames, 2) if self.frames else 0.0,
+        }
+
+class StreamClient:
+    """
+    One connected viewer.
+
+    Attributes:
+        addr (tuple): Viewer address.
+        connected (float): Monotonic connect time.
+        last_seq (int): Sequence number of the last frame sent (0 before the first).
+        pending_seq (int): Newest frame published since the viewer last took one (0 if none).
+        frames_sent (int): Frames written to the viewer.
+        frames_dropped (int): Frames skipped because the viewer was still busy with an older one,
+            counted as each newer frame replaces it.
+        bytes_sent (int): Bytes written to the viewer.
+    """
+
+    def __init__(self, addr):
+        self.addr = addr
+        self.connected = time.monotonic()
+        self.wakeup = asyncio.Event()
+        self.last_seq = 0
+        self.pending_seq = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.bytes_sent = 0
+        self.latency_ms_total = 0.0
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Frame and byte counts, average fps and Mbit/s, drop ratio and mean capture-to-send latency.
+        """
+        elapsed = max(time.monotonic() - self.connected, 1e-6)
+        offered = self.frames_sent + self.frames_dropped
+        return {
+            "addr": f"{self.addr[0]}:{self.addr[1]}" if self.addr else "?",
+            "seconds": round(elapsed, 1),
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "drop_ratio": round(self.frames_dropped / offered, 3) if offered else 0.0,
+            "fps": round(self.frames_sent / elapsed, 1),
+            "mbps": round(self.bytes_sent * 8 / elapsed / 1e6, 2),
+            "latency_ms_avg": round(self.latency_ms_total / self.frames_sent, 1) if self.frames_sent else 0.0,
+        }
+
+class MJPEGServer:
+    """
+    Asyncio HTTP server fanning the shared encoder's frames out to every viewer.
+
+    Attributes:
+        clients (set[StreamClient]): Connected viewers.
+        latest (EncodedFrame | None): Newest frame.
+        encoder (SharedEncoder): Capture and encode thread.
+    """
+
+    def __init__(self, source, host: str, port: int = HTTP_PORT, quality: int = JPEG_QUALITY):
+        """
+        Args:
+            source (CameraSource): Started camera source.
+            host (str): Address to listen on.
+            port (int): HTTP port.
+            quality (int): JPEG quality.
+        """
+        self.host = host
+        self.port = port
+        self.clients = set()
+        self.latest = None
+        self.loop = None
+        self.encoder = SharedEncoder(source, quality, self._publish_threadsafe)
+
+    # === Frames ===
+    def _publish_threadsafe(self, frame: EncodedFrame):
+        try:
+            self.loop.call_soon_threadsafe(self.publish, frame)
+        except RuntimeError:
+            pass    # Loop already closed while the encoder was stopping
+
+    def publish(self, frame: EncodedFrame):
+        """
+        Makes a frame the latest and wakes every viewer (loop thread).
+
+        A viewer that hasn't taken the previous frame yet (still in drain())
+        will never send it, so the drop is counted now rather than when the
+        viewer catches up; /stats then shows a stalled viewer as dropping.
+        """
+        self.latest = frame
+        for client in self.clients:
+            if client.pending_seq:
+                client.frames_dropped += 1
+            client.pending_seq = frame.seq
+            client.wakeup.set()
+
+    # === HTTP ===
+    async def serve(self):
+        """
+        Runs the server until cancelled.
+        """
+        self.loop = asyncio.get_running_loop()
+        self.encoder.start()
+        server = await asyncio.start_server(self.handle, self.host, self.port)
+        log.info("web", "MJPEG stream on http://%s:%d/video-feed", self.host, self.port)
+        stats_task = asyncio.create_task(self.report_stats())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            stats_task.cancel()
+            self.encoder.stop()
+
+    async def handle(self, reader, writer):
+        """
+        Answers one HTTP connection.
+        """
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), REQUEST_TIMEOUT)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+
+        parts = request.split(b"\r\n", 1)[0].split()
+        path = parts[1].split(b"?", 1)[0] if len(parts) >= 2 else b""
+        try:
+            if parts[:1] != [b"GET"]:
+                await self.respond(writer, b"405 Method Not Allowed", b"text/plain", b"Method not allowed\n")
+            elif path == b"/video-feed":
+                await self.stream(reader, writer)
+            elif path == b"/stats":
+                await self.respond(writer, b"200 OK", b"application/json", json.dumps(self.stats()).encode())
+            else:
+                await self.respond(writer, b"404 Not Found", b"text/plain", b"Not found\n")
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status: bytes, content_type: bytes, body: bytes):
+        writer.write(b"HTTP/1.1 " + status + b"\r\nContent-Type: " + content_type + b"\r\nContent-Length: "
+                     + str(len(body)).encode() + b"\r\nConnection: close\r\n\r\n" + body)
+        await writer.drain()
+
+    async def stream(self, reader, writer):
+        """
+        Sends the newest frame whenever one is published, until the viewer disconnects.
+
+        drain() waits while more than CLIENT_BUFFER_BYTES are unsent; frames
+        published meanwhile are replaced by newer ones, never queued. The
+        kernel send buffer is capped too, or it would grow to hold seconds of
+        video for a slow viewer.
+        """
+        client = StreamClient(writer.get_extra_info("peername"))
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, CLIENT_BUFFER_BYTES)
+        writer.transport.set_write_buffer_limits(high=CLIENT_BUFFER_BYTES)
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: multipart/x-mixed-replace; boundary=" + BOUNDARY
+                     + b"\r\nCache-Control: no-cache\r\nConnection: close\r\n\r\n")
+
+        self.clients.add(client)
+        self.encoder.wanted.set()
+        log.info("web", "Viewer %s connected (%d watching)", client.addr, len(self.clients))
+
+        # The viewer never sends anything after the request; EOF means it left
+        closed = asyncio.create_task(reader.read())
+        try:
+            while not closed.done():
+                waiter = asyncio.create_task(client.wakeup.wait())
+                await asyncio.wait((waiter, closed), return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+                client.wakeup.clear()
+
+                frame = self.latest
+                if frame is None or frame.seq == client.last_seq or closed.done():
+                    continue
+                client.pending_seq = 0
+                client.last_seq = frame.seq
+
+                writer.write(frame.part)
+                await writer.drain()
+                client.frames_sent += 1
+                client.bytes_sent += len(frame.part)
+                client.latency_ms_total += (time.monotonic() - frame.timestamp) * 1000.0
+        finally:
+            closed.cancel()
+            self.clients.discard(client)
+            if not self.clients:
+                self.encoder.wanted.clear()
+            log.info("web", "Viewer %s disconnected (%d watching)", client.addr, len(self.clients), **client.stats())
+
+    # === Stats ===
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Encoder stats and one entry per connected viewer.
+        """
+        return {
+            "encoder": self.encoder.stats(),
+            "viewers": [client.stats() for client in self.clients],
+        }
+
+    async def report_stats(self):
         while True:
-            pass  # Other code or logic can run here
+            await asyncio.sleep(STATS_INTERVAL)
+            if self.clients:
+                log.info("web", "Encoder %s", self.encoder.stats(), viewers=len(self.clients))
+                for client in self.clients:
+                    log.info("web", "Viewer", **client.stats())
+
+# === Helper Functions ===
+def main():
+    parser = argparse.ArgumentParser(description="Shared-encoder MJPEG stream over HTTP")
+    parser.add_argument("--source", choices=CAMERA_SOURCES, default="picamera2")
+    parser.add_argument("--path", default="", help="Device for opencv, recording for replay")
+    parser.add_argument("--host", default=None, help="Listen address (the LAN address by default)")
+    parser.add_argument("--port", type=int, default=HTTP_PORT)
+    parser.add_argument("--fps", type=float, default=STREAM_FPS)
+    parser.add_argument("--quality", type=int, default=JPEG_QUALITY)
+    args = parser.parse_args()
+
+    source = create_camera_source(args.source, STREAM_SIZE, args.fps, path=args.path)
+    source.start()
+    server = MJPEGServer(source, args.host or get_local_ip(), args.port, args.quality)
+    try:
+        asyncio.run(server.serve())
     except KeyboardInterrupt:
-        print("\nShutting down Flask server...")
+        log.info("web", "Shutting down MJPEG server...")
+    finally:
+        source.stop()
+        log.stop()
+
+if __name__ == '__main__':
+    main()